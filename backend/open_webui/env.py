@@ -367,6 +367,23 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# With realtime chat save, streamed message updates are coalesced and written
+# when the oldest pending update is this many seconds old or this many
+# updates are pending, and when the response completes
+try:
+    REALTIME_CHAT_SAVE_INTERVAL = float(
+        os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", "1.0")
+    )
+except ValueError:
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+try:
+    REALTIME_CHAT_SAVE_MAX_PENDING = int(
+        os.environ.get("REALTIME_CHAT_SAVE_MAX_PENDING", "100")
+    )
+except ValueError:
+    REALTIME_CHAT_SAVE_MAX_PENDING = 100
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
 ####################################
@@ -537,6 +554,21 @@ else:
         MODELS_CACHE_TTL = 1
 
 
+####################################
+# ACCESS CONTROL
+####################################
+
+# Seconds a worker reuses a user's group ids and group permissions, and the
+# owners and access control of the models, across requests; changes made
+# through the same worker apply immediately
+authorization_cache_ttl = os.environ.get("AUTHORIZATION_CACHE_TTL", "5")
+
+try:
+    AUTHORIZATION_CACHE_TTL = max(float(authorization_cache_ttl), 0.0)
+except ValueError:
+    AUTHORIZATION_CACHE_TTL = 5.0
+
+
 ####################################
 # CHAT
 ####################################
@@ -595,6 +627,28 @@ except ValueError:
 WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 
+# Sessions using the "delta" chat:completion protocol get a full snapshot of
+# the message content every N events, so a client that missed one resyncs
+websocket_chat_completion_snapshot_interval = os.environ.get(
+    "WEBSOCKET_CHAT_COMPLETION_SNAPSHOT_INTERVAL", "50"
+)
+
+try:
+    WEBSOCKET_CHAT_COMPLETION_SNAPSHOT_INTERVAL = max(
+        int(websocket_chat_completion_snapshot_interval), 1
+    )
+except ValueError:
+    WEBSOCKET_CHAT_COMPLETION_SNAPSHOT_INTERVAL = 50
+
+# Message events (status, sources, files, ...) are persisted by a background
+# consumer; emitters wait once this many events are queued
+websocket_event_queue_size = os.environ.get("WEBSOCKET_EVENT_QUEUE_SIZE", "10000")
+
+try:
+    WEBSOCKET_EVENT_QUEUE_SIZE = int(websocket_event_queue_size)
+except ValueError:
+    WEBSOCKET_EVENT_QUEUE_SIZE = 10000
+
 
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
@@ -611,6 +665,24 @@ AIOHTTP_CLIENT_SESSION_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_SSL", "True").lower() == "true"
 )
 
+# Connections kept open per OpenAI/Ollama upstream (0 for no limit) by the
+# shared client sessions, and seconds an idle one stays open for reuse
+aiohttp_client_pool_size = os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "100")
+
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = max(int(aiohttp_client_pool_size), 0)
+except ValueError:
+    AIOHTTP_CLIENT_POOL_SIZE = 100
+
+aiohttp_client_keepalive_timeout = os.environ.get(
+    "AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30"
+)
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = max(float(aiohttp_client_keepalive_timeout), 0.0)
+except ValueError:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 30.0
+
 AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST = os.environ.get(
     "AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST",
     os.environ.get("AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST", "10"),
@@ -64,6 +64,8 @@ from open_webui.socket.main import (
     app as socket_app,
     periodic_usage_pool_cleanup,
     get_event_emitter,
+    CHAT_EVENT_PERSISTER,
+    POOL_INVALIDATOR,
     get_models_in_use,
     get_active_user_ids,
 )
@@ -101,6 +103,7 @@ from open_webui.routers.retrieval import (
     get_ef,
     get_rf,
 )
+from open_webui.retrieval.embeddings import EMBEDDING_CLIENT
 
 from open_webui.internal.db import Session, engine
 
@@ -486,7 +489,8 @@ from open_webui.utils.chat import (
 )
 from open_webui.utils.embeddings import generate_embeddings
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import authorization_scope, has_access
+from open_webui.utils.http_client import UPSTREAM_SESSIONS
 
 from open_webui.utils.auth import (
     get_license_data,
@@ -598,6 +602,9 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    if POOL_INVALIDATOR is not None:
+        await POOL_INVALIDATOR.start()
+
     if app.state.config.ENABLE_BASE_MODELS_CACHE:
         await get_all_models(
             Request(
@@ -624,6 +631,15 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    if POOL_INVALIDATOR is not None:
+        await POOL_INVALIDATOR.stop()
+
+    # Save the message events that are still queued
+    await CHAT_EVENT_PERSISTER.flush()
+
+    EMBEDDING_CLIENT.shutdown()
+    await UPSTREAM_SESSIONS.close()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -1215,6 +1231,7 @@ app.state.config.AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH = (
 ########################################
 
 app.state.MODELS = {}
+app.state.MODELS_SNAPSHOT = None
 
 
 class RedirectMiddleware(BaseHTTPMiddleware):
@@ -1273,6 +1290,13 @@ async def commit_session_after_request(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def authorization_scope_middleware(request: Request, call_next):
+    # Load each user's groups at most once per request
+    with authorization_scope():
+        return await call_next(request)
+
+
 @app.middleware("http")
 async def check_url(request: Request, call_next):
     start_time = int(time.time())
@@ -1961,7 +1985,10 @@ async def get_current_usage(user=Depends(get_verified_user)):
     This is an experimental endpoint and subject to change.
     """
     try:
-        return {"model_ids": get_models_in_use(), "user_ids": get_active_user_ids()}
+        return {
+            "model_ids": await get_models_in_use(),
+            "user_ids": await get_active_user_ids(),
+        }
     except Exception as e:
         log.error(f"Error getting usage statistics: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -0,0 +1,169 @@
+"""Add chat_message table
+
+Revision ID: b2f1c3d4e5a6
+Revises: a5c220713937
+Create Date: 2025-10-17 09:12:41.318502
+
+"""
+
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2f1c3d4e5a6"
+down_revision: Union[str, None] = "a5c220713937"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+chat = table(
+    "chat",
+    column("id", sa.String()),
+    column("chat", sa.JSON()),
+)
+
+chat_message = table(
+    "chat_message",
+    column("chat_id", sa.String()),
+    column("id", sa.String()),
+    column("parent_id", sa.Text()),
+    column("content", sa.Text()),
+    column("meta", sa.JSON()),
+    column("created_at", sa.BigInteger()),
+    column("updated_at", sa.BigInteger()),
+)
+
+
+def get_chat_batches(conn):
+    last_id = None
+    while True:
+        query = sa.select(chat.c.id, chat.c.chat).order_by(chat.c.id)
+        if last_id is not None:
+            query = query.where(chat.c.id > last_id)
+
+        rows = conn.execute(query.limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("meta", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "id"),
+    )
+
+    # Move history.messages out of the chat JSON into chat_message rows, and
+    # drop the messages list of the current branch, which is derived on read
+    conn = op.get_bind()
+    now = int(time.time())
+
+    for rows in get_chat_batches(conn):
+        for row in rows:
+            data = row.chat
+            history = data.get("history") if isinstance(data, dict) else None
+            if not isinstance(history, dict) or "messages" not in history:
+                continue
+
+            values = []
+            for message_id, message in (history["messages"] or {}).items():
+                content = message.get("content")
+                if isinstance(content, str):
+                    meta = {
+                        key: value for key, value in message.items() if key != "content"
+                    }
+                    content = content.replace("\x00", "")
+                else:
+                    meta, content = message, None
+
+                values.append(
+                    {
+                        "chat_id": row.id,
+                        "id": message_id,
+                        "parent_id": message.get("parentId"),
+                        "content": content,
+                        "meta": meta,
+                        "created_at": message.get("timestamp") or now,
+                        "updated_at": now,
+                    }
+                )
+
+            if values:
+                conn.execute(chat_message.insert(), values)
+
+            conn.execute(
+                chat.update()
+                .where(chat.c.id == row.id)
+                .values(
+                    chat={
+                        **{
+                            key: value
+                            for key, value in data.items()
+                            if key != "messages"
+                        },
+                        "history": {
+                            key: value
+                            for key, value in history.items()
+                            if key != "messages"
+                        },
+                    }
+                )
+            )
+
+
+def downgrade() -> None:
+    # Put the messages back into the chat JSON
+    conn = op.get_bind()
+
+    for rows in get_chat_batches(conn):
+        messages = {}
+        for message in conn.execute(
+            sa.select(chat_message).where(
+                chat_message.c.chat_id.in_([row.id for row in rows])
+            )
+        ):
+            messages.setdefault(message.chat_id, {})[message.id] = {
+                **(message.meta or {}),
+                **({"content": message.content} if message.content is not None else {}),
+            }
+
+        for row in rows:
+            if row.id not in messages or not isinstance(row.chat, dict):
+                continue
+
+            history = row.chat.get("history") or {}
+
+            branch = []
+            message = messages[row.id].get(history.get("currentId"))
+            while message:
+                branch.insert(0, message)
+                message = messages[row.id].get(message.get("parentId"))
+
+            conn.execute(
+                chat.update()
+                .where(chat.c.id == row.id)
+                .values(
+                    chat={
+                        **row.chat,
+                        "history": {**history, "messages": messages[row.id]},
+                        "messages": branch,
+                    }
+                )
+            )
+
+    op.drop_table("chat_message")
@@ -0,0 +1,123 @@
+"""Add chat_search full-text index
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2f1c3d4e5a6
+Create Date: 2025-10-18 10:41:07.524918
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3d4e5f6a7b8"
+down_revision: Union[str, None] = "b2f1c3d4e5a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# Keep in sync with open_webui.models.chats.CHAT_SEARCH_MAX_LENGTH
+MAX_LENGTH = 500_000
+
+chat = table(
+    "chat",
+    column("id", sa.String()),
+    column("user_id", sa.String()),
+    column("title", sa.Text()),
+)
+
+chat_message = table(
+    "chat_message",
+    column("chat_id", sa.String()),
+    column("content", sa.Text()),
+    column("created_at", sa.BigInteger()),
+)
+
+
+def has_fts5(conn) -> bool:
+    options = conn.exec_driver_sql("PRAGMA compile_options").fetchall()
+    return any(row[0] == "ENABLE_FTS5" for row in options)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    dialect = conn.dialect.name
+
+    if dialect == "sqlite":
+        if not has_fts5(conn):
+            # Chat search falls back to scanning the messages
+            return
+
+        op.execute(
+            "CREATE VIRTUAL TABLE chat_search USING fts5("
+            "chat_id UNINDEXED, title, content, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        insert = sa.text(
+            "INSERT INTO chat_search (chat_id, title, content) "
+            "VALUES (:chat_id, :title, :content)"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE chat_search ("
+            "chat_id VARCHAR PRIMARY KEY, document TSVECTOR NOT NULL)"
+        )
+        op.execute(
+            "CREATE INDEX chat_search_document_idx ON chat_search "
+            "USING GIN (document)"
+        )
+        insert = sa.text(
+            "INSERT INTO chat_search (chat_id, document) VALUES (:chat_id, "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :content), 'B'))"
+        )
+    else:
+        return
+
+    # Backfill the index from the existing chats, skipping shared copies
+    last_id = None
+    while True:
+        query = (
+            sa.select(chat.c.id, chat.c.title)
+            .where(sa.not_(chat.c.user_id.like("shared-%")))
+            .order_by(chat.c.id)
+        )
+        if last_id is not None:
+            query = query.where(chat.c.id > last_id)
+
+        rows = conn.execute(query.limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+
+        contents = {}
+        for message in conn.execute(
+            sa.select(chat_message.c.chat_id, chat_message.c.content)
+            .where(
+                chat_message.c.chat_id.in_([row.id for row in rows]),
+                chat_message.c.content.isnot(None),
+            )
+            .order_by(chat_message.c.created_at)
+        ):
+            contents.setdefault(message.chat_id, []).append(message.content)
+
+        conn.execute(
+            insert,
+            [
+                {
+                    "chat_id": row.id,
+                    "title": (row.title or "").replace("\x00", ""),
+                    "content": "\n".join(contents.get(row.id, []))[:MAX_LENGTH],
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS chat_search")
@@ -0,0 +1,33 @@
+"""Add chat keyset pagination index
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2025-10-19 08:27:53.140612
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e5f6a7b8c9"
+down_revision: Union[str, None] = "c3d4e5f6a7b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves chat lists paged by (updated_at, id); covers user_id_archived_idx
+    op.create_index(
+        "user_id_archived_updated_at_id_idx",
+        "chat",
+        ["user_id", "archived", "updated_at", "id"],
+    )
+    op.drop_index("user_id_archived_idx", table_name="chat")
+
+
+def downgrade() -> None:
+    op.create_index("user_id_archived_idx", "chat", ["user_id", "archived"])
+    op.drop_index("user_id_archived_updated_at_id_idx", table_name="chat")
@@ -0,0 +1,90 @@
+"""Add group_member table
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2025-10-20 14:05:36.902174
+
+"""
+
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5f6a7b8c9d0"
+down_revision: Union[str, None] = "d4e5f6a7b8c9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+group_member = table(
+    "group_member",
+    column("group_id", sa.Text()),
+    column("user_id", sa.Text()),
+    column("created_at", sa.BigInteger()),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "group_member",
+        sa.Column("group_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("group_id", "user_id"),
+    )
+    op.create_index("group_member_user_id_idx", "group_member", ["user_id"])
+
+    # Move group.user_ids into group_member rows
+    conn = op.get_bind()
+    group = table("group", column("id", sa.Text()), column("user_ids", sa.JSON()))
+    now = int(time.time())
+
+    for row in conn.execute(sa.select(group.c.id, group.c.user_ids)).fetchall():
+        if not isinstance(row.user_ids, list):
+            continue
+
+        user_ids = dict.fromkeys(
+            user_id for user_id in row.user_ids if isinstance(user_id, str)
+        )
+        if user_ids:
+            conn.execute(
+                group_member.insert(),
+                [
+                    {"group_id": row.id, "user_id": user_id, "created_at": now}
+                    for user_id in user_ids
+                ],
+            )
+
+    with op.batch_alter_table("group") as batch_op:
+        batch_op.drop_column("user_ids")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("group") as batch_op:
+        batch_op.add_column(sa.Column("user_ids", sa.JSON(), nullable=True))
+
+    # Put the members back into group.user_ids
+    conn = op.get_bind()
+    group = table("group", column("id", sa.Text()), column("user_ids", sa.JSON()))
+
+    user_ids = {}
+    for row in conn.execute(
+        sa.select(group_member.c.group_id, group_member.c.user_id).order_by(
+            group_member.c.created_at, group_member.c.user_id
+        )
+    ):
+        user_ids.setdefault(row.group_id, []).append(row.user_id)
+
+    for row in conn.execute(sa.select(group.c.id)).fetchall():
+        conn.execute(
+            group.update()
+            .where(group.c.id == row.id)
+            .values(user_ids=user_ids.get(row.id, []))
+        )
+
+    op.drop_index("group_member_user_id_idx", table_name="group_member")
+    op.drop_table("group_member")
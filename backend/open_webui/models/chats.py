@@ -1,18 +1,26 @@
 import logging
 import json
+import re
+import threading
 import time
 import uuid
-from typing import Optional
+from typing import Iterator, Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
 from open_webui.models.folders import Folders
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.misc import get_message_list
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_MAX_PENDING,
+)
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON, Index
-from sqlalchemy import or_, func, select, and_, text
-from sqlalchemy.sql import exists
+from sqlalchemy import or_, func, select, and_, text, delete, inspect
+from sqlalchemy.orm import defer
+from sqlalchemy.sql import exists, table, column, literal_column
 from sqlalchemy.sql.expression import bindparam
 
 ####################
@@ -47,8 +55,14 @@ class Chat(Base):
         Index("folder_id_idx", "folder_id"),
         # WHERE user_id = ... AND pinned = ...
         Index("user_id_pinned_idx", "user_id", "pinned"),
-        # WHERE user_id = ... AND archived = ...
-        Index("user_id_archived_idx", "user_id", "archived"),
+        # WHERE user_id = ... AND archived = ... ORDER BY updated_at DESC, id DESC
+        Index(
+            "user_id_archived_updated_at_id_idx",
+            "user_id",
+            "archived",
+            "updated_at",
+            "id",
+        ),
         # WHERE user_id = ... ORDER BY updated_at DESC
         Index("updated_at_user_id_idx", "updated_at", "user_id"),
         # WHERE folder_id = ... AND user_id = ...
@@ -56,6 +70,231 @@ class Chat(Base):
     )
 
 
+class ChatMessage(Base):
+    """
+    One message of a chat's history. The chat row keeps the rest of the chat
+    JSON, so updating a message doesn't rewrite the whole conversation.
+    """
+
+    __tablename__ = "chat_message"
+
+    chat_id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+    parent_id = Column(Text, nullable=True)
+
+    # String content; any other content is kept in meta
+    content = Column(Text, nullable=True)
+    # The rest of the message dict
+    meta = Column(JSON, nullable=True)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+
+def get_message_row_values(message: dict) -> dict:
+    content = message.get("content")
+    if isinstance(content, str):
+        # PostgreSQL doesn't allow null characters in text
+        return {
+            "parent_id": message.get("parentId"),
+            "content": content.replace("\x00", ""),
+            "meta": {key: value for key, value in message.items() if key != "content"},
+        }
+
+    return {"parent_id": message.get("parentId"), "content": None, "meta": message}
+
+
+def get_message_from_row(row: ChatMessage) -> dict:
+    message = dict(row.meta or {})
+    if row.content is not None:
+        message["content"] = row.content
+    return message
+
+
+def split_chat_messages(chat: dict) -> tuple[dict, Optional[dict]]:
+    """
+    Returns the chat without history.messages, and the messages (None if the
+    chat doesn't carry any, in which case the stored messages are kept). The
+    flat messages list of the current branch is dropped as well, it is derived
+    from the history when the chat is read.
+    """
+    history = chat.get("history")
+    if not isinstance(history, dict) or "messages" not in history:
+        return chat, None
+
+    return (
+        {
+            **{key: value for key, value in chat.items() if key != "messages"},
+            "history": {
+                key: value for key, value in history.items() if key != "messages"
+            },
+        },
+        history["messages"] or {},
+    )
+
+
+def parse_chat_cursor(cursor: str) -> tuple[int, str]:
+    """
+    Chat lists are paged by (updated_at, id), newest first. A cursor is the
+    "{updated_at}:{id}" of the last chat of the previous page.
+    """
+    updated_at, _, id = cursor.partition(":")
+    return int(updated_at), id
+
+
+def get_keyset_clause(columns: list, values: list, descending: list[bool]):
+    """Matches the rows that come after values in the given column order."""
+    clauses = []
+    for idx, (column, value) in enumerate(zip(columns, values)):
+        clauses.append(
+            and_(
+                *[
+                    prev == prev_value
+                    for prev, prev_value in zip(columns, values[:idx])
+                ],
+                column < value if descending[idx] else column > value,
+            )
+        )
+    return or_(*clauses)
+
+
+####################
+# Chat search index
+####################
+
+# PostgreSQL caps a tsvector at 1MB, so very long chats are indexed in part
+CHAT_SEARCH_MAX_LENGTH = 500_000
+
+chat_search = table(
+    "chat_search",
+    column("chat_id"),
+    column("document"),
+)
+
+
+class ChatSearchIndex:
+    """
+    Full-text index over chat titles and message content, in the chat_search
+    table: an FTS5 table on SQLite, a tsvector with a GIN index on
+    PostgreSQL. Entries are written in the same transaction as the chat.
+    """
+
+    def __init__(self):
+        self.enabled: Optional[bool] = None
+
+    def is_enabled(self, db) -> bool:
+        # The migration skips the table when e.g. SQLite lacks FTS5
+        if self.enabled is None:
+            self.enabled = db.bind.dialect.name in (
+                "sqlite",
+                "postgresql",
+            ) and inspect(db.bind).has_table("chat_search")
+        return self.enabled
+
+    def update(self, db, chat_id: str, title: Optional[str]):
+        """Re-indexes a chat from its title and chat_message rows."""
+        if not self.is_enabled(db):
+            return
+
+        # Make pending message rows visible to the query below
+        db.flush()
+        content = "\n".join(
+            row.content
+            for row in db.query(ChatMessage.content)
+            .filter(ChatMessage.chat_id == chat_id, ChatMessage.content.isnot(None))
+            .order_by(ChatMessage.created_at)
+        )[:CHAT_SEARCH_MAX_LENGTH]
+        params = {
+            "chat_id": chat_id,
+            "title": (title or "").replace("\x00", ""),
+            "content": content,
+        }
+
+        if db.bind.dialect.name == "sqlite":
+            db.execute(text("DELETE FROM chat_search WHERE chat_id = :chat_id"), params)
+            db.execute(
+                text(
+                    "INSERT INTO chat_search (chat_id, title, content) "
+                    "VALUES (:chat_id, :title, :content)"
+                ),
+                params,
+            )
+        else:
+            db.execute(
+                text(
+                    "INSERT INTO chat_search (chat_id, document) VALUES (:chat_id, "
+                    "setweight(to_tsvector('simple', :title), 'A') || "
+                    "setweight(to_tsvector('simple', :content), 'B')) "
+                    "ON CONFLICT (chat_id) DO UPDATE SET document = EXCLUDED.document"
+                ),
+                params,
+            )
+
+    def delete(self, db, chat_ids):
+        if self.is_enabled(db):
+            db.execute(delete(chat_search).where(chat_search.c.chat_id.in_(chat_ids)))
+
+    def filter(self, db, query, search_text: str, cursor: Optional[str] = None):
+        """
+        Restricts a Chat query to the chats matching every word of
+        search_text (as a prefix), best matches first, starting after the
+        cursor chat. Returns None when the index can't answer the search.
+        """
+        words = re.findall(r"\w+", search_text)
+        if not words or not self.is_enabled(db):
+            return None
+
+        if db.bind.dialect.name == "sqlite":
+            # Title matches weigh more; chat_id is not indexed
+            rank = func.bm25(literal_column("chat_search"), 0.0, 10.0, 1.0)
+            matches = (
+                select(chat_search.c.chat_id, rank.label("rank"))
+                .where(
+                    literal_column("chat_search").op("MATCH")(
+                        " ".join(f'"{word}"*' for word in words)
+                    )
+                )
+                .subquery()
+            )
+            rank_descending = False
+        else:
+            ts_query = func.to_tsquery(
+                "simple", " & ".join(f"{word}:*" for word in words)
+            )
+            matches = (
+                select(
+                    chat_search.c.chat_id,
+                    func.ts_rank(chat_search.c.document, ts_query).label("rank"),
+                )
+                .where(chat_search.c.document.op("@@")(ts_query))
+                .subquery()
+            )
+            rank_descending = True
+
+        query = query.join(matches, matches.c.chat_id == Chat.id)
+        if cursor:
+            updated_at, id = parse_chat_cursor(cursor)
+            cursor_rank = (
+                select(matches.c.rank).where(matches.c.chat_id == id).scalar_subquery()
+            )
+            query = query.filter(
+                get_keyset_clause(
+                    [matches.c.rank, Chat.updated_at, Chat.id],
+                    [cursor_rank, updated_at, id],
+                    [rank_descending, True, True],
+                )
+            )
+
+        return query.order_by(None).order_by(
+            matches.c.rank.desc() if rank_descending else matches.c.rank.asc(),
+            Chat.updated_at.desc(),
+            Chat.id.desc(),
+        )
+
+
+ChatSearch = ChatSearchIndex()
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -75,6 +314,26 @@ class ChatModel(BaseModel):
     folder_id: Optional[str] = None
 
 
+class ChatSummaryModel(BaseModel):
+    """A chat without its conversation, for chat lists."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+    title: str
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+    share_id: Optional[str] = None
+    archived: bool = False
+    pinned: Optional[bool] = False
+
+    meta: dict = {}
+    folder_id: Optional[str] = None
+
+
 ####################
 # Forms
 ####################
@@ -123,6 +382,126 @@ class ChatTitleIdResponse(BaseModel):
 
 
 class ChatTable:
+    def _get_chat_models(self, db, chats) -> list[ChatModel]:
+        """
+        Reassembles history.messages from the chat_message rows, and the
+        messages list of the current branch from the history.
+        """
+        chats = list(chats)
+        chat_ids = [chat.id for chat in chats]
+
+        messages = {}
+        # Keep the IN lists under SQLite's bound parameter limit
+        for idx in range(0, len(chat_ids), 500):
+            for row in db.query(ChatMessage).filter(
+                ChatMessage.chat_id.in_(chat_ids[idx : idx + 500])
+            ):
+                messages.setdefault(row.chat_id, {})[row.id] = get_message_from_row(row)
+
+        models = []
+        for chat in chats:
+            model = ChatModel.model_validate(chat)
+            if chat.id in messages or "history" in model.chat:
+                history = model.chat.get("history") or {}
+                history_messages = {
+                    # Not yet migrated chats keep their messages inline
+                    **(history.get("messages") or {}),
+                    **messages.get(chat.id, {}),
+                }
+                model.chat = {
+                    **model.chat,
+                    "history": {**history, "messages": history_messages},
+                    "messages": get_message_list(
+                        history_messages, history.get("currentId")
+                    ),
+                }
+            models.append(model)
+        return models
+
+    def _get_chat_summaries(self, query) -> list[ChatSummaryModel]:
+        """
+        Loads a Chat query without the chat JSON or its messages. Reading the
+        deferred column raises instead of loading it row by row.
+        """
+        return [
+            ChatSummaryModel.model_validate(chat)
+            for chat in query.options(defer(Chat.chat, raiseload=True))
+        ]
+
+    def _get_chat_model(self, db, chat: Optional[Chat]) -> Optional[ChatModel]:
+        if chat is None:
+            return None
+        return self._get_chat_models(db, [chat])[0]
+
+    def _set_chat(self, db, chat_item: Chat, chat: dict, new: bool = False):
+        """Stores the chat JSON, with history.messages as chat_message rows."""
+        chat_item.chat, messages = split_chat_messages(chat)
+        if messages is None:
+            return
+
+        now = int(time.time())
+        rows = (
+            {}
+            if new
+            else {
+                row.id: row
+                for row in db.query(ChatMessage).filter_by(chat_id=chat_item.id)
+            }
+        )
+
+        # Only write the messages that changed
+        for message_id, message in messages.items():
+            values = get_message_row_values(message)
+            row = rows.pop(message_id, None)
+            if row is None:
+                db.add(
+                    ChatMessage(
+                        chat_id=chat_item.id,
+                        id=message_id,
+                        **values,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                )
+            elif any(getattr(row, key) != value for key, value in values.items()):
+                for key, value in values.items():
+                    setattr(row, key, value)
+                row.updated_at = now
+
+        for row in rows.values():
+            db.delete(row)
+
+    def _delete_chat_messages(self, db, *criteria):
+        db.query(ChatMessage).filter(
+            ChatMessage.chat_id.in_(select(Chat.id).where(*criteria))
+        ).delete(synchronize_session=False)
+        ChatSearch.delete(db, select(Chat.id).where(*criteria))
+
+    def _paginate(
+        self,
+        query,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ):
+        """
+        Pages a query ordered by (updated_at, id) descending. A cursor (see
+        parse_chat_cursor) stays fast and stable however deep the page, while
+        skip is kept for callers that page by offset.
+        """
+        if cursor:
+            updated_at, id = parse_chat_cursor(cursor)
+            query = query.filter(
+                get_keyset_clause(
+                    [Chat.updated_at, Chat.id], [updated_at, id], [True, True]
+                )
+            )
+        elif skip:
+            query = query.offset(skip)
+        if limit:
+            query = query.limit(limit)
+        return query
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -143,71 +522,88 @@ class ChatTable:
             )
 
             result = Chat(**chat.model_dump())
+            self._set_chat(db, result, form_data.chat, new=True)
             db.add(result)
+            ChatSearch.update(db, result.id, result.title)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return chat if result else None
+
+    def _add_imported_chat(
+        self, db, user_id: str, form_data: ChatImportForm
+    ) -> ChatModel:
+        id = str(uuid.uuid4())
+        chat = ChatModel(
+            **{
+                "id": id,
+                "user_id": user_id,
+                "title": (
+                    form_data.chat["title"] if "title" in form_data.chat else "New Chat"
+                ),
+                "chat": form_data.chat,
+                "meta": form_data.meta,
+                "pinned": form_data.pinned,
+                "folder_id": form_data.folder_id,
+                "created_at": (
+                    form_data.created_at if form_data.created_at else int(time.time())
+                ),
+                "updated_at": (
+                    form_data.updated_at if form_data.updated_at else int(time.time())
+                ),
+            }
+        )
+
+        result = Chat(**chat.model_dump())
+        self._set_chat(db, result, form_data.chat, new=True)
+        db.add(result)
+        ChatSearch.update(db, result.id, result.title)
+        return chat
 
     def import_chat(
         self, user_id: str, form_data: ChatImportForm
     ) -> Optional[ChatModel]:
         with get_db() as db:
-            id = str(uuid.uuid4())
-            chat = ChatModel(
-                **{
-                    "id": id,
-                    "user_id": user_id,
-                    "title": (
-                        form_data.chat["title"]
-                        if "title" in form_data.chat
-                        else "New Chat"
-                    ),
-                    "chat": form_data.chat,
-                    "meta": form_data.meta,
-                    "pinned": form_data.pinned,
-                    "folder_id": form_data.folder_id,
-                    "created_at": (
-                        form_data.created_at
-                        if form_data.created_at
-                        else int(time.time())
-                    ),
-                    "updated_at": (
-                        form_data.updated_at
-                        if form_data.updated_at
-                        else int(time.time())
-                    ),
-                }
-            )
+            chat = self._add_imported_chat(db, user_id, form_data)
+            db.commit()
+            return chat
 
-            result = Chat(**chat.model_dump())
-            db.add(result)
+    def import_chats(self, user_id: str, forms: list[ChatImportForm]) -> int:
+        """Imports a batch of chats in one transaction, returning the count."""
+        with get_db() as db:
+            for form_data in forms:
+                self._add_imported_chat(db, user_id, form_data)
             db.commit()
-            db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return len(forms)
 
     def update_chat_by_id(self, id: str, chat: dict) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
-                chat_item.chat = chat
+                self._set_chat(db, chat_item, chat)
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+                ChatSearch.update(db, chat_item.id, chat_item.title)
                 db.commit()
                 db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._get_chat_model(db, chat_item)
         except Exception:
             return None
 
     def update_chat_title_by_id(self, id: str, title: str) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        chat["title"] = title
+        try:
+            with get_db() as db:
+                chat_item = db.get(Chat, id)
+                chat_item.chat = {**chat_item.chat, "title": title}
+                chat_item.title = title
+                chat_item.updated_at = int(time.time())
+                ChatSearch.update(db, chat_item.id, chat_item.title)
+                db.commit()
+                db.refresh(chat_item)
 
-        return self.update_chat_by_id(id, chat)
+                return self._get_chat_model(db, chat_item)
+        except Exception:
+            return None
 
     def update_chat_tags_by_id(
         self, id: str, tags: list[str], user
@@ -230,11 +626,12 @@ class ChatTable:
         return self.get_chat_by_id(id)
 
     def get_chat_title_by_id(self, id: str) -> Optional[str]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat = db.get(Chat, id)
+            if chat is None:
+                return None
 
-        return chat.chat.get("title", "New Chat")
+            return chat.chat.get("title", "New Chat")
 
     def get_messages_map_by_chat_id(self, id: str) -> Optional[dict]:
         chat = self.get_chat_by_id(id)
@@ -246,56 +643,105 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            row = db.get(ChatMessage, (id, message_id))
+            if row is not None:
+                return get_message_from_row(row)
+
+            chat = db.get(Chat, id)
+            if chat is None:
+                return None
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+            return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
+    ) -> Optional[dict]:
+        """
+        Updates a single message in place and makes it the current message.
+        Returns the updated message. The chat is not re-indexed for search, as
+        streamed messages are saved many times; see update_chat_search_by_id.
+        """
         # Sanitize message content for null characters before upserting
         if isinstance(message.get("content"), str):
             message["content"] = message["content"].replace("\x00", "")
 
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+        with get_db() as db:
+            # Only read what this needs from the chat JSON, not the whole row
+            chat_item = (
+                db.query(
+                    Chat.chat[("history", "currentId")].as_string().label("current_id")
+                )
+                .filter_by(id=id)
+                .first()
+            )
+            if chat_item is None:
+                return None
+
+            now = int(time.time())
+            row = db.get(ChatMessage, (id, message_id))
+            if row is not None:
+                message = {**get_message_from_row(row), **message}
+                for key, value in get_message_row_values(message).items():
+                    setattr(row, key, value)
+                row.updated_at = now
+            else:
+                # Not yet migrated chats keep their messages inline
+                inline_message = (
+                    db.query(Chat.chat[("history", "messages", message_id)])
+                    .filter_by(id=id)
+                    .scalar()
+                )
+                message = {
+                    **(inline_message if isinstance(inline_message, dict) else {}),
+                    **message,
+                }
+                db.add(
+                    ChatMessage(
+                        chat_id=id,
+                        id=message_id,
+                        **get_message_row_values(message),
+                        created_at=now,
+                        updated_at=now,
+                    )
+                )
 
-        history["currentId"] = message_id
+            if chat_item.current_id != message_id:
+                chat = db.get(Chat, id)
+                history = chat.chat.get("history", {})
+                chat.chat = {
+                    **chat.chat,
+                    "history": {**history, "currentId": message_id},
+                }
+            db.query(Chat).filter_by(id=id).update({"updated_at": now})
+            db.commit()
+            return message
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+    def update_chat_search_by_id(self, id: str) -> None:
+        """Re-indexes a chat for search, e.g. once a streamed message is done."""
+        with get_db() as db:
+            title = db.query(Chat.title).filter_by(id=id).scalar()
+            if title is not None:
+                ChatSearch.update(db, id, title)
+                db.commit()
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
+    ) -> Optional[dict]:
+        with get_db() as db:
+            row = db.get(ChatMessage, (id, message_id))
+            if row is None:
+                return None
 
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+            now = int(time.time())
+            meta = dict(row.meta or {})
+            meta["statusHistory"] = [*meta.get("statusHistory", []), status]
+            row.meta = meta
+            row.updated_at = now
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+            db.query(Chat).filter_by(id=id).update({"updated_at": now})
+            db.commit()
+            return get_message_from_row(row)
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -310,7 +756,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._get_chat_model(db, chat).chat,
                     "meta": chat.meta,
                     "pinned": chat.pinned,
                     "folder_id": chat.folder_id,
@@ -319,6 +765,7 @@ class ChatTable:
                 }
             )
             shared_result = Chat(**shared_chat.model_dump())
+            self._set_chat(db, shared_result, shared_chat.chat)
             db.add(shared_result)
             db.commit()
             db.refresh(shared_result)
@@ -344,7 +791,7 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                self._set_chat(db, shared_chat, self._get_chat_model(db, chat).chat)
                 shared_chat.meta = chat.meta
                 shared_chat.pinned = chat.pinned
                 shared_chat.folder_id = chat.folder_id
@@ -352,13 +799,14 @@ class ChatTable:
                 db.commit()
                 db.refresh(shared_chat)
 
-                return ChatModel.model_validate(shared_chat)
+                return self._get_chat_model(db, shared_chat)
         except Exception:
             return None
 
     def delete_shared_chat_by_chat_id(self, chat_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(db, Chat.user_id == f"shared-{chat_id}")
                 db.query(Chat).filter_by(user_id=f"shared-{chat_id}").delete()
                 db.commit()
 
@@ -384,7 +832,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -396,7 +844,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -408,7 +856,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -427,7 +875,8 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+        cursor: Optional[str] = None,
+    ) -> list[ChatSummaryModel]:
 
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id, archived=True)
@@ -441,6 +890,8 @@ class ChatTable:
                 direction = filter.get("direction")
 
                 if order_by and direction:
+                    if cursor:
+                        raise ValueError("Cursors only page the default order")
                     if not getattr(Chat, order_by, None):
                         raise ValueError("Invalid order_by field")
 
@@ -451,15 +902,9 @@ class ChatTable:
                     else:
                         raise ValueError("Invalid direction for ordering")
             else:
-                query = query.order_by(Chat.updated_at.desc())
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+                query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_summaries(self._paginate(query, skip, limit, cursor))
 
     def get_chat_list_by_user_id(
         self,
@@ -468,7 +913,8 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+        cursor: Optional[str] = None,
+    ) -> list[ChatSummaryModel]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id)
             if not include_archived:
@@ -482,6 +928,8 @@ class ChatTable:
                 order_by = filter.get("order_by")
                 direction = filter.get("direction")
 
+                if order_by and direction and cursor:
+                    raise ValueError("Cursors only page the default order")
                 if order_by and direction and getattr(Chat, order_by):
                     if direction.lower() == "asc":
                         query = query.order_by(getattr(Chat, order_by).asc())
@@ -490,15 +938,9 @@ class ChatTable:
                     else:
                         raise ValueError("Invalid direction for ordering")
             else:
-                query = query.order_by(Chat.updated_at.desc())
+                query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
 
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
-
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_summaries(self._paginate(query, skip, limit, cursor))
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -508,6 +950,7 @@ class ChatTable:
         include_pinned: bool = False,
         skip: Optional[int] = None,
         limit: Optional[int] = None,
+        cursor: Optional[str] = None,
     ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id)
@@ -521,16 +964,11 @@ class ChatTable:
             if not include_archived:
                 query = query.filter_by(archived=False)
 
-            query = query.order_by(Chat.updated_at.desc()).with_entities(
-                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
-            )
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+            query = query.order_by(
+                Chat.updated_at.desc(), Chat.id.desc()
+            ).with_entities(Chat.id, Chat.title, Chat.updated_at, Chat.created_at)
 
-            all_chats = query.all()
+            all_chats = self._paginate(query, skip, limit, cursor).all()
 
             # result has to be destructured from sqlalchemy `row` and mapped to a dict since the `ChatModel`is not the returned dataclass.
             return [
@@ -547,22 +985,21 @@ class ChatTable:
 
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
-    ) -> list[ChatModel]:
+    ) -> list[ChatSummaryModel]:
         with get_db() as db:
-            all_chats = (
+            query = (
                 db.query(Chat)
                 .filter(Chat.id.in_(chat_ids))
                 .filter_by(archived=False)
-                .order_by(Chat.updated_at.desc())
-                .all()
+                .order_by(Chat.updated_at.desc(), Chat.id.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_summaries(self._paginate(query, skip, limit))
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -584,7 +1021,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -595,7 +1032,28 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
+
+    def iter_chats(
+        self,
+        user_id: Optional[str] = None,
+        archived: Optional[bool] = None,
+        batch_size: int = 100,
+    ) -> Iterator[ChatModel]:
+        """
+        Yields chats, newest first, from a server-side cursor so that exports
+        hold one batch in memory rather than the whole history.
+        """
+        with get_db() as db:
+            query = select(Chat).order_by(Chat.updated_at.desc(), Chat.id.desc())
+            if user_id is not None:
+                query = query.where(Chat.user_id == user_id)
+            if archived is not None:
+                query = query.where(Chat.archived == archived)
+
+            result = db.execute(query.execution_options(yield_per=batch_size))
+            for chats in result.scalars().partitions():
+                yield from self._get_chat_models(db, chats)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -604,16 +1062,16 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
-    def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
+    def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatSummaryModel]:
         with get_db() as db:
-            all_chats = (
+            query = (
                 db.query(Chat)
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_summaries(query)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -622,7 +1080,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -631,15 +1089,21 @@ class ChatTable:
         include_archived: bool = False,
         skip: int = 0,
         limit: int = 60,
-    ) -> list[ChatModel]:
+        cursor: Optional[str] = None,
+    ) -> list[ChatSummaryModel]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Filters chats based on a search query using Python, allowing pagination using skip and limit, or a cursor.
         """
         search_text = search_text.replace("\u0000", "").lower().strip()
 
         if not search_text:
             return self.get_chat_list_by_user_id(
-                user_id, include_archived, filter={}, skip=skip, limit=limit
+                user_id,
+                include_archived,
+                filter={},
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
             )
 
         search_text_words = search_text.split(" ")
@@ -714,7 +1178,16 @@ class ChatTable:
             if folder_ids:
                 query = query.filter(Chat.folder_id.in_(folder_ids))
 
-            query = query.order_by(Chat.updated_at.desc())
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+
+            # Use the full-text index, else scan the messages of every chat
+            indexed_query = (
+                ChatSearch.filter(db, query, search_text, cursor)
+                if search_text
+                else None
+            )
+            if indexed_query is not None:
+                query = indexed_query
 
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
@@ -728,11 +1201,13 @@ class ChatTable:
                     ")"
                 )
                 sqlite_content_clause = text(sqlite_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
+                if indexed_query is None:
+                    query = query.filter(
+                        or_(
+                            Chat.title.ilike(bindparam("title_key")),
+                            sqlite_content_clause,
+                        ).params(title_key=f"%{search_text}%", content_key=search_text)
+                    )
 
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
@@ -777,14 +1252,15 @@ class ChatTable:
                     ")"
                 )
                 postgres_content_clause = text(postgres_content_sql)
-                # Also filter out chats with null bytes in title
-                query = query.filter(text("Chat.title::text NOT LIKE '%\\x00%'"))
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
+                if indexed_query is None:
+                    # Also filter out chats with null bytes in title
+                    query = query.filter(text("Chat.title::text NOT LIKE '%\\x00%'"))
+                    query = query.filter(
+                        or_(
+                            Chat.title.ilike(bindparam("title_key")),
+                            postgres_content_clause,
+                        ).params(title_key=f"%{search_text}%", content_key=search_text)
+                    )
 
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
@@ -820,31 +1296,32 @@ class ChatTable:
                     f"Unsupported dialect: {db.bind.dialect.name}"
                 )
 
-            # Perform pagination at the SQL level
-            all_chats = query.offset(skip).limit(limit).all()
+            # Perform pagination at the SQL level; ranked results handle the cursor
+            all_chats = self._get_chat_summaries(
+                self._paginate(
+                    query, skip, limit, cursor if indexed_query is None else None
+                )
+            )
 
             log.info(f"The number of chats: {len(all_chats)}")
-
-            # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return all_chats
 
     def get_chats_by_folder_id_and_user_id(
-        self, folder_id: str, user_id: str, skip: int = 0, limit: int = 60
-    ) -> list[ChatModel]:
+        self,
+        folder_id: str,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 60,
+        cursor: Optional[str] = None,
+    ) -> list[ChatSummaryModel]:
         with get_db() as db:
             query = db.query(Chat).filter_by(folder_id=folder_id, user_id=user_id)
             query = query.filter(or_(Chat.pinned == False, Chat.pinned == None))
             query = query.filter_by(archived=False)
 
-            query = query.order_by(Chat.updated_at.desc())
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_summaries(self._paginate(query, skip, limit, cursor))
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -859,7 +1336,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -872,7 +1349,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -884,7 +1361,7 @@ class ChatTable:
 
     def get_chat_list_by_user_id_and_tag_name(
         self, user_id: str, tag_name: str, skip: int = 0, limit: int = 50
-    ) -> list[ChatModel]:
+    ) -> list[ChatSummaryModel]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id)
             tag_id = tag_name.replace(" ", "_").lower()
@@ -909,9 +1386,9 @@ class ChatTable:
                     f"Unsupported dialect: {db.bind.dialect.name}"
                 )
 
-            all_chats = query.all()
+            all_chats = self._get_chat_summaries(query)
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return all_chats
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -932,7 +1409,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_model(db, chat)
         except Exception:
             return None
 
@@ -1018,6 +1495,7 @@ class ChatTable:
     def delete_chat_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(db, Chat.id == id)
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -1028,6 +1506,7 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(db, Chat.id == id, Chat.user_id == user_id)
                 db.query(Chat).filter_by(id=id, user_id=user_id).delete()
                 db.commit()
 
@@ -1040,6 +1519,7 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                self._delete_chat_messages(db, Chat.user_id == user_id)
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -1052,6 +1532,9 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, Chat.user_id == user_id, Chat.folder_id == folder_id
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -1065,6 +1548,7 @@ class ChatTable:
                 chats_by_user = db.query(Chat).filter_by(user_id=user_id).all()
                 shared_chat_ids = [f"shared-{chat.id}" for chat in chats_by_user]
 
+                self._delete_chat_messages(db, Chat.user_id.in_(shared_chat_ids))
                 db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids)).delete()
                 db.commit()
 
@@ -1074,3 +1558,105 @@ class ChatTable:
 
 
 Chats = ChatTable()
+
+
+class ChatMessageWriteBuffer:
+    """
+    Write-behind buffer for streamed message updates. Updates to the same
+    (chat_id, message_id) are merged in memory and written with a single
+    upsert once the oldest of them is flush_interval seconds old, after
+    max_pending updates, or on flush(). A background thread flushes updates
+    that reach flush_interval without a newer update, e.g. of a stalled
+    stream.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        # (chat_id, message_id) -> [merged message, update count, first update time]
+        self.pending: dict[tuple[str, str], list] = {}
+        # (chat_id, message_id) -> [write lock, number of flushes using it]
+        self.message_locks: dict[tuple[str, str], list] = {}
+        self.lock = threading.Lock()
+        self.flusher: Optional[threading.Thread] = None
+
+    def update(self, id: str, message_id: str, message: dict) -> bool:
+        """Returns True if the update was written through to the database."""
+        key = (id, message_id)
+        with self.lock:
+            if key in self.pending:
+                entry = self.pending[key]
+                entry[0] = {**entry[0], **message}
+                entry[1] += 1
+            else:
+                entry = self.pending[key] = [message, 1, time.monotonic()]
+
+                if self.flusher is None:
+                    self.flusher = threading.Thread(
+                        target=self.flush_stale, name="chat-message-writes", daemon=True
+                    )
+                    self.flusher.start()
+
+            due = (
+                entry[1] >= self.max_pending
+                or time.monotonic() - entry[2] >= self.flush_interval
+            )
+
+        if due:
+            self.flush(id, message_id)
+        return due
+
+    def flush(self, id: str, message_id: str) -> Optional[dict]:
+        key = (id, message_id)
+        with self.lock:
+            message_lock = self.message_locks.setdefault(key, [threading.Lock(), 0])
+            message_lock[1] += 1
+
+        try:
+            # Writes of one message are ordered by its own lock, the database
+            # write doesn't hold up updates and flushes of other messages
+            with message_lock[0]:
+                with self.lock:
+                    entry = self.pending.pop(key, None)
+                if entry is None:
+                    return None
+
+                return Chats.upsert_message_to_chat_by_id_and_message_id(
+                    id, message_id, entry[0]
+                )
+        finally:
+            with self.lock:
+                message_lock[1] -= 1
+                if not message_lock[1]:
+                    del self.message_locks[key]
+
+    def flush_stale(self):
+        """Flushes pending updates once they are flush_interval old, until none are left."""
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.flusher = None
+                    return
+
+                now = time.monotonic()
+                first_update = min(entry[2] for entry in self.pending.values())
+                stale = [
+                    key
+                    for key, entry in self.pending.items()
+                    if now - entry[2] >= self.flush_interval
+                ]
+
+            if not stale:
+                time.sleep(first_update + self.flush_interval - now)
+
+            for id, message_id in stale:
+                try:
+                    self.flush(id, message_id)
+                except Exception as e:
+                    log.exception(f"Error flushing message {message_id}: {e}")
+
+
+ChatMessageWrites = ChatMessageWriteBuffer(
+    REALTIME_CHAT_SAVE_INTERVAL, REALTIME_CHAT_SAVE_MAX_PENDING
+)
@@ -236,6 +236,38 @@ class FilesTable:
             except Exception:
                 return None
 
+    def update_files_by_ids(self, updates: dict[str, dict]) -> int:
+        """
+        Apply per-file updates ({id: {"hash": ..., "data": {...}, "meta": {...}}})
+        in a single transaction. data and meta are merged like the single-file
+        updates. Returns the number of updated files.
+        """
+        if not updates:
+            return 0
+
+        with get_db() as db:
+            try:
+                files = db.query(File).filter(File.id.in_(list(updates))).all()
+                for file in files:
+                    update = updates[file.id]
+                    if "hash" in update:
+                        file.hash = update["hash"]
+                    if update.get("data"):
+                        file.data = {
+                            **(file.data if file.data else {}),
+                            **update["data"],
+                        }
+                    if update.get("meta"):
+                        file.meta = {
+                            **(file.meta if file.meta else {}),
+                            **update["meta"],
+                        }
+                db.commit()
+                return len(files)
+            except Exception as e:
+                log.exception(f"Error updating files: {e}")
+                return 0
+
     def delete_file_by_id(self, id: str) -> bool:
         with get_db() as db:
             try:
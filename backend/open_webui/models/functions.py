@@ -104,6 +104,11 @@ class FunctionValves(BaseModel):
 
 
 class FunctionsTable:
+    def __init__(self):
+        # Bumped on every write made by this process, so the model list
+        # built from the functions is rebuilt
+        self.version = 0
+
     def insert_new_function(
         self, user_id: str, type: str, form_data: FunctionForm
     ) -> Optional[FunctionModel]:
@@ -122,6 +127,7 @@ class FunctionsTable:
                 result = Function(**function.model_dump())
                 db.add(result)
                 db.commit()
+                self.version += 1
                 db.refresh(result)
                 if result:
                     return FunctionModel.model_validate(result)
@@ -170,6 +176,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                self.version += 1
 
                 return [
                     FunctionModel.model_validate(func)
@@ -282,6 +289,7 @@ class FunctionsTable:
                 function.valves = valves
                 function.updated_at = int(time.time())
                 db.commit()
+                self.version += 1
                 db.refresh(function)
                 return self.get_function_by_id(id)
             except Exception:
@@ -302,6 +310,7 @@ class FunctionsTable:
 
                     function.updated_at = int(time.time())
                     db.commit()
+                    self.version += 1
                     db.refresh(function)
                     return self.get_function_by_id(id)
                 else:
@@ -363,6 +372,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self.version += 1
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -377,6 +387,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self.version += 1
                 return True
             except Exception:
                 return None
@@ -386,6 +397,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                self.version += 1
 
                 return True
             except Exception:
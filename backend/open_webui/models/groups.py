@@ -11,7 +11,7 @@ from open_webui.models.files import FileMetadataResponse
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON, func
+from sqlalchemy import BigInteger, Column, Text, JSON, Index, select
 
 
 log = logging.getLogger(__name__)
@@ -35,12 +35,25 @@ class Group(Base):
     meta = Column(JSON, nullable=True)
 
     permissions = Column(JSON, nullable=True)
-    user_ids = Column(JSON, nullable=True)
 
     created_at = Column(BigInteger)
     updated_at = Column(BigInteger)
 
 
+class GroupMember(Base):
+    __tablename__ = "group_member"
+
+    group_id = Column(Text, primary_key=True)
+    user_id = Column(Text, primary_key=True)
+
+    created_at = Column(BigInteger)
+
+    __table_args__ = (
+        # WHERE user_id = ... (the primary key serves WHERE group_id = ...)
+        Index("group_member_user_id_idx", "user_id"),
+    )
+
+
 class GroupModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
@@ -92,6 +105,57 @@ class GroupUpdateForm(GroupForm, UserIdsForm):
 
 
 class GroupTable:
+    def __init__(self):
+        # Bumped on every membership or permission change made by this
+        # process, so cached authorization contexts can tell they are stale
+        self.version = 0
+
+    def _get_group_models(self, db, groups) -> list[GroupModel]:
+        """Fills in user_ids from the group_member rows."""
+        groups = list(groups)
+        group_ids = [group.id for group in groups]
+
+        user_ids = {}
+        # Keep the IN lists under SQLite's bound parameter limit
+        for idx in range(0, len(group_ids), 500):
+            for member in (
+                db.query(GroupMember.group_id, GroupMember.user_id)
+                .filter(GroupMember.group_id.in_(group_ids[idx : idx + 500]))
+                .order_by(GroupMember.created_at, GroupMember.user_id)
+            ):
+                user_ids.setdefault(member.group_id, []).append(member.user_id)
+
+        models = []
+        for group in groups:
+            model = GroupModel.model_validate(group)
+            model.user_ids = user_ids.get(group.id, [])
+            models.append(model)
+        return models
+
+    def _set_group_members(self, db, id: str, user_ids: list[str]):
+        """Replaces the members of a group, writing only the changes."""
+        user_ids = list(dict.fromkeys(user_ids))  # Deduplicate
+        current_user_ids = {
+            member.user_id
+            for member in db.query(GroupMember.user_id).filter_by(group_id=id)
+        }
+
+        removed_user_ids = current_user_ids - set(user_ids)
+        if removed_user_ids:
+            db.query(GroupMember).filter(
+                GroupMember.group_id == id,
+                GroupMember.user_id.in_(removed_user_ids),
+            ).delete(synchronize_session=False)
+
+        now = int(time.time())
+        db.add_all(
+            [
+                GroupMember(group_id=id, user_id=user_id, created_at=now)
+                for user_id in user_ids
+                if user_id not in current_user_ids
+            ]
+        )
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -107,12 +171,14 @@ class GroupTable:
             )
 
             try:
-                result = Group(**group.model_dump())
+                result = Group(**group.model_dump(exclude={"user_ids"}))
                 db.add(result)
+                self._set_group_members(db, result.id, group.user_ids)
                 db.commit()
+                self.version += 1
                 db.refresh(result)
                 if result:
-                    return GroupModel.model_validate(result)
+                    return self._get_group_models(db, [result])[0]
                 else:
                     return None
 
@@ -120,54 +186,76 @@ class GroupTable:
                 return None
 
     def get_groups(self) -> list[GroupModel]:
+        with get_db() as db:
+            return self._get_group_models(
+                db, db.query(Group).order_by(Group.updated_at.desc())
+            )
+
+    def get_groups_by_member_id(self, user_id: str) -> list[GroupModel]:
+        with get_db() as db:
+            return self._get_group_models(
+                db,
+                db.query(Group)
+                .join(GroupMember, GroupMember.group_id == Group.id)
+                .filter(GroupMember.user_id == user_id)
+                .order_by(Group.updated_at.desc()),
+            )
+
+    def get_group_ids_by_member_id(self, user_id: str) -> list[str]:
         with get_db() as db:
             return [
-                GroupModel.model_validate(group)
-                for group in db.query(Group).order_by(Group.updated_at.desc()).all()
+                member.group_id
+                for member in db.query(GroupMember.group_id).filter_by(user_id=user_id)
             ]
 
-    def get_groups_by_member_id(self, user_id: str) -> list[GroupModel]:
+    def get_group_permissions_by_member_id(self, user_id: str) -> list[dict]:
+        """The permissions of each of the user's groups, without the members."""
         with get_db() as db:
             return [
-                GroupModel.model_validate(group)
-                for group in db.query(Group)
-                .filter(
-                    func.json_array_length(Group.user_ids) > 0
-                )  # Ensure array exists
-                .filter(
-                    Group.user_ids.cast(String).like(f'%"{user_id}"%')
-                )  # String-based check
-                .order_by(Group.updated_at.desc())
-                .all()
+                group.permissions or {}
+                for group in db.query(Group.permissions)
+                .join(GroupMember, GroupMember.group_id == Group.id)
+                .filter(GroupMember.user_id == user_id)
             ]
 
     def get_group_by_id(self, id: str) -> Optional[GroupModel]:
         try:
             with get_db() as db:
                 group = db.query(Group).filter_by(id=id).first()
-                return GroupModel.model_validate(group) if group else None
+                return self._get_group_models(db, [group])[0] if group else None
         except Exception:
             return None
 
-    def get_group_user_ids_by_id(self, id: str) -> Optional[str]:
-        group = self.get_group_by_id(id)
-        if group:
-            return group.user_ids
-        else:
-            return None
+    def get_group_user_ids_by_id(self, id: str) -> Optional[list[str]]:
+        with get_db() as db:
+            if db.get(Group, id) is None:
+                return None
+
+            return [
+                member.user_id
+                for member in db.query(GroupMember.user_id)
+                .filter_by(group_id=id)
+                .order_by(GroupMember.created_at, GroupMember.user_id)
+            ]
 
     def update_group_by_id(
         self, id: str, form_data: GroupUpdateForm, overwrite: bool = False
     ) -> Optional[GroupModel]:
         try:
             with get_db() as db:
+                values = form_data.model_dump(exclude_none=True)
+                user_ids = values.pop("user_ids", None)
+
                 db.query(Group).filter_by(id=id).update(
                     {
-                        **form_data.model_dump(exclude_none=True),
+                        **values,
                         "updated_at": int(time.time()),
                     }
                 )
+                if user_ids is not None:
+                    self._set_group_members(db, id, user_ids)
                 db.commit()
+                self.version += 1
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -176,8 +264,10 @@ class GroupTable:
     def delete_group_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                db.query(GroupMember).filter_by(group_id=id).delete()
                 db.query(Group).filter_by(id=id).delete()
                 db.commit()
+                self.version += 1
                 return True
         except Exception:
             return False
@@ -185,8 +275,10 @@ class GroupTable:
     def delete_all_groups(self) -> bool:
         with get_db() as db:
             try:
+                db.query(GroupMember).delete()
                 db.query(Group).delete()
                 db.commit()
+                self.version += 1
 
                 return True
             except Exception:
@@ -195,17 +287,16 @@ class GroupTable:
     def remove_user_from_all_groups(self, user_id: str) -> bool:
         with get_db() as db:
             try:
-                groups = self.get_groups_by_member_id(user_id)
-
-                for group in groups:
-                    group.user_ids.remove(user_id)
-                    db.query(Group).filter_by(id=group.id).update(
-                        {
-                            "user_ids": group.user_ids,
-                            "updated_at": int(time.time()),
-                        }
+                db.query(Group).filter(
+                    Group.id.in_(
+                        select(GroupMember.group_id).where(
+                            GroupMember.user_id == user_id
+                        )
                     )
-                    db.commit()
+                ).update({"updated_at": int(time.time())}, synchronize_session=False)
+                db.query(GroupMember).filter_by(user_id=user_id).delete()
+                db.commit()
+                self.version += 1
 
                 return True
             except Exception:
@@ -233,7 +324,7 @@ class GroupTable:
                         updated_at=int(time.time()),
                     )
                     try:
-                        result = Group(**new_group.model_dump())
+                        result = Group(**new_group.model_dump(exclude={"user_ids"}))
                         db.add(result)
                         db.commit()
                         db.refresh(result)
@@ -246,34 +337,43 @@ class GroupTable:
     def sync_groups_by_group_names(self, user_id: str, group_names: list[str]) -> bool:
         with get_db() as db:
             try:
-                groups = db.query(Group).filter(Group.name.in_(group_names)).all()
-                group_ids = [group.id for group in groups]
+                group_ids = {
+                    group.id
+                    for group in db.query(Group.id).filter(Group.name.in_(group_names))
+                }
+                current_group_ids = {
+                    member.group_id
+                    for member in db.query(GroupMember.group_id).filter_by(
+                        user_id=user_id
+                    )
+                }
+                now = int(time.time())
 
                 # Remove user from groups not in the new list
-                existing_groups = self.get_groups_by_member_id(user_id)
-
-                for group in existing_groups:
-                    if group.id not in group_ids:
-                        group.user_ids.remove(user_id)
-                        db.query(Group).filter_by(id=group.id).update(
-                            {
-                                "user_ids": group.user_ids,
-                                "updated_at": int(time.time()),
-                            }
-                        )
+                removed_group_ids = current_group_ids - group_ids
+                if removed_group_ids:
+                    db.query(GroupMember).filter(
+                        GroupMember.user_id == user_id,
+                        GroupMember.group_id.in_(removed_group_ids),
+                    ).delete(synchronize_session=False)
 
                 # Add user to new groups
-                for group in groups:
-                    if user_id not in group.user_ids:
-                        group.user_ids.append(user_id)
-                        db.query(Group).filter_by(id=group.id).update(
-                            {
-                                "user_ids": group.user_ids,
-                                "updated_at": int(time.time()),
-                            }
-                        )
+                added_group_ids = group_ids - current_group_ids
+                db.add_all(
+                    [
+                        GroupMember(group_id=group_id, user_id=user_id, created_at=now)
+                        for group_id in added_group_ids
+                    ]
+                )
+
+                changed_group_ids = removed_group_ids | added_group_ids
+                if changed_group_ids:
+                    db.query(Group).filter(Group.id.in_(changed_group_ids)).update(
+                        {"updated_at": now}, synchronize_session=False
+                    )
 
                 db.commit()
+                self.version += 1
                 return True
             except Exception as e:
                 log.exception(e)
@@ -288,21 +388,25 @@ class GroupTable:
                 if not group:
                     return None
 
-                group_user_ids = group.user_ids
-                if not group_user_ids or not isinstance(group_user_ids, list):
-                    group_user_ids = []
-
-                group_user_ids = list(set(group_user_ids))  # Deduplicate
+                current_user_ids = {
+                    member.user_id
+                    for member in db.query(GroupMember.user_id).filter_by(group_id=id)
+                }
 
-                for user_id in user_ids:
-                    if user_id not in group_user_ids:
-                        group_user_ids.append(user_id)
+                now = int(time.time())
+                db.add_all(
+                    [
+                        GroupMember(group_id=id, user_id=user_id, created_at=now)
+                        for user_id in dict.fromkeys(user_ids or [])
+                        if user_id not in current_user_ids
+                    ]
+                )
 
-                group.user_ids = group_user_ids
-                group.updated_at = int(time.time())
+                group.updated_at = now
                 db.commit()
+                self.version += 1
                 db.refresh(group)
-                return GroupModel.model_validate(group)
+                return self._get_group_models(db, [group])[0]
         except Exception as e:
             log.exception(e)
             return None
@@ -316,23 +420,18 @@ class GroupTable:
                 if not group:
                     return None
 
-                group_user_ids = group.user_ids
-
-                if not group_user_ids or not isinstance(group_user_ids, list):
-                    return GroupModel.model_validate(group)
-
-                group_user_ids = list(set(group_user_ids))  # Deduplicate
-
-                for user_id in user_ids:
-                    if user_id in group_user_ids:
-                        group_user_ids.remove(user_id)
+                if user_ids:
+                    db.query(GroupMember).filter(
+                        GroupMember.group_id == id,
+                        GroupMember.user_id.in_(user_ids),
+                    ).delete(synchronize_session=False)
 
-                group.user_ids = group_user_ids
                 group.updated_at = int(time.time())
 
                 db.commit()
+                self.version += 1
                 db.refresh(group)
-                return GroupModel.model_validate(group)
+                return self._get_group_models(db, [group])[0]
         except Exception as e:
             log.exception(e)
             return None
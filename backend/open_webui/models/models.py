@@ -3,9 +3,8 @@ import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import AUTHORIZATION_CACHE_TTL, SRC_LOG_LEVELS
 
-from open_webui.models.groups import Groups
 from open_webui.models.users import Users, UserResponse
 
 
@@ -16,7 +15,7 @@ from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy import BigInteger, Column, Text, JSON, Boolean
 
 
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import get_authorization_context, has_access
 
 
 log = logging.getLogger(__name__)
@@ -120,6 +119,17 @@ class ModelModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ModelAccessModel(BaseModel):
+    """The fields of a model that access checks need."""
+
+    id: str
+    user_id: str
+    access_control: Optional[dict] = None
+    is_active: bool = True
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 ####################
 # Forms
 ####################
@@ -144,6 +154,12 @@ class ModelForm(BaseModel):
 
 
 class ModelsTable:
+    def __init__(self):
+        # Bumped on every write made by this process, so the access index
+        # is reloaded immediately rather than when its TTL runs out
+        self.version = 0
+        self._access_index: Optional[tuple[int, float, dict]] = None
+
     def insert_new_model(
         self, form_data: ModelForm, user_id: str
     ) -> Optional[ModelModel]:
@@ -160,6 +176,7 @@ class ModelsTable:
                 result = Model(**model.model_dump())
                 db.add(result)
                 db.commit()
+                self.version += 1
                 db.refresh(result)
 
                 if result:
@@ -207,7 +224,7 @@ class ModelsTable:
         self, user_id: str, permission: str = "write"
     ) -> list[ModelUserResponse]:
         models = self.get_models()
-        user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user_id)}
+        user_group_ids = get_authorization_context(user_id).group_ids
         return [
             model
             for model in models
@@ -215,6 +232,38 @@ class ModelsTable:
             or has_access(user_id, permission, model.access_control, user_group_ids)
         ]
 
+    def get_model_access_index(self) -> dict[str, ModelAccessModel]:
+        """
+        Owner, access control and active flag of every model by id, loaded in
+        one query and reused for AUTHORIZATION_CACHE_TTL seconds.
+        """
+        cached = self._access_index
+        if (
+            cached is not None
+            and cached[0] == self.version
+            and time.monotonic() < cached[1]
+        ):
+            return cached[2]
+
+        # Read the version first, so a write made during the query is not
+        # hidden behind the index it may be missing from
+        version = self.version
+        with get_db() as db:
+            index = {
+                model.id: ModelAccessModel.model_validate(model)
+                for model in db.query(
+                    Model.id, Model.user_id, Model.access_control, Model.is_active
+                )
+            }
+
+        if AUTHORIZATION_CACHE_TTL:
+            self._access_index = (
+                version,
+                time.monotonic() + AUTHORIZATION_CACHE_TTL,
+                index,
+            )
+        return index
+
     def get_model_by_id(self, id: str) -> Optional[ModelModel]:
         try:
             with get_db() as db:
@@ -235,6 +284,7 @@ class ModelsTable:
                     }
                 )
                 db.commit()
+                self.version += 1
 
                 return self.get_model_by_id(id)
             except Exception:
@@ -250,6 +300,7 @@ class ModelsTable:
                     .update(model.model_dump(exclude={"id"}))
                 )
                 db.commit()
+                self.version += 1
 
                 model = db.get(Model, id)
                 db.refresh(model)
@@ -263,6 +314,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                self.version += 1
 
                 return True
         except Exception:
@@ -273,6 +325,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).delete()
                 db.commit()
+                self.version += 1
 
                 return True
         except Exception:
@@ -314,6 +367,7 @@ class ModelsTable:
                         db.delete(model)
 
                 db.commit()
+                self.version += 1
 
                 return [
                     ModelModel.model_validate(model) for model in db.query(Model).all()
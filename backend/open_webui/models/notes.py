@@ -5,8 +5,7 @@ from typing import Optional
 from functools import lru_cache
 
 from open_webui.internal.db import Base, get_db
-from open_webui.models.groups import Groups
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import get_authorization_context, has_access
 from open_webui.models.users import Users, UserResponse
 
 
@@ -136,8 +135,7 @@ class NoteTable:
         limit: Optional[int] = None,
     ) -> list[NoteModel]:
         with get_db() as db:
-            user_groups = Groups.get_groups_by_member_id(user_id)
-            user_group_ids = {group.id for group in user_groups}
+            user_group_ids = get_authorization_context(user_id).group_ids
 
             # Order newest-first. We stream to keep memory usage low.
             query = (
@@ -0,0 +1,524 @@
+import hashlib
+import heapq
+import logging
+import math
+import os
+import pickle
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from open_webui.config import (
+    ENABLE_RAG_BM25_INDEX,
+    RAG_BM25_INDEX_DIR,
+    RAG_BM25_INDEX_CACHE_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.vector.main import GetResult, VectorDBListener
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+BM25_INDEX_VERSION = 1
+
+
+def tokenize(text: str) -> list[str]:
+    # Same default preprocessing as langchain's BM25Retriever
+    return text.split() if text else []
+
+
+class BM25Index:
+    """
+    Incrementally updatable Okapi BM25 inverted index for a single collection.
+
+    Scores match rank_bm25.BM25Okapi (used by langchain's BM25Retriever), but a
+    query only visits the postings of its own terms instead of every document
+    in the collection.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        # id -> (text, metadata, length)
+        self.docs: dict[str, tuple[str, Any, int]] = {}
+        # term -> {id: term frequency}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.total_length = 0
+
+        self._average_idf: Optional[float] = None
+        # Indexes are shared between request threads and vector DB listeners
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, id: str, text: str, metadata: Any = None):
+        with self.lock:
+            if id in self.docs:
+                self.remove(id)
+
+            tokens = tokenize(text)
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[id] = tf
+
+            self.docs[id] = (text, metadata, len(tokens))
+            self.total_length += len(tokens)
+            self._average_idf = None
+
+    def remove(self, id: str) -> bool:
+        with self.lock:
+            doc = self.docs.pop(id, None)
+            if doc is None:
+                return False
+
+            text, _, length = doc
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(id, None)
+                    if not postings:
+                        del self.postings[term]
+
+            self.total_length -= length
+            self._average_idf = None
+            return True
+
+    def remove_where(self, filter: dict) -> int:
+        with self.lock:
+            ids = [
+                id
+                for id, (_, metadata, _) in self.docs.items()
+                if isinstance(metadata, dict)
+                and all(metadata.get(key) == value for key, value in filter.items())
+            ]
+            for id in ids:
+                self.remove(id)
+            return len(ids)
+
+    def _raw_idf(self, doc_freq: int) -> float:
+        n = len(self.docs)
+        return math.log(n - doc_freq + 0.5) - math.log(doc_freq + 0.5)
+
+    def _idf(self, term: str) -> float:
+        postings = self.postings.get(term)
+        if not postings:
+            # rank_bm25 never scores terms missing from the corpus
+            return 0.0
+
+        idf = self._raw_idf(len(postings))
+        if idf < 0:
+            if self._average_idf is None:
+                self._average_idf = sum(
+                    self._raw_idf(len(p)) for p in self.postings.values()
+                ) / len(self.postings)
+            idf = self.epsilon * self._average_idf
+        return idf
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        with self.lock:
+            if not self.docs or k <= 0:
+                return []
+
+            avgdl = self.total_length / len(self.docs) or 1.0
+            scores: dict[str, float] = {}
+
+            for term in tokenize(query):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+
+                idf = self._idf(term)
+                for id, tf in postings.items():
+                    length = self.docs[id][2]
+                    scores[id] = scores.get(id, 0.0) + idf * (
+                        tf
+                        * (self.k1 + 1)
+                        / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+                    )
+
+            return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def get_document(self, id: str) -> tuple[str, Any]:
+        text, metadata, _ = self.docs[id]
+        return text, metadata
+
+    def to_state(self) -> dict:
+        return {
+            "version": BM25_INDEX_VERSION,
+            "params": (self.k1, self.b, self.epsilon),
+            "docs": self.docs,
+            "postings": self.postings,
+            "total_length": self.total_length,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "BM25Index":
+        if state.get("version") != BM25_INDEX_VERSION:
+            raise ValueError(f"Unsupported BM25 index version {state.get('version')}")
+
+        index = cls(*state["params"])
+        index.docs = state["docs"]
+        index.postings = state["postings"]
+        index.total_length = state["total_length"]
+        return index
+
+    @classmethod
+    def from_get_result(cls, result: GetResult) -> "BM25Index":
+        index = cls()
+        if result and result.documents and result.documents[0]:
+            ids = result.ids[0]
+            documents = result.documents[0]
+            metadatas = result.metadatas[0] if result.metadatas else [None] * len(ids)
+            for id, text, metadata in zip(ids, documents, metadatas):
+                index.add(id, text or "", metadata)
+        return index
+
+
+def apply_change(index: BM25Index, change: tuple):
+    """Applies an ("add", items), ("remove", ids) or ("remove_where", filter) change."""
+    kind, value = change
+    if kind == "add":
+        for id, text, metadata in value:
+            index.add(id, text, metadata)
+    elif kind == "remove":
+        for id in value:
+            index.remove(id)
+    elif kind == "remove_where":
+        index.remove_where(value)
+    else:
+        raise ValueError(f"Unknown BM25 index change {kind}")
+
+
+class BM25IndexManager(VectorDBListener):
+    """
+    Keeps one persisted BM25Index per collection in sync with the vector DB.
+
+    Each index is stored under RAG_BM25_INDEX_DIR as a snapshot plus a log of
+    the changes made since, so an insert or delete only appends its own
+    records. The log is compacted into a new snapshot once it outgrows the
+    snapshot. Workers share the files under a per-collection file lock and
+    replay the log entries they have not seen yet. Within a process each
+    collection has its own lock too, so slow I/O on one collection does not
+    hold up the others. Indexes are cached in memory (LRU). Collections
+    without an index are built from a full VECTOR_DB_CLIENT.get() the first
+    time they are queried, once per process even if several requests ask for
+    it at the same time.
+    """
+
+    # Logs smaller than this are never compacted
+    COMPACT_MIN_SIZE = 1024 * 1024
+
+    def __init__(self, directory: str, cache_size: int = 32, enabled: bool = True):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.enabled = enabled
+
+        # collection_name -> (version of the snapshot, log offset replayed, index)
+        self.cache: OrderedDict[str, tuple[tuple, int, BM25Index]] = OrderedDict()
+        # Guards the shared state of the manager, never held during I/O
+        self.lock = threading.RLock()
+        # collection_name -> lock held while its files are read or written
+        self.collection_locks: dict[str, threading.RLock] = {}
+
+        # Bumped on every change, so a build that raced with a change is not persisted
+        self.generations: dict[str, int] = {}
+        self.reset_generation = 0
+        # collection_name -> lock held while its index is built from the vector DB
+        self.build_locks: dict[str, threading.Lock] = {}
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, collection_name: str, extension: str = "pkl") -> str:
+        name = hashlib.sha256(collection_name.encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.{extension}")
+
+    def _version(self, path: str) -> tuple:
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _collection_lock(self, collection_name: str) -> threading.RLock:
+        with self.lock:
+            return self.collection_locks.setdefault(collection_name, threading.RLock())
+
+    @contextmanager
+    def _file_lock(self, collection_name: str, exclusive: bool = True):
+        """Serializes access to a collection's files across processes."""
+        if fcntl is None:
+            # No cross-process locking on this platform
+            yield
+            return
+
+        with open(self._path(collection_name, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _remember(
+        self, collection_name: str, version: tuple, offset: int, index: BM25Index
+    ):
+        with self.lock:
+            self.cache[collection_name] = (version, offset, index)
+            self.cache.move_to_end(collection_name)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _forget(self, collection_name: str):
+        with self.lock:
+            self.cache.pop(collection_name, None)
+
+    def _read(self, collection_name: str) -> Optional[BM25Index]:
+        """Loads the snapshot and replays the log. Needs the collection locks."""
+        path = self._path(collection_name)
+        try:
+            version = self._version(path)
+        except OSError:
+            self._forget(collection_name)
+            return None
+
+        try:
+            log_size = os.path.getsize(self._path(collection_name, "log"))
+        except OSError:
+            log_size = 0
+
+        with self.lock:
+            cached = self.cache.get(collection_name)
+        try:
+            if cached and cached[0] == version and cached[1] <= log_size:
+                _, offset, index = cached
+            else:
+                with open(path, "rb") as f:
+                    index = BM25Index.from_state(pickle.load(f))
+                offset = 0
+
+            if log_size > offset:
+                with open(self._path(collection_name, "log"), "rb") as f:
+                    f.seek(offset)
+                    while f.tell() < log_size:
+                        apply_change(index, pickle.load(f))
+                    offset = f.tell()
+        except Exception as e:
+            log.warning(f"Discarding unreadable BM25 index for {collection_name}: {e}")
+            self._delete_files(collection_name)
+            return None
+
+        self._remember(collection_name, version, offset, index)
+        return index
+
+    def _write(self, collection_name: str, index: BM25Index):
+        """Writes a new snapshot and starts an empty log. Needs the collection locks."""
+        path = self._path(collection_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with index.lock, open(tmp_path, "wb") as f:
+            pickle.dump(index.to_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        try:
+            os.remove(self._path(collection_name, "log"))
+        except FileNotFoundError:
+            pass
+        self._remember(collection_name, self._version(path), 0, index)
+
+    def _delete_files(self, collection_name: str):
+        self._forget(collection_name)
+        for extension in ["pkl", "log"]:
+            try:
+                os.remove(self._path(collection_name, extension))
+            except FileNotFoundError:
+                pass
+
+    def _load(self, collection_name: str) -> Optional[BM25Index]:
+        with self._file_lock(collection_name, exclusive=False):
+            return self._read(collection_name)
+
+    def _remove(self, collection_name: str):
+        with self._file_lock(collection_name):
+            self._delete_files(collection_name)
+
+    def _generation(self, collection_name: str) -> tuple[int, int]:
+        return (self.reset_generation, self.generations.get(collection_name, 0))
+
+    def _bump(self, collection_name: str):
+        with self.lock:
+            self.generations[collection_name] = (
+                self.generations.get(collection_name, 0) + 1
+            )
+
+    def create(self, collection_name: str):
+        """Start an empty index for a new collection; inserts will populate it."""
+        if not self.enabled:
+            return
+        with self._collection_lock(collection_name), self._file_lock(collection_name):
+            # Concurrent ingestions may all see a new collection, keep the first
+            # index so inserts already applied to it are not lost
+            if self._read(collection_name) is None:
+                self._write(collection_name, BM25Index())
+
+    def _build(self, collection_name: str) -> Optional[BM25Index]:
+        log.debug(f"building BM25 index for {collection_name}")
+        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        if result is None:
+            return None
+        return BM25Index.from_get_result(result)
+
+    def get_index(self, collection_name: str) -> Optional[BM25Index]:
+        """
+        Return the BM25 index for a collection, building and persisting it from
+        the vector DB if it does not exist yet. Returns None if the collection
+        cannot be read.
+        """
+        if not self.enabled:
+            return self._build(collection_name)
+
+        collection_lock = self._collection_lock(collection_name)
+        with collection_lock:
+            index = self._load(collection_name)
+            if index is not None:
+                return index
+        with self.lock:
+            build_lock = self.build_locks.setdefault(collection_name, threading.Lock())
+
+        with build_lock:
+            with collection_lock:
+                # Another request may have built it while we were waiting
+                index = self._load(collection_name)
+                if index is not None:
+                    return index
+                generation = self._generation(collection_name)
+
+            index = self._build(collection_name)
+            if index is not None:
+                with collection_lock:
+                    if self._generation(collection_name) == generation:
+                        with self._file_lock(collection_name):
+                            # Keep an index another worker persisted meanwhile
+                            existing = self._read(collection_name)
+                            if existing is not None:
+                                return existing
+                            self._write(collection_name, index)
+            return index
+
+    def get_indexes(
+        self, collection_names: list[str]
+    ) -> dict[str, Optional[BM25Index]]:
+        """
+        Return the BM25 indexes of several collections. Indexes that have to be
+        built are fetched from the vector DB concurrently. Collections that
+        cannot be read map to None.
+        """
+
+        def get_index(collection_name: str) -> Optional[BM25Index]:
+            try:
+                return self.get_index(collection_name)
+            except Exception as e:
+                log.exception(f"Failed to fetch collection {collection_name}: {e}")
+                return None
+
+        indexes: dict[str, Optional[BM25Index]] = {}
+        for collection_name in collection_names:
+            if self.enabled:
+                with self._collection_lock(collection_name):
+                    indexes[collection_name] = self._load(collection_name)
+            else:
+                indexes[collection_name] = None
+
+        missing = [name for name, index in indexes.items() if index is None]
+        if len(missing) == 1:
+            indexes[missing[0]] = get_index(missing[0])
+        elif missing:
+            with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as executor:
+                indexes.update(zip(missing, executor.map(get_index, missing)))
+        return indexes
+
+    def _update(self, collection_name: str, change: tuple):
+        if not self.enabled:
+            return
+        with self._collection_lock(collection_name):
+            self._bump(collection_name)
+            with self._file_lock(collection_name):
+                # Catches up with the changes of other workers first
+                index = self._read(collection_name)
+                if index is None:
+                    # No index yet, it will be built from the full collection on first use
+                    return
+                apply_change(index, change)
+
+                with open(self._path(collection_name, "log"), "ab") as f:
+                    pickle.dump(change, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    offset = f.tell()
+
+                version = self._version(self._path(collection_name))
+                if offset > max(version[2], self.COMPACT_MIN_SIZE):
+                    self._write(collection_name, index)
+                else:
+                    self._remember(collection_name, version, offset, index)
+
+    def on_insert(self, collection_name: str, items: list):
+        self._update(
+            collection_name,
+            (
+                "add",
+                [(item["id"], item["text"], item["metadata"]) for item in items],
+            ),
+        )
+
+    def on_delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        if not ids and not filter:
+            return
+
+        if filter and any(key.startswith("$") for key in filter):
+            # Operator filters are not evaluated locally, rebuild on next use
+            with self._collection_lock(collection_name):
+                self._bump(collection_name)
+                self._remove(collection_name)
+            return
+
+        if ids:
+            self._update(collection_name, ("remove", list(ids)))
+        else:
+            self._update(collection_name, ("remove_where", filter))
+
+    def on_delete_collection(self, collection_name: str):
+        with self._collection_lock(collection_name):
+            self._bump(collection_name)
+            self._remove(collection_name)
+
+    def on_reset(self):
+        with self.lock:
+            self.reset_generation += 1
+            self.cache.clear()
+            collection_locks = list(self.collection_locks.items())
+
+        # Wait for the writes in progress, which may predate the reset
+        for collection_name, collection_lock in collection_locks:
+            with collection_lock:
+                self._remove(collection_name)
+
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.endswith((".pkl", ".log")):
+                    try:
+                        os.remove(os.path.join(self.directory, filename))
+                    except FileNotFoundError:
+                        pass
+
+
+BM25_INDEXES = BM25IndexManager(
+    RAG_BM25_INDEX_DIR,
+    cache_size=RAG_BM25_INDEX_CACHE_SIZE,
+    enabled=ENABLE_RAG_BM25_INDEX,
+)
+VECTOR_DB_CLIENT.add_listener(BM25_INDEXES)
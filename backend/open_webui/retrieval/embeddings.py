@@ -0,0 +1,387 @@
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import aiohttp
+
+from open_webui.config import (
+    RAG_EMBEDDING_CONCURRENT_REQUESTS,
+    RAG_EMBEDDING_MAX_RETRIES,
+    RAG_EMBEDDING_POOL_SIZE,
+    ENABLE_RAG_EMBEDDING_CACHE,
+    RAG_EMBEDDING_CACHE_SIZE,
+    ENABLE_RAG_EMBEDDING_CACHE_REDIS,
+    RAG_EMBEDDING_CACHE_REDIS_TTL,
+)
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_TIMEOUT,
+    REDIS_URL,
+    REDIS_CLUSTER,
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Bounds in-flight requests to a single embedding endpoint.
+
+    The limit is halved whenever the provider throttles (HTTP 429) and grows
+    back by one after a full window of successful requests (AIMD). A 429 also
+    puts the whole endpoint into a shared cooldown so that every pending batch
+    backs off, not just the one that was rejected.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self.successes = 0
+        self.cooldown_until = 0.0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+        delay = self.cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self, throttled: bool = False, retry_after: float = 0.0):
+        async with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.successes = 0
+                self.limit = max(1, self.limit // 2)
+                self.cooldown_until = max(
+                    self.cooldown_until, time.monotonic() + retry_after
+                )
+            else:
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.max_limit:
+                    self.successes = 0
+                    self.limit += 1
+            self.condition.notify_all()
+
+
+class EmbeddingClient:
+    """
+    Shared asyncio HTTP client for the Ollama, OpenAI and Azure OpenAI embedding
+    engines.
+
+    All requests go through one keep-alive aiohttp session that lives on a
+    dedicated event loop thread, so synchronous callers (document ingestion,
+    retrieval worker threads) can submit many batches concurrently through
+    `run` without owning an event loop themselves.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        pool_size: int = 100,
+        timeout: Optional[int] = None,
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.limiters: dict[str, AdaptiveConcurrencyLimiter] = {}
+        self.lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None or self.loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="embedding-client", daemon=True
+                ).start()
+                self.loop = loop
+            return self.loop
+
+    def run(self, coro: Awaitable) -> Any:
+        """Run a coroutine on the client loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trust_env=True,
+            )
+        return self.session
+
+    def _get_limiter(self, url: str) -> AdaptiveConcurrencyLimiter:
+        endpoint = url.split("?")[0]
+        if endpoint not in self.limiters:
+            self.limiters[endpoint] = AdaptiveConcurrencyLimiter(self.concurrency)
+        return self.limiters[endpoint]
+
+    async def _post(self, url: str, headers: dict, json: dict) -> dict:
+        limiter = self._get_limiter(url)
+
+        for attempt in range(self.max_retries + 1):
+            backoff = min(2**attempt, 30) + random.uniform(0, 1)
+
+            await limiter.acquire()
+            throttled = False
+            try:
+                async with self._get_session().post(
+                    url, headers=headers, json=json
+                ) as r:
+                    if (
+                        r.status in RETRYABLE_STATUS_CODES
+                        and attempt < self.max_retries
+                    ):
+                        throttled = r.status == 429
+                        retry_after = r.headers.get("Retry-After")
+                        if retry_after:
+                            try:
+                                backoff = float(retry_after)
+                            except ValueError:
+                                pass
+                        log.warning(
+                            f"Embedding request to {url} returned {r.status}, retrying in {backoff:.1f}s"
+                        )
+                    else:
+                        r.raise_for_status()
+                        return await r.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise e
+                log.warning(
+                    f"Embedding request to {url} failed ({e}), retrying in {backoff:.1f}s"
+                )
+            finally:
+                await limiter.release(
+                    throttled=throttled, retry_after=backoff if throttled else 0.0
+                )
+
+            if not throttled:
+                # Throttled requests wait on the shared cooldown in acquire()
+                await asyncio.sleep(backoff)
+
+        raise Exception(f"Embedding request to {url} failed after retries")
+
+    async def post(self, url: str, headers: dict, json: dict) -> dict:
+        """POST an embedding request, retrying on throttling and transient errors."""
+        if asyncio.get_running_loop() is not self.loop:
+            return await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(
+                    self._post(url, headers, json), self._get_loop()
+                )
+            )
+        return await self._post(url, headers, json)
+
+    async def _close_session(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.limiters = {}
+
+    def shutdown(self):
+        """Close the connection pool and stop the client loop."""
+        with self.lock:
+            loop, self.loop = self.loop, None
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+EMBEDDING_CLIENT = EmbeddingClient(
+    concurrency=RAG_EMBEDDING_CONCURRENT_REQUESTS,
+    max_retries=RAG_EMBEDDING_MAX_RETRIES,
+    pool_size=RAG_EMBEDDING_POOL_SIZE,
+    timeout=AIOHTTP_CLIENT_TIMEOUT,
+)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embedding vectors.
+
+    Entries are keyed by (engine, model, prefix, sha256(text)) so identical
+    chunks and queries are embedded once no matter which collection they end
+    up in. Vectors are kept in an in-memory LRU and, optionally, in Redis so
+    that all workers share them.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        redis=None,
+        redis_ttl: Optional[int] = None,
+        enabled: bool = True,
+    ):
+        self.max_size = max_size
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+        self.enabled = enabled
+
+        self.entries: OrderedDict[str, array] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(engine: str, model: str, prefix: Optional[str], text: str) -> str:
+        text_hash = hashlib.sha256(text.encode()).hexdigest()
+        return f"{engine}:{model}:{prefix or ''}:{text_hash}"
+
+    def _remember(self, key: str, vector: array):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = vector
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> list[Optional[list[float]]]:
+        results: list[Optional[list[float]]] = [None] * len(keys)
+        missing = []
+
+        with self.lock:
+            for idx, key in enumerate(keys):
+                vector = self.entries.get(key)
+                if vector is not None:
+                    self.entries.move_to_end(key)
+                    results[idx] = vector.tolist()
+                else:
+                    missing.append(idx)
+
+        if missing and self.redis is not None:
+            try:
+                values = self.redis.mget(
+                    [f"{REDIS_KEY_PREFIX}:embeddings:{keys[idx]}" for idx in missing]
+                )
+                for idx, value in zip(list(missing), values):
+                    if value is not None:
+                        vector = array("d")
+                        vector.frombytes(value)
+                        self._remember(keys[idx], vector)
+                        results[idx] = vector.tolist()
+                        missing.remove(idx)
+                with self.lock:
+                    self.redis_hits += len(values) - values.count(None)
+            except Exception as e:
+                log.warning(f"Embedding cache Redis lookup failed: {e}")
+
+        with self.lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return results
+
+    def set_many(self, keys: list[str], vectors: list[list[float]]):
+        packed = [array("d", vector) for vector in vectors]
+        for key, vector in zip(keys, packed):
+            self._remember(key, vector)
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for key, vector in zip(keys, packed):
+                    pipe.set(
+                        f"{REDIS_KEY_PREFIX}:embeddings:{key}",
+                        vector.tobytes(),
+                        ex=self.redis_ttl,
+                    )
+                pipe.execute()
+            except Exception as e:
+                log.warning(f"Embedding cache Redis write failed: {e}")
+
+    def wrap(self, func: Callable, engine: str, model: str) -> Callable:
+        """
+        Wrap an embedding function (query, prefix=None, user=None) so that only
+        texts missing from the cache are sent to it.
+        """
+        if not self.enabled:
+            return func
+
+        def cached_embedding_function(query, prefix=None, user=None):
+            texts = query if isinstance(query, list) else [query]
+            keys = [self.get_key(engine, model, prefix, text) for text in texts]
+            embeddings = self.get_many(keys)
+
+            # Identical texts within one call are only embedded once
+            missing: dict[str, list[int]] = {}
+            for idx, vector in enumerate(embeddings):
+                if vector is None:
+                    missing.setdefault(keys[idx], []).append(idx)
+
+            if missing:
+                missing_keys = list(missing.keys())
+                computed = func(
+                    [texts[missing[key][0]] for key in missing_keys],
+                    prefix=prefix,
+                    user=user,
+                )
+                if not isinstance(computed, list) or len(computed) != len(missing_keys):
+                    # Failed, don't retry the whole input against a failing engine
+                    log.warning(
+                        "Embedding function returned an unexpected number of vectors, skipping cache"
+                    )
+                    return None
+
+                self.set_many(missing_keys, computed)
+                for key, vector in zip(missing_keys, computed):
+                    for idx in missing[key]:
+                        embeddings[idx] = vector
+
+            return embeddings if isinstance(query, list) else embeddings[0]
+
+        return cached_embedding_function
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+        }
+
+
+EMBEDDING_CACHE = EmbeddingCache(
+    max_size=RAG_EMBEDDING_CACHE_SIZE,
+    redis=(
+        get_redis_connection(
+            redis_url=REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+            ),
+            redis_cluster=REDIS_CLUSTER,
+            decode_responses=False,
+        )
+        if ENABLE_RAG_EMBEDDING_CACHE_REDIS and REDIS_URL
+        else None
+    ),
+    redis_ttl=RAG_EMBEDDING_CACHE_REDIS_TTL,
+    enabled=ENABLE_RAG_EMBEDDING_CACHE,
+)
@@ -1,21 +1,24 @@
+import asyncio
 import logging
 import os
-from typing import Optional, Union
+from typing import Optional, Sequence, Union
 
-import requests
-import hashlib
+import heapq
 from concurrent.futures import ThreadPoolExecutor
-import time
+from operator import itemgetter
 import re
 
+import numpy as np
+
 from urllib.parse import quote
 from huggingface_hub import snapshot_download
-from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+from langchain.retrievers import EnsembleRetriever
 from langchain_core.documents import Document
 
 from open_webui.config import VECTOR_DB
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEXES, BM25Index
+from open_webui.retrieval.embeddings import EMBEDDING_CACHE, EMBEDDING_CLIENT
 
 
 from open_webui.models.users import UserModel
@@ -25,7 +28,6 @@ from open_webui.models.knowledge import Knowledges
 from open_webui.models.chats import Chats
 from open_webui.models.notes import Notes
 
-from open_webui.retrieval.vector.main import GetResult
 from open_webui.utils.access_control import has_access
 from open_webui.utils.misc import get_message_list
 
@@ -86,6 +88,7 @@ class VectorSearchRetriever(BaseRetriever):
     collection_name: Any
     embedding_function: Any
     top_k: int
+    query_embedding: Optional[list] = None
 
     def _get_relevant_documents(
         self,
@@ -95,7 +98,10 @@ class VectorSearchRetriever(BaseRetriever):
     ) -> list[Document]:
         result = VECTOR_DB_CLIENT.search(
             collection_name=self.collection_name,
-            vectors=[self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)],
+            vectors=[
+                self.query_embedding
+                or self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
+            ],
             limit=self.top_k,
         )
 
@@ -107,6 +113,7 @@ class VectorSearchRetriever(BaseRetriever):
         for idx in range(len(ids)):
             results.append(
                 Document(
+                    id=ids[idx],
                     metadata=metadatas[idx],
                     page_content=documents[idx],
                 )
@@ -114,6 +121,29 @@ class VectorSearchRetriever(BaseRetriever):
         return results
 
 
+class BM25IndexRetriever(BaseRetriever):
+    index: Any
+    k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        results = []
+        for id, _ in self.index.search(query, self.k):
+            text, metadata = self.index.get_document(id)
+            results.append(
+                Document(
+                    id=id,
+                    metadata=dict(metadata) if metadata else {},
+                    page_content=text,
+                )
+            )
+        return results
+
+
 def query_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
@@ -148,9 +178,69 @@ def get_doc(collection_name: str, user: UserModel = None):
         raise e
 
 
+def get_hybrid_search_candidates(
+    collection_name: str,
+    bm25_index: BM25Index,
+    query: str,
+    embedding_function,
+    k: int,
+    hybrid_bm25_weight: float,
+    query_embedding: Optional[list] = None,
+) -> list[Document]:
+    bm25_retriever = BM25IndexRetriever(index=bm25_index, k=k)
+    vector_search_retriever = VectorSearchRetriever(
+        collection_name=collection_name,
+        embedding_function=embedding_function,
+        top_k=k,
+        query_embedding=query_embedding,
+    )
+
+    if hybrid_bm25_weight <= 0:
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[vector_search_retriever], weights=[1.0]
+        )
+    elif hybrid_bm25_weight >= 1:
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[bm25_retriever], weights=[1.0]
+        )
+    else:
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[bm25_retriever, vector_search_retriever],
+            weights=[hybrid_bm25_weight, 1.0 - hybrid_bm25_weight],
+        )
+
+    return ensemble_retriever.invoke(query)
+
+
+def get_hybrid_search_result(
+    documents: Sequence[Document], k: int, k_reranker: int
+) -> dict:
+    distances = [d.metadata.get("score") for d in documents]
+    metadatas = [d.metadata for d in documents]
+    documents = [d.page_content for d in documents]
+
+    # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
+    if k < k_reranker:
+        sorted_items = sorted(
+            zip(distances, documents, metadatas), key=lambda x: x[0], reverse=True
+        )
+        sorted_items = sorted_items[:k]
+
+        if sorted_items:
+            distances, documents, metadatas = map(list, zip(*sorted_items))
+        else:
+            distances, documents, metadatas = [], [], []
+
+    return {
+        "distances": [distances],
+        "documents": [documents],
+        "metadatas": [metadatas],
+    }
+
+
 def query_doc_with_hybrid_search(
     collection_name: str,
-    collection_result: GetResult,
+    bm25_index: Optional[BM25Index],
     query: str,
     embedding_function,
     k: int,
@@ -160,78 +250,39 @@ def query_doc_with_hybrid_search(
     hybrid_bm25_weight: float,
 ) -> dict:
     try:
-        if (
-            not collection_result
-            or not hasattr(collection_result, "documents")
-            or not collection_result.documents
-            or len(collection_result.documents) == 0
-            or not collection_result.documents[0]
-        ):
+        if bm25_index is None:
             log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
             return {"documents": [], "metadatas": [], "distances": []}
 
         log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
 
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=collection_result.documents[0],
-            metadatas=collection_result.metadatas[0],
-        )
-        bm25_retriever.k = k
+        # Embed the query once, it is shared by vector search and similarity scoring
+        query_embedding = None
+        if hybrid_bm25_weight < 1 or reranking_function is None:
+            query_embedding = embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
 
-        vector_search_retriever = VectorSearchRetriever(
+        documents = get_hybrid_search_candidates(
             collection_name=collection_name,
+            bm25_index=bm25_index,
+            query=query,
             embedding_function=embedding_function,
-            top_k=k,
+            k=k,
+            hybrid_bm25_weight=hybrid_bm25_weight,
+            query_embedding=query_embedding,
         )
 
-        if hybrid_bm25_weight <= 0:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[vector_search_retriever], weights=[1.0]
-            )
-        elif hybrid_bm25_weight >= 1:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever], weights=[1.0]
-            )
-        else:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever, vector_search_retriever],
-                weights=[hybrid_bm25_weight, 1.0 - hybrid_bm25_weight],
-            )
-
         compressor = RerankCompressor(
             embedding_function=embedding_function,
             top_n=k_reranker,
             reranking_function=reranking_function,
             r_score=r,
+            collection_name=collection_name,
+            query_embedding=query_embedding,
         )
+        if documents:
+            documents = compressor.compress_documents(documents, query)
 
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor, base_retriever=ensemble_retriever
-        )
-
-        result = compression_retriever.invoke(query)
-
-        distances = [d.metadata.get("score") for d in result]
-        documents = [d.page_content for d in result]
-        metadatas = [d.metadata for d in result]
-
-        # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
-        if k < k_reranker:
-            sorted_items = sorted(
-                zip(distances, metadatas, documents), key=lambda x: x[0], reverse=True
-            )
-            sorted_items = sorted_items[:k]
-
-            if sorted_items:
-                distances, documents, metadatas = map(list, zip(*sorted_items))
-            else:
-                distances, documents, metadatas = [], [], []
-
-        result = {
-            "distances": [distances],
-            "documents": [documents],
-            "metadatas": [metadatas],
-        }
+        result = get_hybrid_search_result(documents, k, k_reranker)
 
         log.info(
             "query_doc_with_hybrid_search:result "
@@ -265,8 +316,9 @@ def merge_get_results(get_results: list[dict]) -> dict:
 
 
 def merge_and_sort_query_results(query_results: list[dict], k: int) -> dict:
-    # Initialize lists to store combined data
-    combined = dict()  # To store documents with unique document hashes
+    # Keep the best distance per unique document. Python strings cache their
+    # hash, so keying by the text itself avoids re-hashing every document.
+    combined = dict()
 
     for data in query_results:
         if (
@@ -282,25 +334,16 @@ def merge_and_sort_query_results(query_results: list[dict], k: int) -> dict:
 
         for distance, document, metadata in zip(distances, documents, metadatas):
             if isinstance(document, str):
-                doc_hash = hashlib.sha256(
-                    document.encode()
-                ).hexdigest()  # Compute a hash for uniqueness
+                best = combined.get(document)
+                # if doc is new, or already in but the new distance is better
+                if best is None or distance > best[0]:
+                    combined[document] = (distance, document, metadata)
 
-                if doc_hash not in combined.keys():
-                    combined[doc_hash] = (distance, document, metadata)
-                    continue  # if doc is new, no further comparison is needed
+    # Only the top k need ordering, same result as a full stable sort
+    top = heapq.nlargest(k, combined.values(), key=itemgetter(0)) if k > 0 else []
 
-                # if doc is alredy in, but new distance is better, update
-                if distance > combined[doc_hash][0]:
-                    combined[doc_hash] = (distance, document, metadata)
-
-    combined = list(combined.values())
-    # Sort the list based on distances
-    combined.sort(key=lambda x: x[0], reverse=True)
-
-    # Slice to keep only the top k elements
     sorted_distances, sorted_documents, sorted_metadatas = (
-        zip(*combined[:k]) if combined else ([], [], [])
+        zip(*top) if top else ([], [], [])
     )
 
     # Create and return the output dictionary
@@ -380,6 +423,61 @@ def query_collection(
     return merge_and_sort_query_results(results, k=k)
 
 
+def rerank_hybrid_search_candidates(
+    candidates: list[tuple[str, list[Document]]],
+    reranking_function,
+    k: int,
+    k_reranker: int,
+    r: float,
+) -> list[dict]:
+    """
+    Rerank the (query, documents) candidates of every hybrid search task with
+    one reranking call per distinct query, so the model scores one batch per
+    query instead of one small batch per collection and query. Rerankers such
+    as ColBERT and the external API score a whole batch against its first
+    query, so batches never mix queries. Identical documents are scored once.
+    """
+    pairs = {}
+    for query, documents in candidates:
+        texts = pairs.setdefault(query, {})
+        for doc in documents:
+            texts.setdefault(doc.page_content, len(texts))
+
+    log.debug(
+        f"rerank_hybrid_search_candidates: scoring {len(pairs)} queries for {len(candidates)} tasks"
+    )
+    scores = {}
+    for query, texts in pairs.items():
+        if not texts:
+            continue
+        query_scores = reranking_function([(query, text) for text in texts])
+        if query_scores is not None and not isinstance(query_scores, list):
+            query_scores = query_scores.tolist()
+        scores[query] = query_scores
+
+    compressor = RerankCompressor(
+        embedding_function=None,
+        top_n=k_reranker,
+        reranking_function=reranking_function,
+        r_score=r,
+    )
+
+    results = []
+    for query, documents in candidates:
+        if documents:
+            query_scores = scores[query]
+            documents = compressor.rank_documents(
+                documents,
+                (
+                    [query_scores[pairs[query][doc.page_content]] for doc in documents]
+                    if query_scores is not None
+                    else None
+                ),
+            )
+        results.append(get_hybrid_search_result(documents, k, k_reranker))
+    return results
+
+
 def query_collection_with_hybrid_search(
     collection_names: list[str],
     queries: list[str],
@@ -392,20 +490,12 @@ def query_collection_with_hybrid_search(
 ) -> dict:
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
-    # Avoid fetching the same data multiple times later
-    collection_results = {}
-    for collection_name in collection_names:
-        try:
-            log.debug(
-                f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
-            )
-            collection_results[collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=collection_name
-            )
-        except Exception as e:
-            log.exception(f"Failed to fetch collection {collection_name}: {e}")
-            collection_results[collection_name] = None
+    # Load the persisted BM25 index once per collection
+    # Collections without an index yet are fetched concurrently
+    log.debug(
+        f"query_collection_with_hybrid_search:BM25_INDEXES.get_indexes:collections {collection_names}"
+    )
+    bm25_indexes = BM25_INDEXES.get_indexes(list(collection_names))
 
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
@@ -413,17 +503,33 @@ def query_collection_with_hybrid_search(
 
     def process_query(collection_name, query):
         try:
-            result = query_doc_with_hybrid_search(
-                collection_name=collection_name,
-                collection_result=collection_results[collection_name],
-                query=query,
-                embedding_function=embedding_function,
-                k=k,
-                reranking_function=reranking_function,
-                k_reranker=k_reranker,
-                r=r,
-                hybrid_bm25_weight=hybrid_bm25_weight,
-            )
+            if reranking_function is None:
+                result = query_doc_with_hybrid_search(
+                    collection_name=collection_name,
+                    bm25_index=bm25_indexes[collection_name],
+                    query=query,
+                    embedding_function=embedding_function,
+                    k=k,
+                    reranking_function=reranking_function,
+                    k_reranker=k_reranker,
+                    r=r,
+                    hybrid_bm25_weight=hybrid_bm25_weight,
+                )
+            else:
+                # Only retrieve candidates, they are reranked together below
+                result = get_hybrid_search_candidates(
+                    collection_name=collection_name,
+                    bm25_index=bm25_indexes[collection_name],
+                    query=query,
+                    embedding_function=embedding_function,
+                    k=k,
+                    hybrid_bm25_weight=hybrid_bm25_weight,
+                    query_embedding=(
+                        embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
+                        if hybrid_bm25_weight < 1
+                        else None
+                    ),
+                )
             return result, None
         except Exception as e:
             log.exception(f"Error when querying the collection with hybrid_search: {e}")
@@ -434,7 +540,7 @@ def query_collection_with_hybrid_search(
     tasks = [
         (cn, q)
         for cn in collection_names
-        if collection_results[cn] is not None
+        if bm25_indexes[cn] is not None
         for q in queries
     ]
 
@@ -442,6 +548,28 @@ def query_collection_with_hybrid_search(
         future_results = [executor.submit(process_query, cn, q) for cn, q in tasks]
         task_results = [future.result() for future in future_results]
 
+    if reranking_function is not None:
+        candidates = [
+            (query, result)
+            for (_, query), (result, err) in zip(tasks, task_results)
+            if err is None
+        ]
+        try:
+            reranked = iter(
+                rerank_hybrid_search_candidates(
+                    candidates, reranking_function, k, k_reranker, r
+                )
+            )
+        except Exception as e:
+            log.exception(f"Error when reranking hybrid search results: {e}")
+            raise Exception(
+                "Hybrid search failed for all collections. Using Non-hybrid search as fallback."
+            )
+        task_results = [
+            (next(reranked), None) if err is None else (None, err)
+            for _, err in task_results
+        ]
+
     for result, err in task_results:
         if err is not None:
             error = True
@@ -466,11 +594,15 @@ def get_embedding_function(
     azure_api_version=None,
 ):
     if embedding_engine == "":
-        return lambda query, prefix=None, user=None: embedding_function.encode(
-            query, **({"prompt": prefix} if prefix else {})
-        ).tolist()
+        return EMBEDDING_CACHE.wrap(
+            lambda query, prefix=None, user=None: embedding_function.encode(
+                query, **({"prompt": prefix} if prefix else {})
+            ).tolist(),
+            embedding_engine,
+            embedding_model,
+        )
     elif embedding_engine in ["ollama", "openai", "azure_openai"]:
-        func = lambda query, prefix=None, user=None: generate_embeddings(
+        func = lambda query, prefix=None, user=None: agenerate_embeddings(
             engine=embedding_engine,
             model=embedding_model,
             text=query,
@@ -481,24 +613,34 @@ def get_embedding_function(
             azure_api_version=azure_api_version,
         )
 
-        def generate_multiple(query, prefix, user, func):
+        async def generate_multiple(query, prefix, user, func):
             if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    batch_embeddings = func(
-                        query[i : i + embedding_batch_size],
-                        prefix=prefix,
-                        user=user,
-                    )
+                # Batches are sent concurrently, bounded by the embedding client
+                batches = await asyncio.gather(
+                    *[
+                        func(
+                            query[i : i + embedding_batch_size],
+                            prefix=prefix,
+                            user=user,
+                        )
+                        for i in range(0, len(query), embedding_batch_size)
+                    ]
+                )
 
+                embeddings = []
+                for batch_embeddings in batches:
                     if isinstance(batch_embeddings, list):
                         embeddings.extend(batch_embeddings)
                 return embeddings
             else:
-                return func(query, prefix, user)
-
-        return lambda query, prefix=None, user=None: generate_multiple(
-            query, prefix, user, func
+                return await func(query, prefix, user)
+
+        return EMBEDDING_CACHE.wrap(
+            lambda query, prefix=None, user=None: EMBEDDING_CLIENT.run(
+                generate_multiple(query, prefix, user, func)
+            ),
+            embedding_engine,
+            embedding_model,
         )
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
@@ -836,7 +978,20 @@ def get_model_path(model: str, update_model: bool = False):
         return model
 
 
-def generate_openai_batch_embeddings(
+def get_embedding_headers(user: UserModel = None) -> dict:
+    return (
+        {
+            "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+            "X-OpenWebUI-User-Id": user.id,
+            "X-OpenWebUI-User-Email": user.email,
+            "X-OpenWebUI-User-Role": user.role,
+        }
+        if ENABLE_FORWARD_USER_INFO_HEADERS and user
+        else {}
+    )
+
+
+async def agenerate_openai_batch_embeddings(
     model: str,
     texts: list[str],
     url: str = "https://api.openai.com/v1",
@@ -852,36 +1007,25 @@ def generate_openai_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        r = requests.post(
+        data = await EMBEDDING_CLIENT.post(
             f"{url}/embeddings",
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {key}",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                    else {}
-                ),
+                **get_embedding_headers(user),
             },
             json=json_data,
         )
-        r.raise_for_status()
-        data = r.json()
         if "data" in data:
             return [elem["embedding"] for elem in data["data"]]
         else:
-            raise "Something went wrong :/"
+            raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating openai batch embeddings: {e}")
         return None
 
 
-def generate_azure_openai_batch_embeddings(
+async def agenerate_azure_openai_batch_embeddings(
     model: str,
     texts: list[str],
     url: str,
@@ -898,44 +1042,25 @@ def generate_azure_openai_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        url = f"{url}/openai/deployments/{model}/embeddings?api-version={version}"
-
-        for _ in range(5):
-            r = requests.post(
-                url,
-                headers={
-                    "Content-Type": "application/json",
-                    "api-key": key,
-                    **(
-                        {
-                            "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                            "X-OpenWebUI-User-Id": user.id,
-                            "X-OpenWebUI-User-Email": user.email,
-                            "X-OpenWebUI-User-Role": user.role,
-                        }
-                        if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                        else {}
-                    ),
-                },
-                json=json_data,
-            )
-            if r.status_code == 429:
-                retry = float(r.headers.get("Retry-After", "1"))
-                time.sleep(retry)
-                continue
-            r.raise_for_status()
-            data = r.json()
-            if "data" in data:
-                return [elem["embedding"] for elem in data["data"]]
-            else:
-                raise Exception("Something went wrong :/")
-        return None
+        data = await EMBEDDING_CLIENT.post(
+            f"{url}/openai/deployments/{model}/embeddings?api-version={version}",
+            headers={
+                "Content-Type": "application/json",
+                "api-key": key,
+                **get_embedding_headers(user),
+            },
+            json=json_data,
+        )
+        if "data" in data:
+            return [elem["embedding"] for elem in data["data"]]
+        else:
+            raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating azure openai batch embeddings: {e}")
         return None
 
 
-def generate_ollama_batch_embeddings(
+async def agenerate_ollama_batch_embeddings(
     model: str,
     texts: list[str],
     url: str,
@@ -951,37 +1076,42 @@ def generate_ollama_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        r = requests.post(
+        data = await EMBEDDING_CLIENT.post(
             f"{url}/api/embed",
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {key}",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS
-                    else {}
-                ),
+                **get_embedding_headers(user),
             },
             json=json_data,
         )
-        r.raise_for_status()
-        data = r.json()
 
         if "embeddings" in data:
             return data["embeddings"]
         else:
-            raise "Something went wrong :/"
+            raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating ollama batch embeddings: {e}")
         return None
 
 
-def generate_embeddings(
+def generate_openai_batch_embeddings(*args, **kwargs) -> Optional[list[list[float]]]:
+    return EMBEDDING_CLIENT.run(agenerate_openai_batch_embeddings(*args, **kwargs))
+
+
+def generate_azure_openai_batch_embeddings(
+    *args, **kwargs
+) -> Optional[list[list[float]]]:
+    return EMBEDDING_CLIENT.run(
+        agenerate_azure_openai_batch_embeddings(*args, **kwargs)
+    )
+
+
+def generate_ollama_batch_embeddings(*args, **kwargs) -> Optional[list[list[float]]]:
+    return EMBEDDING_CLIENT.run(agenerate_ollama_batch_embeddings(*args, **kwargs))
+
+
+async def agenerate_embeddings(
     engine: str,
     model: str,
     text: Union[str, list[str]],
@@ -999,7 +1129,7 @@ def generate_embeddings(
             text = f"{prefix}{text}"
 
     if engine == "ollama":
-        embeddings = generate_ollama_batch_embeddings(
+        embeddings = await agenerate_ollama_batch_embeddings(
             **{
                 "model": model,
                 "texts": text if isinstance(text, list) else [text],
@@ -1011,13 +1141,13 @@ def generate_embeddings(
         )
         return embeddings[0] if isinstance(text, str) else embeddings
     elif engine == "openai":
-        embeddings = generate_openai_batch_embeddings(
+        embeddings = await agenerate_openai_batch_embeddings(
             model, text if isinstance(text, list) else [text], url, key, prefix, user
         )
         return embeddings[0] if isinstance(text, str) else embeddings
     elif engine == "azure_openai":
         azure_api_version = kwargs.get("azure_api_version", "")
-        embeddings = generate_azure_openai_batch_embeddings(
+        embeddings = await agenerate_azure_openai_batch_embeddings(
             model,
             text if isinstance(text, list) else [text],
             url,
@@ -1029,6 +1159,18 @@ def generate_embeddings(
         return embeddings[0] if isinstance(text, str) else embeddings
 
 
+def generate_embeddings(
+    engine: str,
+    model: str,
+    text: Union[str, list[str]],
+    prefix: Union[str, None] = None,
+    **kwargs,
+):
+    return EMBEDDING_CLIENT.run(
+        agenerate_embeddings(engine, model, text, prefix, **kwargs)
+    )
+
+
 import operator
 from typing import Optional, Sequence
 
@@ -1036,22 +1178,68 @@ from langchain_core.callbacks import Callbacks
 from langchain_core.documents import BaseDocumentCompressor, Document
 
 
+def cosine_similarity(query_embedding, document_embeddings) -> np.ndarray:
+    query = np.asarray(query_embedding, dtype=np.float32)
+    documents = np.asarray(document_embeddings, dtype=np.float32)
+
+    query_norm = np.linalg.norm(query) or 1.0
+    document_norms = np.linalg.norm(documents, axis=1)
+    document_norms[document_norms == 0] = 1.0
+
+    return (documents @ query) / (document_norms * query_norm)
+
+
 class RerankCompressor(BaseDocumentCompressor):
     embedding_function: Any
     top_n: int
     reranking_function: Any
     r_score: float
+    collection_name: Optional[str] = None
+    query_embedding: Optional[list] = None
 
     class Config:
         extra = "forbid"
         arbitrary_types_allowed = True
 
+    def get_document_embeddings(self, documents: Sequence[Document]) -> list:
+        # Prefer the vectors already stored in the vector DB, only embed the rest
+        vectors = {}
+        ids = [doc.id for doc in documents if doc.id]
+        if self.collection_name and ids:
+            vectors = (
+                VECTOR_DB_CLIENT.get_vectors(
+                    collection_name=self.collection_name, ids=ids
+                )
+                or {}
+            )
+
+        missing = [
+            idx
+            for idx, doc in enumerate(documents)
+            if doc.id not in vectors or vectors[doc.id] is None
+        ]
+        if missing:
+            log.debug(
+                f"RerankCompressor: embedding {len(missing)} of {len(documents)} documents without stored vectors"
+            )
+            embeddings = self.embedding_function(
+                [documents[idx].page_content for idx in missing],
+                RAG_EMBEDDING_CONTENT_PREFIX,
+            )
+            for idx, embedding in zip(missing, embeddings):
+                vectors[documents[idx].id or idx] = embedding
+
+        return [vectors[doc.id or idx] for idx, doc in enumerate(documents)]
+
     def compress_documents(
         self,
         documents: Sequence[Document],
         query: str,
         callbacks: Optional[Callbacks] = None,
     ) -> Sequence[Document]:
+        if not documents:
+            return documents
+
         reranking = self.reranking_function is not None
 
         scores = None
@@ -1060,14 +1248,19 @@ class RerankCompressor(BaseDocumentCompressor):
                 [(query, doc.page_content) for doc in documents]
             )
         else:
-            from sentence_transformers import util
-
-            query_embedding = self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents], RAG_EMBEDDING_CONTENT_PREFIX
+            query_embedding = self.query_embedding or self.embedding_function(
+                query, RAG_EMBEDDING_QUERY_PREFIX
+            )
+            scores = cosine_similarity(
+                query_embedding, self.get_document_embeddings(documents)
             )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
 
+        return self.rank_documents(documents, scores)
+
+    def rank_documents(
+        self, documents: Sequence[Document], scores
+    ) -> Sequence[Document]:
+        """Filter by r_score and keep the top_n documents by score."""
         if scores is not None:
             docs_with_scores = list(
                 zip(
@@ -137,6 +137,23 @@ class ChromaClient(VectorDBBase):
             )
         return None
 
+    def get_vectors(
+        self, collection_name: str, ids: list[str]
+    ) -> Optional[dict[str, list[float]]]:
+        # Get the stored embeddings of the given items.
+        try:
+            collection = self.client.get_collection(name=collection_name)
+            if collection:
+                result = collection.get(ids=ids, include=["embeddings"])
+                return {
+                    id: embedding
+                    for id, embedding in zip(result["ids"], result["embeddings"])
+                }
+            return None
+        except Exception as e:
+            log.debug(f"Could not get vectors from {collection_name}: {e}")
+            return None
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         collection = self.client.get_or_create_collection(
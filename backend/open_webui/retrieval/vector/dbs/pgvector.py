@@ -560,6 +560,22 @@ class PgvectorClient(VectorDBBase):
             log.exception(f"Error during get: {e}")
             return None
 
+    def get_vectors(
+        self, collection_name: str, ids: List[str]
+    ) -> Optional[Dict[str, List[float]]]:
+        try:
+            results = self.session.execute(
+                select(DocumentChunk.id, DocumentChunk.vector).where(
+                    DocumentChunk.collection_name == collection_name,
+                    DocumentChunk.id.in_(ids),
+                )
+            ).all()
+            return {row.id: list(row.vector) for row in results}
+        except Exception as e:
+            self.session.rollback()
+            log.exception(f"Error during get_vectors: {e}")
+            return None
+
     def delete(
         self,
         collection_name: str,
@@ -1,7 +1,11 @@
+import logging
+
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Union
 
+log = logging.getLogger(__name__)
+
 
 class VectorItem(BaseModel):
     id: str
@@ -84,3 +88,125 @@ class VectorDBBase(ABC):
     def reset(self) -> None:
         """Reset the vector database by removing all collections or those matching a condition."""
         pass
+
+    def get_vectors(
+        self, collection_name: str, ids: List[str]
+    ) -> Optional[Dict[str, List[float]]]:
+        """
+        Retrieve the stored vectors of the given item IDs as an id -> vector map.
+        Backends that cannot return stored vectors return None.
+        """
+        return None
+
+
+class VectorDBListener:
+    """
+    Receives notifications about mutations performed through the vector DB client.
+
+    Listeners are used to keep derived, per-collection state (e.g. lexical
+    indexes or caches) in sync with the vector database. All methods are
+    no-ops by default so implementations only override what they need.
+    """
+
+    def on_insert(self, collection_name: str, items: List[VectorItem]) -> None:
+        pass
+
+    def on_upsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        self.on_insert(collection_name, items)
+
+    def on_delete(
+        self,
+        collection_name: str,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict] = None,
+    ) -> None:
+        pass
+
+    def on_delete_collection(self, collection_name: str) -> None:
+        pass
+
+    def on_reset(self) -> None:
+        pass
+
+
+class ObservedVectorDB(VectorDBBase):
+    """
+    Wraps a vector database backend and notifies registered listeners after
+    every successful mutation. Any attribute that is not part of the
+    VectorDBBase interface is forwarded to the wrapped backend.
+    """
+
+    def __init__(self, client: VectorDBBase):
+        self.client = client
+        self.listeners: List[VectorDBListener] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def add_listener(self, listener: VectorDBListener) -> None:
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def _notify(self, event: str, *args, **kwargs) -> None:
+        for listener in self.listeners:
+            try:
+                getattr(listener, event)(*args, **kwargs)
+            except Exception as e:
+                log.exception(f"Vector DB listener {listener} failed on {event}: {e}")
+
+    def has_collection(self, collection_name: str) -> bool:
+        return self.client.has_collection(collection_name=collection_name)
+
+    def delete_collection(self, collection_name: str) -> None:
+        result = self.client.delete_collection(collection_name=collection_name)
+        self._notify("on_delete_collection", collection_name)
+        return result
+
+    def insert(self, collection_name: str, items: List[VectorItem]) -> None:
+        result = self.client.insert(collection_name=collection_name, items=items)
+        self._notify("on_insert", collection_name, items)
+        return result
+
+    def upsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        result = self.client.upsert(collection_name=collection_name, items=items)
+        self._notify("on_upsert", collection_name, items)
+        return result
+
+    def search(
+        self, collection_name: str, vectors: List[List[Union[float, int]]], limit: int
+    ) -> Optional[SearchResult]:
+        return self.client.search(
+            collection_name=collection_name, vectors=vectors, limit=limit
+        )
+
+    def query(
+        self, collection_name: str, filter: Dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        return self.client.query(
+            collection_name=collection_name, filter=filter, limit=limit
+        )
+
+    def get(self, collection_name: str) -> Optional[GetResult]:
+        return self.client.get(collection_name=collection_name)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict] = None,
+    ) -> None:
+        result = self.client.delete(
+            collection_name=collection_name, ids=ids, filter=filter
+        )
+        self._notify("on_delete", collection_name, ids=ids, filter=filter)
+        return result
+
+    def reset(self) -> None:
+        result = self.client.reset()
+        self._notify("on_reset")
+        return result
+
+    def get_vectors(
+        self, collection_name: str, ids: List[str]
+    ) -> Optional[Dict[str, List[float]]]:
+        return self.client.get_vectors(collection_name=collection_name, ids=ids)
@@ -1,12 +1,13 @@
 import json
 import logging
-from typing import Optional
+from typing import AsyncIterator, Iterable, Optional
 
 
 from open_webui.socket.main import get_event_emitter
 from open_webui.models.chats import (
     ChatForm,
     ChatImportForm,
+    ChatModel,
     ChatResponse,
     Chats,
     ChatTitleIdResponse,
@@ -18,7 +19,8 @@ from open_webui.config import ENABLE_ADMIN_CHAT_ACCESS, ENABLE_ADMIN_EXPORT
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.env import SRC_LOG_LEVELS
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
@@ -29,6 +31,54 @@ log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 router = APIRouter()
 
+# Chats inserted per transaction by the streaming import
+CHAT_IMPORT_BATCH_SIZE = 100
+
+
+def stream_chats(chats: Iterable[ChatModel], ndjson: bool = False):
+    """Serializes chats one at a time, as a JSON array or as NDJSON."""
+    if not ndjson:
+        yield "["
+    for idx, chat in enumerate(chats):
+        data = ChatResponse(**chat.model_dump()).model_dump_json()
+        if ndjson:
+            yield f"{data}\n"
+        else:
+            yield f",{data}" if idx else data
+    if not ndjson:
+        yield "]"
+
+
+def get_chats_response(chats: Iterable[ChatModel], ndjson: bool = False):
+    return StreamingResponse(
+        stream_chats(chats, ndjson),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+    )
+
+
+async def read_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def add_chat_tags(user_id: str, tags: Iterable[str]):
+    """Creates the user's missing tags for imported chats."""
+    for tag_id in tags:
+        tag_id = tag_id.replace(" ", "_").lower()
+        tag_name = " ".join([word.capitalize() for word in tag_id.split("_")])
+        if (
+            tag_id != "none"
+            and Tags.get_tag_by_name_and_user_id(tag_name, user_id) is None
+        ):
+            Tags.insert_new_tag(tag_name, user_id)
+
+
 ############################
 # GetChatList
 ############################
@@ -39,13 +89,14 @@ router = APIRouter()
 def get_session_user_chat_list(
     user=Depends(get_verified_user),
     page: Optional[int] = None,
+    cursor: Optional[str] = None,
     include_pinned: Optional[bool] = False,
     include_folders: Optional[bool] = False,
 ):
     try:
-        if page is not None:
+        if page is not None or cursor is not None:
             limit = 60
-            skip = (page - 1) * limit
+            skip = (page - 1) * limit if page else 0
 
             return Chats.get_chat_title_id_list_by_user_id(
                 user.id,
@@ -53,6 +104,7 @@ def get_session_user_chat_list(
                 include_pinned=include_pinned,
                 skip=skip,
                 limit=limit,
+                cursor=cursor,
             )
         else:
             return Chats.get_chat_title_id_list_by_user_id(
@@ -94,6 +146,7 @@ async def delete_all_user_chats(request: Request, user=Depends(get_verified_user
 async def get_user_chat_list_by_user_id(
     user_id: str,
     page: Optional[int] = None,
+    cursor: Optional[str] = None,
     query: Optional[str] = None,
     order_by: Optional[str] = None,
     direction: Optional[str] = None,
@@ -119,9 +172,19 @@ async def get_user_chat_list_by_user_id(
     if direction:
         filter["direction"] = direction
 
-    return Chats.get_chat_list_by_user_id(
-        user_id, include_archived=True, filter=filter, skip=skip, limit=limit
-    )
+    try:
+        return Chats.get_chat_list_by_user_id(
+            user_id,
+            include_archived=True,
+            filter=filter,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=ERROR_MESSAGES.DEFAULT(e)
+        )
 
 
 ############################
@@ -151,15 +214,7 @@ async def import_chat(form_data: ChatImportForm, user=Depends(get_verified_user)
     try:
         chat = Chats.import_chat(user.id, form_data)
         if chat:
-            tags = chat.meta.get("tags", [])
-            for tag_id in tags:
-                tag_id = tag_id.replace(" ", "_").lower()
-                tag_name = " ".join([word.capitalize() for word in tag_id.split("_")])
-                if (
-                    tag_id != "none"
-                    and Tags.get_tag_by_name_and_user_id(tag_name, user.id) is None
-                ):
-                    Tags.insert_new_tag(tag_name, user.id)
+            add_chat_tags(user.id, chat.meta.get("tags", []))
 
         return ChatResponse(**chat.model_dump())
     except Exception as e:
@@ -169,6 +224,54 @@ async def import_chat(form_data: ChatImportForm, user=Depends(get_verified_user)
         )
 
 
+@router.post("/import/bulk")
+async def import_chats(request: Request, user=Depends(get_verified_user)):
+    """
+    Imports chats from an NDJSON body, one ChatImportForm per line, as the
+    body arrives and in batches of CHAT_IMPORT_BATCH_SIZE per transaction.
+    Invalid lines are skipped and reported.
+    """
+    imported = 0
+    errors = []
+    batch = []
+    tags = set()
+
+    def import_batch():
+        nonlocal imported, batch, tags
+        imported += Chats.import_chats(user.id, batch)
+        add_chat_tags(user.id, tags)
+        batch, tags = [], set()
+
+    try:
+        line_number = 0
+        async for line in read_lines(request.stream()):
+            line_number += 1
+            if not line.strip():
+                continue
+
+            try:
+                form_data = ChatImportForm.model_validate_json(line)
+            except ValidationError as e:
+                errors.append({"line": line_number, "detail": str(e)})
+                continue
+
+            batch.append(form_data)
+            tags.update((form_data.meta or {}).get("tags", []))
+            if len(batch) >= CHAT_IMPORT_BATCH_SIZE:
+                import_batch()
+
+        if batch:
+            import_batch()
+    except Exception as e:
+        log.exception(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.DEFAULT(f"Imported {imported} chats before: {e}"),
+        )
+
+    return {"imported": imported, "errors": errors}
+
+
 ############################
 # GetChats
 ############################
@@ -176,7 +279,10 @@ async def import_chat(form_data: ChatImportForm, user=Depends(get_verified_user)
 
 @router.get("/search", response_model=list[ChatTitleIdResponse])
 def search_user_chats(
-    text: str, page: Optional[int] = None, user=Depends(get_verified_user)
+    text: str,
+    page: Optional[int] = None,
+    cursor: Optional[str] = None,
+    user=Depends(get_verified_user),
 ):
     if page is None:
         page = 1
@@ -184,16 +290,21 @@ def search_user_chats(
     limit = 60
     skip = (page - 1) * limit
 
-    chat_list = [
-        ChatTitleIdResponse(**chat.model_dump())
-        for chat in Chats.get_chats_by_user_id_and_search_text(
-            user.id, text, skip=skip, limit=limit
+    try:
+        chat_list = [
+            ChatTitleIdResponse(**chat.model_dump())
+            for chat in Chats.get_chats_by_user_id_and_search_text(
+                user.id, text, skip=skip, limit=limit, cursor=cursor
+            )
+        ]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=ERROR_MESSAGES.DEFAULT(e)
         )
-    ]
 
     # Delete tag if no chat is found
     words = text.strip().split(" ")
-    if page == 1 and len(words) == 1 and words[0].startswith("tag:"):
+    if page == 1 and cursor is None and len(words) == 1 and words[0].startswith("tag:"):
         tag_id = words[0].replace("tag:", "")
         if len(chat_list) == 0:
             if Tags.get_tag_by_name_and_user_id(tag_id, user.id):
@@ -225,7 +336,10 @@ async def get_chats_by_folder_id(folder_id: str, user=Depends(get_verified_user)
 
 @router.get("/folder/{folder_id}/list")
 async def get_chat_list_by_folder_id(
-    folder_id: str, page: Optional[int] = 1, user=Depends(get_verified_user)
+    folder_id: str,
+    page: Optional[int] = 1,
+    cursor: Optional[str] = None,
+    user=Depends(get_verified_user),
 ):
     try:
         limit = 60
@@ -234,7 +348,7 @@ async def get_chat_list_by_folder_id(
         return [
             {"title": chat.title, "id": chat.id, "updated_at": chat.updated_at}
             for chat in Chats.get_chats_by_folder_id_and_user_id(
-                folder_id, user.id, skip=skip, limit=limit
+                folder_id, user.id, skip=skip, limit=limit, cursor=cursor
             )
         ]
 
@@ -265,10 +379,13 @@ async def get_user_pinned_chats(user=Depends(get_verified_user)):
 
 @router.get("/all", response_model=list[ChatResponse])
 async def get_user_chats(user=Depends(get_verified_user)):
-    return [
-        ChatResponse(**chat.model_dump())
-        for chat in Chats.get_chats_by_user_id(user.id)
-    ]
+    return get_chats_response(Chats.iter_chats(user_id=user.id))
+
+
+@router.get("/all/export")
+async def export_user_chats(user=Depends(get_verified_user)):
+    """Exports the user's chats as NDJSON, one ChatResponse per line."""
+    return get_chats_response(Chats.iter_chats(user_id=user.id), ndjson=True)
 
 
 ############################
@@ -278,10 +395,7 @@ async def get_user_chats(user=Depends(get_verified_user)):
 
 @router.get("/all/archived", response_model=list[ChatResponse])
 async def get_user_archived_chats(user=Depends(get_verified_user)):
-    return [
-        ChatResponse(**chat.model_dump())
-        for chat in Chats.get_archived_chats_by_user_id(user.id)
-    ]
+    return get_chats_response(Chats.iter_chats(user_id=user.id, archived=True))
 
 
 ############################
@@ -313,7 +427,7 @@ async def get_all_user_chats_in_db(user=Depends(get_admin_user)):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
-    return [ChatResponse(**chat.model_dump()) for chat in Chats.get_chats()]
+    return get_chats_response(Chats.iter_chats())
 
 
 ############################
@@ -324,6 +438,7 @@ async def get_all_user_chats_in_db(user=Depends(get_admin_user)):
 @router.get("/archived", response_model=list[ChatTitleIdResponse])
 async def get_archived_session_user_chat_list(
     page: Optional[int] = None,
+    cursor: Optional[str] = None,
     query: Optional[str] = None,
     order_by: Optional[str] = None,
     direction: Optional[str] = None,
@@ -343,15 +458,21 @@ async def get_archived_session_user_chat_list(
     if direction:
         filter["direction"] = direction
 
-    chat_list = [
-        ChatTitleIdResponse(**chat.model_dump())
-        for chat in Chats.get_archived_chat_list_by_user_id(
-            user.id,
-            filter=filter,
-            skip=skip,
-            limit=limit,
+    try:
+        chat_list = [
+            ChatTitleIdResponse(**chat.model_dump())
+            for chat in Chats.get_archived_chat_list_by_user_id(
+                user.id,
+                filter=filter,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+            )
+        ]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=ERROR_MESSAGES.DEFAULT(e)
         )
-    ]
 
     return chat_list
 
@@ -493,13 +614,14 @@ async def update_chat_message_by_id(
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    chat = Chats.upsert_message_to_chat_by_id_and_message_id(
+    Chats.upsert_message_to_chat_by_id_and_message_id(
         id,
         message_id,
         {
             "content": form_data.content,
         },
     )
+    Chats.update_chat_search_by_id(id)
 
     event_emitter = get_event_emitter(
         {
@@ -522,6 +644,7 @@ async def update_chat_message_by_id(
             }
         )
 
+    chat = Chats.get_chat_by_id(id)
     return ChatResponse(**chat.model_dump())
 
 
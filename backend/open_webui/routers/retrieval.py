@@ -7,6 +7,7 @@ import asyncio
 
 import re
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Iterator, List, Optional, Sequence, Union
@@ -26,6 +27,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import tiktoken
+from anyio import from_thread
 
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter, TokenTextSplitter
@@ -38,6 +40,8 @@ from open_webui.storage.provider import Storage
 
 
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEXES
+from open_webui.socket.main import get_event_emitter
 
 # Document loaders
 from open_webui.retrieval.loaders.main import Loader
@@ -96,6 +100,8 @@ from open_webui.config import (
     DEFAULT_LOCALE,
     RAG_EMBEDDING_CONTENT_PREFIX,
     RAG_EMBEDDING_QUERY_PREFIX,
+    RAG_INGESTION_BATCH_SIZE,
+    RAG_FILE_PROCESSING_WORKERS,
 )
 from open_webui.env import (
     SRC_LOG_LEVELS,
@@ -1280,6 +1286,74 @@ async def update_rag_config(
 ####################################
 
 
+def get_ingestion_checkpoint(collection_name: str, metadata: Optional[dict]):
+    """Return the checkpoint of an interrupted ingestion of the same file content."""
+    file_id = (metadata or {}).get("file_id")
+    if not file_id:
+        return None
+
+    file = Files.get_file_by_id(file_id)
+    checkpoint = (file.data or {}).get("ingestion") if file else None
+    if (
+        checkpoint
+        and checkpoint.get("collection_name") == collection_name
+        and checkpoint.get("hash") == metadata.get("hash")
+    ):
+        return checkpoint
+    return None
+
+
+def update_ingestion_checkpoint(
+    collection_name: str, metadata: Optional[dict], inserted: Optional[int]
+):
+    file_id = (metadata or {}).get("file_id")
+    if not file_id:
+        return
+
+    Files.update_file_data_by_id(
+        file_id,
+        {
+            "ingestion": (
+                {
+                    "collection_name": collection_name,
+                    "hash": metadata.get("hash"),
+                    "inserted": inserted,
+                }
+                if inserted is not None
+                else None
+            )
+        },
+    )
+
+
+def get_request_event_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The event loop of the request, when called from its AnyIO worker thread."""
+    try:
+        return from_thread.run_sync(asyncio.get_running_loop)
+    except Exception:
+        return None
+
+
+def emit_ingestion_progress(
+    event_emitter, event_loop: Optional[asyncio.AbstractEventLoop], data: dict
+):
+    """
+    Emits a file:progress event from any thread. Worker threads of our own
+    pools are not AnyIO threads, so the event is scheduled on the loop
+    captured in the request thread.
+    """
+    if event_emitter is None or event_loop is None:
+        return
+
+    try:
+        asyncio.run_coroutine_threadsafe(
+            event_emitter({"type": "file:progress", "data": data}), event_loop
+        )
+    except Exception as e:
+        # Progress is best effort, e.g. the event loop is closed
+        log.debug(f"Unable to emit ingestion progress: {e}")
+
+
 def save_docs_to_vector_db(
     request: Request,
     docs,
@@ -1289,6 +1363,7 @@ def save_docs_to_vector_db(
     split: bool = True,
     add: bool = False,
     user=None,
+    event_loop: Optional[asyncio.AbstractEventLoop] = None,
 ) -> bool:
     def _get_docs_info(docs: list[Document]) -> str:
         docs_info = set()
@@ -1310,6 +1385,9 @@ def save_docs_to_vector_db(
         f"save_docs_to_vector_db: document {_get_docs_info(docs)} {collection_name}"
     )
 
+    # Number of chunks already stored by an interrupted ingestion of this document
+    resume_from = 0
+
     # Check if entries with the same hash (metadata.hash) already exist
     if metadata and "hash" in metadata:
         result = VECTOR_DB_CLIENT.query(
@@ -1320,8 +1398,15 @@ def save_docs_to_vector_db(
         if result is not None:
             existing_doc_ids = result.ids[0]
             if existing_doc_ids:
-                log.info(f"Document with hash {metadata['hash']} already exists")
-                raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
+                checkpoint = get_ingestion_checkpoint(collection_name, metadata)
+                if checkpoint is None:
+                    log.info(f"Document with hash {metadata['hash']} already exists")
+                    raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
+
+                resume_from = checkpoint.get("inserted", 0)
+                log.info(
+                    f"Resuming ingestion of {metadata['hash']} into {collection_name} at chunk {resume_from}"
+                )
 
     if split:
         if request.app.state.config.TEXT_SPLITTER in ["", "character"]:
@@ -1396,18 +1481,20 @@ def save_docs_to_vector_db(
     if len(docs) == 0:
         raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
 
-    texts = [doc.page_content for doc in docs]
-    metadatas = [
-        {
-            **doc.metadata,
-            **(metadata if metadata else {}),
-            "embedding_config": {
-                "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
-                "model": request.app.state.config.RAG_EMBEDDING_MODEL,
-            },
-        }
-        for doc in docs
-    ]
+    embedding_config = {
+        "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
+        "model": request.app.state.config.RAG_EMBEDDING_MODEL,
+    }
+
+    def get_item_id(idx: int) -> str:
+        # Deterministic ids let a resumed ingestion upsert over partial batches
+        if metadata and metadata.get("hash"):
+            return str(
+                uuid.uuid5(
+                    uuid.NAMESPACE_URL, f"{collection_name}:{metadata['hash']}:{idx}"
+                )
+            )
+        return str(uuid.uuid4())
 
     try:
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
@@ -1416,11 +1503,15 @@ def save_docs_to_vector_db(
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
                 log.info(f"deleting existing collection {collection_name}")
-            elif add is False:
+                BM25_INDEXES.create(collection_name)
+            elif add is False and not resume_from:
                 log.info(
                     f"collection {collection_name} already exists, overwrite is False and add is False"
                 )
                 return True
+        else:
+            # Start the BM25 index with the collection, inserts keep it up to date
+            BM25_INDEXES.create(collection_name)
 
         log.info(f"generating embeddings for {collection_name}")
         embedding_function = get_embedding_function(
@@ -1453,30 +1544,99 @@ def save_docs_to_vector_db(
             ),
         )
 
-        embeddings = embedding_function(
-            list(map(lambda x: x.replace("\n", " "), texts)),
-            prefix=RAG_EMBEDDING_CONTENT_PREFIX,
-            user=user,
+        batch_size = max(
+            RAG_INGESTION_BATCH_SIZE,
+            request.app.state.config.RAG_EMBEDDING_BATCH_SIZE,
         )
-        log.info(f"embeddings generated {len(embeddings)} for {len(texts)} items")
-
-        items = [
-            {
-                "id": str(uuid.uuid4()),
-                "text": text,
-                "vector": embeddings[idx],
-                "metadata": metadatas[idx],
-            }
-            for idx, text in enumerate(texts)
-        ]
+        total = len(docs)
 
-        log.info(f"adding to collection {collection_name}")
-        VECTOR_DB_CLIENT.insert(
-            collection_name=collection_name,
-            items=items,
+        event_emitter = (
+            get_event_emitter({"user_id": user.id}, update_db=False) if user else None
         )
+        if event_emitter is not None and event_loop is None:
+            event_loop = get_request_event_loop()
+
+        def emit_progress(status: str, processed: int):
+            emit_ingestion_progress(
+                event_emitter,
+                event_loop,
+                {
+                    "collection_name": collection_name,
+                    "file_id": (metadata or {}).get("file_id"),
+                    "processed": processed,
+                    "total": total,
+                    "status": status,
+                },
+            )
 
-        log.info(f"added {len(items)} items to collection {collection_name}")
+        def generate_batches():
+            # Batches are embedded lazily, so only the batch being embedded and the
+            # batch being inserted are held in memory at any time
+            for start in range(resume_from, total, batch_size):
+                batch = docs[start : start + batch_size]
+                texts = [doc.page_content for doc in batch]
+
+                embeddings = embedding_function(
+                    list(map(lambda x: x.replace("\n", " "), texts)),
+                    prefix=RAG_EMBEDDING_CONTENT_PREFIX,
+                    user=user,
+                )
+                if embeddings is None or len(embeddings) != len(texts):
+                    raise Exception(
+                        f"Failed to generate embeddings for chunks {start}-{start + len(texts)}"
+                    )
+
+                yield start + len(batch), [
+                    {
+                        "id": get_item_id(start + idx),
+                        "text": text,
+                        "vector": embeddings[idx],
+                        "metadata": {
+                            **doc.metadata,
+                            **(metadata if metadata else {}),
+                            "embedding_config": embedding_config,
+                        },
+                    }
+                    for idx, (text, doc) in enumerate(zip(texts, batch))
+                ]
+
+        def insert_batch(items: list):
+            if resume_from:
+                VECTOR_DB_CLIENT.upsert(collection_name=collection_name, items=items)
+            else:
+                VECTOR_DB_CLIENT.insert(collection_name=collection_name, items=items)
+
+        log.info(f"adding {total - resume_from} items to collection {collection_name}")
+        update_ingestion_checkpoint(collection_name, metadata, resume_from)
+        emit_progress("processing", resume_from)
+
+        inserted = resume_from
+        try:
+            # Embed the next batch while the previous one is being inserted
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                pending = None
+                for end, items in generate_batches():
+                    if pending is not None:
+                        pending[0].result()
+                        inserted = pending[1]
+                        update_ingestion_checkpoint(collection_name, metadata, inserted)
+                        emit_progress("processing", inserted)
+
+                    pending = (executor.submit(insert_batch, items), end)
+
+                if pending is not None:
+                    pending[0].result()
+                    inserted = pending[1]
+        except Exception:
+            emit_progress("failed", inserted)
+            raise
+
+        update_ingestion_checkpoint(collection_name, metadata, None)
+        emit_progress("completed", inserted)
+
+        log.info(
+            f"added {inserted - resume_from} items to collection {collection_name}"
+        )
         return True
     except Exception as e:
         log.exception(e)
@@ -2232,13 +2392,9 @@ def query_doc_handler(
         if request.app.state.config.ENABLE_RAG_HYBRID_SEARCH and (
             form_data.hybrid is None or form_data.hybrid
         ):
-            collection_results = {}
-            collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=form_data.collection_name
-            )
             return query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
-                collection_result=collection_results[form_data.collection_name],
+                bm25_index=BM25_INDEXES.get_index(form_data.collection_name),
                 query=form_data.query,
                 embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
                     query, prefix=prefix, user=user
@@ -2446,13 +2602,18 @@ def process_files_batch(
 ) -> BatchProcessFilesResponse:
     """
     Process a batch of files and save them to the vector database.
+
+    Files are embedded and inserted concurrently by a pool of
+    RAG_FILE_PROCESSING_WORKERS workers, so one failing file does not fail the
+    others. File rows are updated with bulk statements before and after.
     """
     results: List[BatchProcessFilesResult] = []
     errors: List[BatchProcessFilesResult] = []
     collection_name = form_data.collection_name
 
     # Prepare all documents first
-    all_docs: List[Document] = []
+    prepared: List[tuple[FileModel, List[Document]]] = []
+    file_updates: dict[str, dict] = {}
     for file in form_data.files:
         try:
             text_content = file.data.get("content", "")
@@ -2470,11 +2631,12 @@ def process_files_batch(
                 )
             ]
 
-            hash = calculate_sha256_string(text_content)
-            Files.update_file_hash_by_id(file.id, hash)
-            Files.update_file_data_by_id(file.id, {"content": text_content})
+            file_updates[file.id] = {
+                "hash": calculate_sha256_string(text_content),
+                "data": {"content": text_content},
+            }
 
-            all_docs.extend(docs)
+            prepared.append((file, docs))
             results.append(BatchProcessFilesResult(file_id=file.id, status="prepared"))
 
         except Exception as e:
@@ -2483,32 +2645,72 @@ def process_files_batch(
                 BatchProcessFilesResult(file_id=file.id, status="failed", error=str(e))
             )
 
-    # Save all documents in one batch
-    if all_docs:
-        try:
-            save_docs_to_vector_db(
-                request=request,
-                docs=all_docs,
-                collection_name=collection_name,
-                add=True,
-                user=user,
-            )
+    Files.update_files_by_ids(file_updates)
 
-            # Update all files with collection name
-            for result in results:
-                Files.update_file_metadata_by_id(
-                    result.file_id, {"collection_name": collection_name}
-                )
-                result.status = "completed"
+    event_emitter = get_event_emitter({"user_id": user.id}, update_db=False)
+    # Captured here, the pool threads below cannot look it up
+    event_loop = get_request_event_loop()
+    results_by_id = {result.file_id: result for result in results}
+    completed_ids: List[str] = []
 
-        except Exception as e:
-            log.error(
-                f"process_files_batch: Error saving documents to vector DB: {str(e)}"
-            )
-            for result in results:
-                result.status = "failed"
-                errors.append(
-                    BatchProcessFilesResult(file_id=result.file_id, error=str(e))
+    def process_file_docs(docs: List[Document]):
+        return save_docs_to_vector_db(
+            request=request,
+            docs=docs,
+            collection_name=collection_name,
+            add=True,
+            user=user,
+            event_loop=event_loop,
+        )
+
+    if prepared:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(RAG_FILE_PROCESSING_WORKERS, len(prepared)))
+        ) as executor:
+            futures = {
+                executor.submit(process_file_docs, docs): file.id
+                for file, docs in prepared
+            }
+
+            # Report each file as soon as it is done, from the request thread
+            for future in as_completed(futures):
+                file_id = futures[future]
+                result = results_by_id[file_id]
+                try:
+                    future.result()
+                    result.status = "completed"
+                    completed_ids.append(file_id)
+                except Exception as e:
+                    log.error(
+                        f"process_files_batch: Error saving file {file_id} to vector DB: {str(e)}"
+                    )
+                    result.status = "failed"
+                    result.error = str(e)
+                    errors.append(
+                        BatchProcessFilesResult(
+                            file_id=file_id, status="failed", error=str(e)
+                        )
+                    )
+
+                emit_ingestion_progress(
+                    event_emitter,
+                    event_loop,
+                    {
+                        "collection_name": collection_name,
+                        "file_id": file_id,
+                        "processed": len(completed_ids),
+                        "total": len(prepared),
+                        "status": result.status,
+                        **({"error": result.error} if result.error else {}),
+                    },
                 )
 
+    # Update all completed files with collection name
+    Files.update_files_by_ids(
+        {
+            file_id: {"meta": {"collection_name": collection_name}}
+            for file_id in completed_ids
+        }
+    )
+
     return BatchProcessFilesResponse(results=results, errors=errors)
@@ -11,7 +11,6 @@ import pycrdt as Y
 
 from open_webui.models.users import Users, UserNameResponse
 from open_webui.models.channels import Channels
-from open_webui.models.chats import Chats
 from open_webui.models.notes import Notes, NoteUpdateForm
 from open_webui.utils.redis import (
     get_sentinels_from_env,
@@ -31,10 +30,20 @@ from open_webui.env import (
     WEBSOCKET_REDIS_LOCK_TIMEOUT,
     WEBSOCKET_SENTINEL_PORT,
     WEBSOCKET_SENTINEL_HOSTS,
+    WEBSOCKET_CHAT_COMPLETION_SNAPSHOT_INTERVAL,
+    WEBSOCKET_EVENT_QUEUE_SIZE,
     REDIS_KEY_PREFIX,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock, YdocManager
+from open_webui.socket.utils import (
+    ChatCompletionDeltaEncoder,
+    ChatEventPersister,
+    PoolInvalidator,
+    RedisLock,
+    SessionPool,
+    UserSessionPool,
+    YdocManager,
+)
 from open_webui.tasks import create_task, stop_item_tasks
 from open_webui.utils.redis import get_redis_connection
 from open_webui.utils.access_control import has_access, get_users_with_access
@@ -52,6 +61,7 @@ log.setLevel(SRC_LOG_LEVELS["SOCKET"])
 
 
 REDIS = None
+POOL_INVALIDATOR = None
 
 # Configure CORS for Socket.IO
 SOCKETIO_CORS_ORIGINS = "*" if CORS_ALLOW_ORIGIN == ["*"] else CORS_ALLOW_ORIGIN
@@ -86,6 +96,11 @@ else:
 # Timeout duration in seconds
 TIMEOUT_DURATION = 3
 
+# "full" re-sends the whole message content with every chat:completion event,
+# "delta" sends append-only deltas and periodic snapshots (see
+# ChatCompletionDeltaEncoder)
+CHAT_COMPLETION_PROTOCOLS = ["full", "delta"]
+
 # Dictionary to maintain the user pool
 
 if WEBSOCKET_MANAGER == "redis":
@@ -102,23 +117,24 @@ if WEBSOCKET_MANAGER == "redis":
     redis_sentinels = get_sentinels_from_env(
         WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
     )
-    SESSION_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:session_pool",
-        redis_url=WEBSOCKET_REDIS_URL,
-        redis_sentinels=redis_sentinels,
-        redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+    POOL_INVALIDATOR = PoolInvalidator(REDIS, f"{REDIS_KEY_PREFIX}:pool_invalidations")
+    SESSION_POOL = SessionPool(
+        f"{REDIS_KEY_PREFIX}:session_pool", REDIS, POOL_INVALIDATOR
     )
-    USER_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:user_pool",
-        redis_url=WEBSOCKET_REDIS_URL,
-        redis_sentinels=redis_sentinels,
-        redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+    # The hash tag keeps the per-user sets in one cluster slot
+    USER_POOL = UserSessionPool(
+        f"{{{REDIS_KEY_PREFIX}:user_sessions}}",
+        REDIS,
+        POOL_INVALIDATOR,
+        sync_redis=get_redis_connection(
+            redis_url=WEBSOCKET_REDIS_URL,
+            redis_sentinels=redis_sentinels,
+            redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+        ),
     )
-    USAGE_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:usage_pool",
-        redis_url=WEBSOCKET_REDIS_URL,
-        redis_sentinels=redis_sentinels,
-        redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+    USAGE_POOL = SessionPool(f"{REDIS_KEY_PREFIX}:usage_pool", REDIS, POOL_INVALIDATOR)
+    PROTOCOL_POOL = SessionPool(
+        f"{REDIS_KEY_PREFIX}:protocol_pool", REDIS, POOL_INVALIDATOR
     )
 
     clean_up_lock = RedisLock(
@@ -132,9 +148,10 @@ if WEBSOCKET_MANAGER == "redis":
     renew_func = clean_up_lock.renew_lock
     release_func = clean_up_lock.release_lock
 else:
-    SESSION_POOL = {}
-    USER_POOL = {}
-    USAGE_POOL = {}
+    SESSION_POOL = SessionPool("session_pool")
+    USER_POOL = UserSessionPool("user_sessions")
+    USAGE_POOL = SessionPool("usage_pool")
+    PROTOCOL_POOL = SessionPool("protocol_pool")
 
     aquire_func = release_func = renew_func = lambda: True
 
@@ -144,6 +161,18 @@ YDOC_MANAGER = YdocManager(
     redis_key_prefix=f"{REDIS_KEY_PREFIX}:ydoc:documents",
 )
 
+# Message events that are saved to the chat
+PERSISTED_EVENT_TYPES = [
+    "status",
+    "message",
+    "replace",
+    "embeds",
+    "files",
+    "source",
+    "citation",
+]
+CHAT_EVENT_PERSISTER = ChatEventPersister(max_size=WEBSOCKET_EVENT_QUEUE_SIZE)
+
 
 async def periodic_usage_pool_cleanup():
     max_retries = 2
@@ -174,7 +203,7 @@ async def periodic_usage_pool_cleanup():
 
             now = int(time.time())
             send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
+            for model_id, connections in await USAGE_POOL.items():
                 # Creating a list of sids to remove if they have timed out
                 expired_sids = [
                     sid
@@ -187,9 +216,9 @@ async def periodic_usage_pool_cleanup():
 
                 if not connections:
                     log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
+                    await USAGE_POOL.delete(model_id)
                 else:
-                    USAGE_POOL[model_id] = connections
+                    await USAGE_POOL.set(model_id, connections)
 
                 send_usage = True
             await asyncio.sleep(TIMEOUT_DURATION)
@@ -203,24 +232,29 @@ app = socketio.ASGIApp(
 )
 
 
-def get_models_in_use():
+async def get_models_in_use():
     # List models that are currently in use
-    models_in_use = list(USAGE_POOL.keys())
+    models_in_use = await USAGE_POOL.keys()
     return models_in_use
 
 
-def get_active_user_ids():
+async def get_active_user_ids():
     """Get the list of active user IDs."""
-    return list(USER_POOL.keys())
+    return await USER_POOL.keys()
+
 
+def get_active_user_count():
+    """Get the number of active users, from any thread."""
+    return USER_POOL.count()
 
-def get_user_active_status(user_id):
+
+async def get_user_active_status(user_id):
     """Check if a user is currently active."""
-    return user_id in USER_POOL
+    return await USER_POOL.contains(user_id)
 
 
-def get_user_id_from_session_pool(sid):
-    user = SESSION_POOL.get(sid)
+async def get_user_id_from_session_pool(sid):
+    user = await SESSION_POOL.get(sid)
     if user:
         return user["id"]
     return None
@@ -235,33 +269,49 @@ def get_session_ids_from_room(room):
     return [session_id[0] for session_id in active_session_ids]
 
 
-def get_user_ids_from_room(room):
+async def get_user_ids_from_room(room):
     active_session_ids = get_session_ids_from_room(room)
 
     active_user_ids = list(
-        set([SESSION_POOL.get(session_id)["id"] for session_id in active_session_ids])
+        set(
+            [
+                user["id"]
+                for user in await SESSION_POOL.get_many(active_session_ids)
+                if user
+            ]
+        )
     )
     return active_user_ids
 
 
-def get_active_status_by_user_id(user_id):
-    if user_id in USER_POOL:
+async def set_session_protocol(sid, auth):
+    # Opt-in per connection, e.g. auth={"token": ..., "protocol": "delta"}
+    protocol = auth.get("protocol") if auth else None
+    if protocol in CHAT_COMPLETION_PROTOCOLS and protocol != "full":
+        await PROTOCOL_POOL.set(sid, protocol)
+
+
+async def get_active_status_by_user_id(user_id):
+    if await USER_POOL.contains(user_id):
         return True
     return False
 
 
 @sio.on("usage")
 async def usage(sid, data):
-    if sid in SESSION_POOL:
+    if await SESSION_POOL.contains(sid):
         model_id = data["model"]
         # Record the timestamp for the last update
         current_time = int(time.time())
 
         # Store the new usage data and task
-        USAGE_POOL[model_id] = {
-            **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-            sid: {"updated_at": current_time},
-        }
+        await USAGE_POOL.set(
+            model_id,
+            {
+                **(await USAGE_POOL.get(model_id, {})),
+                sid: {"updated_at": current_time},
+            },
+        )
 
 
 @sio.event
@@ -274,13 +324,12 @@ async def connect(sid, environ, auth):
             user = Users.get_user_by_id(data["id"])
 
         if user:
-            SESSION_POOL[sid] = user.model_dump(
-                exclude=["date_of_birth", "bio", "gender"]
+            await SESSION_POOL.set(
+                sid, user.model_dump(exclude=["date_of_birth", "bio", "gender"])
             )
-            if user.id in USER_POOL:
-                USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-            else:
-                USER_POOL[user.id] = [sid]
+            await USER_POOL.add(user.id, sid)
+
+            await set_session_protocol(sid, auth)
 
 
 @sio.on("user-join")
@@ -298,11 +347,12 @@ async def user_join(sid, data):
     if not user:
         return
 
-    SESSION_POOL[sid] = user.model_dump(exclude=["date_of_birth", "bio", "gender"])
-    if user.id in USER_POOL:
-        USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-    else:
-        USER_POOL[user.id] = [sid]
+    await SESSION_POOL.set(
+        sid, user.model_dump(exclude=["date_of_birth", "bio", "gender"])
+    )
+    await USER_POOL.add(user.id, sid)
+
+    await set_session_protocol(sid, auth)
 
     # Join all the channels
     channels = Channels.get_channels_by_user_id(user.id)
@@ -386,7 +436,7 @@ async def channel_events(sid, data):
                 "channel_id": data["channel_id"],
                 "message_id": data.get("message_id", None),
                 "data": event_data,
-                "user": UserNameResponse(**SESSION_POOL[sid]).model_dump(),
+                "user": UserNameResponse(**(await SESSION_POOL.get(sid))).model_dump(),
             },
             room=room,
         )
@@ -395,7 +445,7 @@ async def channel_events(sid, data):
 @sio.on("ydoc:document:join")
 async def ydoc_document_join(sid, data):
     """Handle user joining a document"""
-    user = SESSION_POOL.get(sid)
+    user = await SESSION_POOL.get(sid)
 
     try:
         document_id = data["document_id"]
@@ -565,7 +615,7 @@ async def yjs_document_update(sid, data):
         async def debounced_save():
             await asyncio.sleep(0.5)
             await document_save_handler(
-                document_id, data.get("data", {}), SESSION_POOL.get(sid)
+                document_id, data.get("data", {}), await SESSION_POOL.get(sid)
             )
 
         if data.get("data"):
@@ -630,15 +680,11 @@ async def yjs_awareness_update(sid, data):
 
 @sio.event
 async def disconnect(sid):
-    if sid in SESSION_POOL:
-        user = SESSION_POOL[sid]
-        del SESSION_POOL[sid]
-
-        user_id = user["id"]
-        USER_POOL[user_id] = [_sid for _sid in USER_POOL[user_id] if _sid != sid]
-
-        if len(USER_POOL[user_id]) == 0:
-            del USER_POOL[user_id]
+    user = await SESSION_POOL.get(sid)
+    if user:
+        await SESSION_POOL.delete(sid)
+        await USER_POOL.remove(user["id"], sid)
+        await PROTOCOL_POOL.delete(sid)
 
         await YDOC_MANAGER.remove_user_from_all_documents(sid)
     else:
@@ -647,12 +693,30 @@ async def disconnect(sid):
 
 
 def get_event_emitter(request_info, update_db=True):
+    # One emitter per message, so the delta state is per message too
+    delta_encoder = ChatCompletionDeltaEncoder(
+        WEBSOCKET_CHAT_COMPLETION_SNAPSHOT_INTERVAL
+    )
+    # The protocol is fixed for the lifetime of a connection
+    session_protocols = {}
+
+    async def load_session_protocols(session_ids):
+        session_ids = [sid for sid in session_ids if sid not in session_protocols]
+        if session_ids:
+            for session_id, protocol in zip(
+                session_ids, await PROTOCOL_POOL.get_many(session_ids)
+            ):
+                session_protocols[session_id] = protocol or "full"
+
+    def get_session_protocol(session_id):
+        return session_protocols.get(session_id, "full")
+
     async def __event_emitter__(event_data):
         user_id = request_info["user_id"]
 
         session_ids = list(
             set(
-                USER_POOL.get(user_id, [])
+                await USER_POOL.get(user_id)
                 + (
                     [request_info.get("session_id")]
                     if request_info.get("session_id")
@@ -664,13 +728,37 @@ def get_event_emitter(request_info, update_db=True):
         chat_id = request_info.get("chat_id", None)
         message_id = request_info.get("message_id", None)
 
+        # Event data for the sessions that get a delta protocol frame
+        session_event_data = {}
+
+        data = event_data.get("data")
+        if (
+            event_data.get("type") == "chat:completion"
+            and isinstance(data, dict)
+            and isinstance(data.get("content"), str)
+        ):
+            await load_session_protocols(session_ids)
+            if any(
+                get_session_protocol(session_id) == "delta"
+                for session_id in session_ids
+            ):
+                delta, snapshot = delta_encoder.encode(data)
+                for session_id in session_ids:
+                    if get_session_protocol(session_id) == "delta":
+                        session_event_data[session_id] = {
+                            **event_data,
+                            "data": delta_encoder.get_data(session_id, delta, snapshot),
+                        }
+            else:
+                delta_encoder.synced_session_ids.clear()
+
         emit_tasks = [
             sio.emit(
                 "events",
                 {
                     "chat_id": chat_id,
                     "message_id": message_id,
-                    "data": event_data,
+                    "data": session_event_data.get(session_id, event_data),
                 },
                 to=session_id,
             )
@@ -682,95 +770,11 @@ def get_event_emitter(request_info, update_db=True):
             update_db
             and message_id
             and not request_info.get("chat_id", "").startswith("local:")
+            and event_data.get("type") in PERSISTED_EVENT_TYPES
         ):
-            if "type" in event_data and event_data["type"] == "status":
-                Chats.add_message_status_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    event_data.get("data", {}),
-                )
-
-            if "type" in event_data and event_data["type"] == "message":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                )
-
-                if message:
-                    content = message.get("content", "")
-                    content += event_data.get("data", {}).get("content", "")
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "content": content,
-                        },
-                    )
-
-            if "type" in event_data and event_data["type"] == "replace":
-                content = event_data.get("data", {}).get("content", "")
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "content": content,
-                    },
-                )
-
-            if "type" in event_data and event_data["type"] == "embeds":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                )
-
-                embeds = event_data.get("data", {}).get("embeds", [])
-                embeds.extend(message.get("embeds", []))
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "embeds": embeds,
-                    },
-                )
-
-            if "type" in event_data and event_data["type"] == "files":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                )
-
-                files = event_data.get("data", {}).get("files", [])
-                files.extend(message.get("files", []))
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "files": files,
-                    },
-                )
-
-            if event_data.get("type") in ["source", "citation"]:
-                data = event_data.get("data", {})
-                if data.get("type") == None:
-                    message = Chats.get_message_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                    )
-
-                    sources = message.get("sources", [])
-                    sources.append(data)
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "sources": sources,
-                        },
-                    )
+            await CHAT_EVENT_PERSISTER.put(
+                request_info["chat_id"], request_info["message_id"], event_data
+            )
 
     return __event_emitter__
 
@@ -1,10 +1,17 @@
+import asyncio
 import json
+import logging
+import time
 import uuid
 from open_webui.utils.redis import get_redis_connection
-from open_webui.env import REDIS_KEY_PREFIX
+from open_webui.env import REDIS_KEY_PREFIX, SRC_LOG_LEVELS
+from open_webui.models.chats import Chats
 from typing import Optional, List, Tuple
 import pycrdt as Y
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["SOCKET"])
+
 
 class RedisLock:
     def __init__(
@@ -46,66 +53,519 @@ class RedisLock:
             self.redis.delete(self.lock_name)
 
 
-class RedisDict:
-    def __init__(self, name, redis_url, redis_sentinels=[], redis_cluster=False):
+class PoolInvalidator:
+    """
+    Drops locally cached pool entries when any worker changes them, using
+    Redis pub/sub. The subscriber is started once at startup; while it is not
+    subscribed the pools don't cache, so no change can be missed. Cached
+    entries also expire after a short TTL.
+    """
+
+    def __init__(self, redis, channel: str):
+        self.redis = redis
+        self.channel = channel
+        self.pools = {}
+        self.task: Optional[asyncio.Task] = None
+        self.subscribed = False
+
+    def register(self, pool: "RedisPool"):
+        self.pools[pool.name] = pool
+
+    async def start(self):
+        """Subscribes, then handles invalidations in the running event loop."""
+        if self.task is None or self.task.done():
+            try:
+                pubsub = await self.subscribe()
+            except Exception as e:
+                log.warning(f"Pool invalidation subscriber failed to connect: {e}")
+                pubsub = None
+            self.task = asyncio.create_task(self.run(pubsub))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def subscribe(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+
+        # Changes made while not subscribed were missed
+        for pool in self.pools.values():
+            pool.cache.clear()
+        self.subscribed = True
+        return pubsub
+
+    async def run(self, pubsub=None):
+        while True:
+            if pubsub is None:
+                await asyncio.sleep(1)
+                try:
+                    pubsub = await self.subscribe()
+                except Exception as e:
+                    log.debug(f"Pool invalidation subscriber failed to connect: {e}")
+                    continue
+
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+
+                    name, _, key = message["data"].partition("\n")
+                    pool = self.pools.get(name)
+                    if pool is not None:
+                        pool.cache.pop(key, None)
+            except Exception as e:
+                log.warning(f"Pool invalidation subscriber disconnected: {e}")
+            finally:
+                self.subscribed = False
+                await pubsub.aclose()
+            pubsub = None
+
+    def publish(self, pipe, name: str, key: str):
+        pipe.publish(self.channel, f"{name}\n{key}")
+
+
+class RedisPool:
+    """
+    Base for the asyncio socket pools. Without a Redis connection the pool
+    lives in process memory. With one, reads are cached for cache_ttl
+    seconds and writes are pipelined with their invalidation message.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redis=None,
+        invalidator: Optional[PoolInvalidator] = None,
+        cache_ttl: float = 1.0,
+    ):
         self.name = name
-        self.redis = get_redis_connection(
-            redis_url,
-            redis_sentinels,
-            redis_cluster=redis_cluster,
-            decode_responses=True,
+        self.redis = redis
+        self.invalidator = invalidator
+        self.cache_ttl = cache_ttl
+        self.cache = {}
+
+        if invalidator is not None:
+            invalidator.register(self)
+
+    def can_cache(self) -> bool:
+        return self.invalidator is None or self.invalidator.subscribed
+
+    def get_cached(self, key: str) -> Optional[tuple]:
+        if not self.can_cache():
+            return None
+
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry
+        return None
+
+    def set_cached(self, key: str, value):
+        if self.can_cache():
+            self.cache[key] = (time.monotonic() + self.cache_ttl, value)
+
+    def invalidate(self, pipe, key: str):
+        self.cache.pop(key, None)
+        if self.invalidator is not None:
+            self.invalidator.publish(pipe, self.name, key)
+
+
+class SessionPool(RedisPool):
+    """A key -> JSON value mapping, stored as one Redis hash."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.local = {}
+
+    async def get(self, key: str, default=None):
+        value = (await self.get_many([key]))[0]
+        return value if value is not None else default
+
+    async def get_many(self, keys: list[str]) -> list:
+        """Looks up all keys in one round trip; missing keys are None."""
+        if self.redis is None:
+            return [self.local.get(key) for key in keys]
+
+        values = {}
+        missing = []
+        for key in keys:
+            entry = self.get_cached(key)
+            if entry is None:
+                missing.append(key)
+            else:
+                values[key] = entry[1]
+
+        if missing:
+            for key, value in zip(missing, await self.redis.hmget(self.name, missing)):
+                value = json.loads(value) if value is not None else None
+                self.set_cached(key, value)
+                values[key] = value
+
+        return [values[key] for key in keys]
+
+    async def contains(self, key: str) -> bool:
+        return await self.get(key) is not None
+
+    async def set(self, key: str, value):
+        if self.redis is None:
+            self.local[key] = value
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self.name, key, json.dumps(value))
+        self.invalidate(pipe, key)
+        await pipe.execute()
+
+    async def delete(self, key: str):
+        if self.redis is None:
+            self.local.pop(key, None)
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hdel(self.name, key)
+        self.invalidate(pipe, key)
+        await pipe.execute()
+
+    async def keys(self) -> list[str]:
+        if self.redis is None:
+            return list(self.local)
+        return await self.redis.hkeys(self.name)
+
+    async def items(self) -> list[tuple]:
+        if self.redis is None:
+            return list(self.local.items())
+        return [
+            (key, json.loads(value))
+            for key, value in (await self.redis.hgetall(self.name)).items()
+        ]
+
+
+class UserSessionPool(RedisPool):
+    """
+    user id -> session ids, stored as one Redis set per user plus a set of
+    the user ids, so that looking up or changing one user's sessions never
+    reads or rewrites the others.
+
+    In cluster mode, name should contain a hash tag (e.g. "{prefix:users}")
+    so that the removal script can touch both sets.
+    """
+
+    # Removes the session and, atomically, the user once it has none left
+    REMOVE_SCRIPT = """
+    redis.call("SREM", KEYS[1], ARGV[1])
+    if redis.call("SCARD", KEYS[1]) == 0 then
+        redis.call("SREM", KEYS[2], ARGV[2])
+    end
+    """
+
+    def __init__(self, *args, sync_redis=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sync_redis = sync_redis
+        self.local: dict[str, list[str]] = {}
+
+    def get_key(self, user_id: str) -> str:
+        return f"{self.name}:{user_id}"
+
+    async def get(self, user_id: str) -> list[str]:
+        if self.redis is None:
+            return list(self.local.get(user_id, []))
+
+        entry = self.get_cached(user_id)
+        if entry is not None:
+            return list(entry[1])
+
+        session_ids = list(await self.redis.smembers(self.get_key(user_id)))
+        self.set_cached(user_id, session_ids)
+        return list(session_ids)
+
+    async def contains(self, user_id: str) -> bool:
+        return len(await self.get(user_id)) > 0
+
+    async def keys(self) -> list[str]:
+        if self.redis is None:
+            return list(self.local)
+        return list(await self.redis.smembers(self.name))
+
+    def count(self) -> int:
+        """Number of users with sessions, callable outside the event loop."""
+        if self.redis is None:
+            return len(self.local)
+        if self.sync_redis is None:
+            return 0
+        return self.sync_redis.scard(self.name)
+
+    async def add(self, user_id: str, session_id: str):
+        if self.redis is None:
+            session_ids = self.local.setdefault(user_id, [])
+            if session_id not in session_ids:
+                session_ids.append(session_id)
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.sadd(self.get_key(user_id), session_id)
+        pipe.sadd(self.name, user_id)
+        self.invalidate(pipe, user_id)
+        await pipe.execute()
+
+    async def remove(self, user_id: str, session_id: str):
+        if self.redis is None:
+            session_ids = [
+                sid for sid in self.local.get(user_id, []) if sid != session_id
+            ]
+            if session_ids:
+                self.local[user_id] = session_ids
+            else:
+                self.local.pop(user_id, None)
+            return
+
+        await self.redis.eval(
+            self.REMOVE_SCRIPT,
+            2,
+            self.get_key(user_id),
+            self.name,
+            session_id,
+            user_id,
         )
-
-    def __setitem__(self, key, value):
-        serialized_value = json.dumps(value)
-        self.redis.hset(self.name, key, serialized_value)
-
-    def __getitem__(self, key):
-        value = self.redis.hget(self.name, key)
-        if value is None:
-            raise KeyError(key)
-        return json.loads(value)
-
-    def __delitem__(self, key):
-        result = self.redis.hdel(self.name, key)
-        if result == 0:
-            raise KeyError(key)
-
-    def __contains__(self, key):
-        return self.redis.hexists(self.name, key)
-
-    def __len__(self):
-        return self.redis.hlen(self.name)
-
-    def keys(self):
-        return self.redis.hkeys(self.name)
-
-    def values(self):
-        return [json.loads(v) for v in self.redis.hvals(self.name)]
-
-    def items(self):
-        return [(k, json.loads(v)) for k, v in self.redis.hgetall(self.name).items()]
-
-    def get(self, key, default=None):
+        pipe = self.redis.pipeline(transaction=False)
+        self.invalidate(pipe, user_id)
+        await pipe.execute()
+
+
+def get_utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+class ChatCompletionDeltaEncoder:
+    """
+    Turns the full-content chat:completion events of one message into the
+    "delta" protocol: append-only deltas numbered by seq, and a full snapshot
+    whenever the content is rewritten, the message is done, a session sees
+    the message for the first time, or every snapshot_interval events.
+
+    Delta:    {..., "delta": {"seq": 3, "offset": 120, "content": "..."}}
+    Snapshot: {..., "seq": 3, "content": "..."}
+
+    A client applies a delta only if offset matches the length of its copy
+    of the content, and otherwise waits for the next snapshot. Offsets are in
+    UTF-16 code units, the unit of JavaScript string lengths.
+    """
+
+    def __init__(self, snapshot_interval: int):
+        self.snapshot_interval = snapshot_interval
+        self.content = ""
+        self.length = 0
+        self.seq = 0
+        self.since_snapshot = 0
+        self.synced_session_ids = set()
+
+    def encode(self, data: dict) -> Tuple[Optional[dict], dict]:
+        """
+        Returns (delta, snapshot) for the event data; delta is None when every
+        session must receive the snapshot.
+        """
+        content = data["content"]
+        self.seq += 1
+
+        delta = None
+        if (
+            not data.get("done")
+            and self.since_snapshot < self.snapshot_interval
+            and content.startswith(self.content)
+        ):
+            self.since_snapshot += 1
+            appended = content[len(self.content) :]
+            delta = {
+                **{key: value for key, value in data.items() if key != "content"},
+                "delta": {
+                    "seq": self.seq,
+                    "offset": self.length,
+                    "content": appended,
+                },
+            }
+            self.length += get_utf16_length(appended)
+        else:
+            self.since_snapshot = 0
+            self.synced_session_ids.clear()
+            self.length = get_utf16_length(content)
+
+        self.content = content
+        return delta, {**data, "seq": self.seq}
+
+    def get_data(self, session_id: str, delta: Optional[dict], snapshot: dict) -> dict:
+        if delta is not None and session_id in self.synced_session_ids:
+            return delta
+
+        self.synced_session_ids.add(session_id)
+        return snapshot
+
+
+class ChatEventPersister:
+    """
+    Persists message events off the event loop. Events are queued by the
+    event emitter and a single consumer drains the queue, merges the events
+    per message and applies each message's events with one read and one
+    write in a worker thread. When max_size events are queued, emitters wait
+    for the consumer (backpressure).
+    """
+
+    def __init__(self, max_size: int = 0, max_batch_size: int = 1000):
+        self.max_size = max_size
+        self.max_batch_size = max_batch_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+        # (chat_id, message_id) -> events queued but not yet applied
+        self.pending: dict[tuple[str, str], int] = {}
+        self.applied: Optional[asyncio.Condition] = None
+
+        self.enqueued = 0
+        self.persisted = 0
+        self.batches = 0
+        self.errors = 0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+
+    async def put(self, chat_id: str, message_id: str, event_data: dict):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_size)
+            self.applied = asyncio.Condition()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+        key = (chat_id, message_id)
+        self.pending[key] = self.pending.get(key, 0) + 1
+
+        item = (chat_id, message_id, event_data)
         try:
-            return self[key]
-        except KeyError:
-            return default
-
-    def clear(self):
-        self.redis.delete(self.name)
-
-    def update(self, other=None, **kwargs):
-        if other is not None:
-            for k, v in other.items() if hasattr(other, "items") else other:
-                self[k] = v
-        for k, v in kwargs.items():
-            self[k] = v
-
-    def setdefault(self, key, default=None):
-        if key not in self:
-            self[key] = default
-        return self[key]
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            start = time.perf_counter()
+            await self.queue.put(item)
+            self.backpressure_seconds += time.perf_counter() - start
+        self.enqueued += 1
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # Keep the order of the events of each message
+            events = {}
+            for chat_id, message_id, event_data in batch:
+                events.setdefault((chat_id, message_id), []).append(event_data)
+
+            try:
+                errors = await asyncio.to_thread(self.apply, events)
+            except Exception as e:
+                errors = len(batch)
+                log.exception(f"Error persisting chat events: {e}")
+            finally:
+                self.batches += 1
+                for _ in batch:
+                    self.queue.task_done()
+
+            self.persisted += len(batch) - errors
+            self.errors += errors
+
+            for key, message_events in events.items():
+                self.pending[key] -= len(message_events)
+                if self.pending[key] <= 0:
+                    del self.pending[key]
+            async with self.applied:
+                self.applied.notify_all()
+
+    def apply(self, events: dict[tuple[str, str], list[dict]]) -> int:
+        """Returns the number of events that could not be persisted."""
+        errors = 0
+        for (chat_id, message_id), message_events in events.items():
+            try:
+                self.apply_message_events(chat_id, message_id, message_events)
+            except Exception as e:
+                errors += len(message_events)
+                log.exception(f"Error persisting events of message {message_id}: {e}")
+        return errors
+
+    def apply_message_events(
+        self, chat_id: str, message_id: str, message_events: list[dict]
+    ):
+        message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+        if message is None:
+            return
+
+        update = {}
+        for event_data in message_events:
+            current = {**message, **update}
+            event_type = event_data.get("type")
+            data = event_data.get("data", {})
+
+            # Status and content events never create the message
+            if event_type == "status":
+                if message:
+                    update["statusHistory"] = [
+                        *current.get("statusHistory", []),
+                        data,
+                    ]
+
+            elif event_type == "message":
+                if message:
+                    update["content"] = current.get("content", "") + data.get(
+                        "content", ""
+                    )
+
+            elif event_type == "replace":
+                if message:
+                    update["content"] = data.get("content", "")
+
+            elif event_type == "embeds":
+                update["embeds"] = [
+                    *data.get("embeds", []),
+                    *current.get("embeds", []),
+                ]
+
+            elif event_type == "files":
+                update["files"] = [
+                    *data.get("files", []),
+                    *current.get("files", []),
+                ]
+
+            elif event_type in ["source", "citation"] and data.get("type") is None:
+                update["sources"] = [*current.get("sources", []), data]
+
+        if update:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, message_id, update
+            )
+
+    async def flush(self):
+        """Waits until every queued event is persisted."""
+        if self.queue is not None and self.task is not None and not self.task.done():
+            await self.queue.join()
+
+    async def flush_message(self, chat_id: str, message_id: str):
+        """Waits until the queued events of one message are persisted."""
+        key = (chat_id, message_id)
+        if key in self.pending and self.task is not None and not self.task.done():
+            async with self.applied:
+                await self.applied.wait_for(lambda: key not in self.pending)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "persisted": self.persisted,
+            "batches": self.batches,
+            "errors": self.errors,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_seconds": self.backpressure_seconds,
+        }
 
 
 class YdocManager:
@@ -0,0 +1,59 @@
+import importlib
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+migration = importlib.import_module(
+    "open_webui.migrations.versions.b2f1c3d4e5a6_add_chat_message_table"
+)
+
+
+def run(engine, step):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            step()
+
+
+def test_upgrade_and_downgrade_move_messages():
+    engine = sa.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE chat (id VARCHAR PRIMARY KEY, chat JSON)"))
+
+    messages = {
+        "m1": {"id": "m1", "parentId": None, "content": "hello"},
+        "m2": {"id": "m2", "parentId": "m1", "content": ["not", "text"]},
+        "m3": {"id": "m3", "parentId": "m1", "content": "other branch"},
+    }
+    chat = {
+        "title": "Chat",
+        "history": {"currentId": "m2", "messages": messages},
+        "messages": [messages["m1"], messages["m2"]],
+    }
+    with engine.begin() as conn:
+        conn.execute(
+            migration.chat.insert(),
+            [{"id": "c1", "chat": chat}, {"id": "c2", "chat": {"title": "Legacy"}}],
+        )
+
+    run(engine, migration.upgrade)
+    with engine.connect() as conn:
+        stored = dict(conn.execute(sa.select(migration.chat)).fetchall())
+        rows = {
+            row.id: row
+            for row in conn.execute(sa.select(migration.chat_message)).fetchall()
+        }
+    assert stored["c1"] == {"title": "Chat", "history": {"currentId": "m2"}}
+    assert stored["c2"] == {"title": "Legacy"}
+    assert rows["m1"].content == "hello"
+    assert rows["m1"].meta == {"id": "m1", "parentId": None}
+    assert rows["m2"].content is None
+    assert rows["m2"].meta == messages["m2"]
+    assert rows["m3"].parent_id == "m1"
+
+    run(engine, migration.downgrade)
+    with engine.connect() as conn:
+        stored = dict(conn.execute(sa.select(migration.chat)).fetchall())
+        assert not sa.inspect(conn).has_table("chat_message")
+    assert stored["c1"] == chat
+    assert stored["c2"] == {"title": "Legacy"}
@@ -0,0 +1,60 @@
+import importlib
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+migration = importlib.import_module(
+    "open_webui.migrations.versions.e5f6a7b8c9d0_add_group_member_table"
+)
+
+group = sa.table(
+    "group",
+    sa.column("id", sa.Text()),
+    sa.column("name", sa.Text()),
+    sa.column("user_ids", sa.JSON()),
+)
+
+
+def run(engine, step):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            step()
+
+
+def test_upgrade_and_downgrade_move_members():
+    engine = sa.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(
+            sa.text(
+                'CREATE TABLE "group" (id TEXT PRIMARY KEY, name TEXT, user_ids JSON)'
+            )
+        )
+        conn.execute(
+            group.insert(),
+            [
+                {"id": "g1", "name": "one", "user_ids": ["u1", "u2", "u1"]},
+                {"id": "g2", "name": "two", "user_ids": None},
+                {"id": "g3", "name": "three", "user_ids": []},
+                {"id": "g4", "name": "four", "user_ids": ["u2", None, 3]},
+            ],
+        )
+
+    run(engine, migration.upgrade)
+    with engine.connect() as conn:
+        members = sorted(
+            (row.group_id, row.user_id)
+            for row in conn.execute(sa.select(migration.group_member))
+        )
+        columns = [column["name"] for column in sa.inspect(conn).get_columns("group")]
+    assert members == [("g1", "u1"), ("g1", "u2"), ("g4", "u2")]
+    assert columns == ["id", "name"]
+
+    run(engine, migration.downgrade)
+    with engine.connect() as conn:
+        user_ids = {
+            row.id: row.user_ids
+            for row in conn.execute(sa.select(group.c.id, group.c.user_ids))
+        }
+        assert not sa.inspect(conn).has_table("group_member")
+    assert user_ids == {"g1": ["u1", "u2"], "g2": [], "g3": [], "g4": ["u2"]}
@@ -0,0 +1,377 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+import open_webui.config  # noqa: F401 runs the migrations
+from open_webui.internal.db import get_db
+from open_webui.models.chats import (
+    Chat,
+    ChatForm,
+    ChatImportForm,
+    ChatMessage,
+    ChatMessageWriteBuffer,
+    Chats,
+)
+
+
+def create_chat(user_id=None, title="Chat", messages=None, current_id=None):
+    messages = messages or {}
+    return Chats.insert_new_chat(
+        user_id or str(uuid.uuid4()),
+        ChatForm(
+            chat={
+                "title": title,
+                "history": {"currentId": current_id, "messages": messages},
+            }
+        ),
+    )
+
+
+def test_write_buffer_coalesces_updates():
+    chat = create_chat(messages={"m1": {"id": "m1", "content": ""}}, current_id="m1")
+    buffer = ChatMessageWriteBuffer(flush_interval=60, max_pending=3)
+
+    assert not buffer.update(chat.id, "m1", {"content": "a"})
+    assert not buffer.update(chat.id, "m1", {"content": "ab", "done": False})
+    assert Chats.get_message_by_id_and_message_id(chat.id, "m1")["content"] == ""
+
+    assert buffer.update(chat.id, "m1", {"content": "abc"})
+    message = Chats.get_message_by_id_and_message_id(chat.id, "m1")
+    assert message["content"] == "abc"
+    assert message["done"] is False
+    assert buffer.pending == {}
+
+
+def test_write_buffer_flushes_pending_updates():
+    chat = create_chat(messages={"m1": {"id": "m1", "content": ""}}, current_id="m1")
+    buffer = ChatMessageWriteBuffer(flush_interval=60, max_pending=100)
+
+    assert buffer.flush(chat.id, "m1") is None
+
+    buffer.update(chat.id, "m1", {"content": "partial"})
+    assert buffer.flush(chat.id, "m1")["content"] == "partial"
+    assert Chats.get_message_by_id_and_message_id(chat.id, "m1")["content"] == (
+        "partial"
+    )
+    assert buffer.flush(chat.id, "m1") is None
+
+
+def test_write_buffer_writes_through_after_interval():
+    chat = create_chat(messages={"m1": {"id": "m1", "content": ""}}, current_id="m1")
+    buffer = ChatMessageWriteBuffer(flush_interval=0, max_pending=100)
+
+    assert buffer.update(chat.id, "m1", {"content": "now"})
+    assert Chats.get_message_by_id_and_message_id(chat.id, "m1")["content"] == "now"
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_write_buffer_flushes_stalled_updates():
+    chat = create_chat(messages={"m1": {"id": "m1", "content": ""}}, current_id="m1")
+    buffer = ChatMessageWriteBuffer(flush_interval=0.05, max_pending=100)
+
+    # No further update arrives to write the first one through
+    assert not buffer.update(chat.id, "m1", {"content": "stalled"})
+    wait_for(
+        lambda: Chats.get_message_by_id_and_message_id(chat.id, "m1")["content"]
+        == "stalled"
+    )
+    wait_for(lambda: buffer.flusher is None)
+    assert buffer.pending == {}
+    assert buffer.message_locks == {}
+
+
+def test_write_buffer_writes_outside_the_buffer_lock(monkeypatch):
+    chat = create_chat(
+        messages={"m1": {"id": "m1", "content": ""}, "m2": {"id": "m2", "content": ""}},
+        current_id="m2",
+    )
+    buffer = ChatMessageWriteBuffer(flush_interval=60, max_pending=100)
+
+    upsert = Chats.upsert_message_to_chat_by_id_and_message_id
+    writing, release = threading.Event(), threading.Event()
+
+    def slow_upsert(id, message_id, message):
+        if message["content"] == "slow":
+            writing.set()
+            assert release.wait(5)
+        return upsert(id, message_id, message)
+
+    monkeypatch.setattr(
+        Chats, "upsert_message_to_chat_by_id_and_message_id", slow_upsert
+    )
+
+    buffer.update(chat.id, "m1", {"content": "slow"})
+    slow = threading.Thread(target=buffer.flush, args=(chat.id, "m1"))
+    slow.start()
+    assert writing.wait(5)
+
+    # Other messages are written while m1 is still being written
+    buffer.update(chat.id, "m2", {"content": "fast"})
+    assert buffer.flush(chat.id, "m2")["content"] == "fast"
+
+    # A newer update of m1 waits for the older write instead of overtaking it
+    buffer.update(chat.id, "m1", {"content": "newer"})
+    newer = threading.Thread(target=buffer.flush, args=(chat.id, "m1"))
+    newer.start()
+    newer.join(0.1)
+    assert newer.is_alive()
+
+    release.set()
+    slow.join(5)
+    newer.join(5)
+    assert Chats.get_message_by_id_and_message_id(chat.id, "m1")["content"] == "newer"
+    assert buffer.message_locks == {}
+
+
+def test_messages_are_stored_as_rows():
+    messages = {
+        "m1": {"id": "m1", "parentId": None, "role": "user", "content": "hello"},
+        "m2": {"id": "m2", "parentId": "m1", "role": "assistant", "content": "hi"},
+        "m3": {"id": "m3", "parentId": "m1", "role": "assistant", "content": "hey"},
+    }
+    chat = create_chat(messages=messages, current_id="m2")
+
+    with get_db() as db:
+        stored = db.get(Chat, chat.id).chat
+        rows = db.query(ChatMessage).filter_by(chat_id=chat.id).all()
+    assert "messages" not in stored["history"]
+    assert "messages" not in stored
+    assert {row.id: row.content for row in rows} == {
+        "m1": "hello",
+        "m2": "hi",
+        "m3": "hey",
+    }
+
+    # The compatibility view reassembles the history and the current branch
+    chat = Chats.get_chat_by_id(chat.id)
+    assert chat.chat["history"] == {"currentId": "m2", "messages": messages}
+    assert [message["id"] for message in chat.chat["messages"]] == ["m1", "m2"]
+
+
+def test_upsert_updates_one_message():
+    messages = {
+        "m1": {"id": "m1", "parentId": None, "content": "hello"},
+        "m2": {"id": "m2", "parentId": "m1", "content": ""},
+    }
+    chat = create_chat(messages=messages, current_id="m1")
+
+    message = Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m2", {"content": "streamed\x00", "done": True}
+    )
+    assert message == {
+        "id": "m2",
+        "parentId": "m1",
+        "content": "streamed",
+        "done": True,
+    }
+
+    chat = Chats.get_chat_by_id(chat.id)
+    assert chat.chat["history"]["currentId"] == "m2"
+    assert chat.chat["history"]["messages"]["m1"] == messages["m1"]
+    assert chat.chat["history"]["messages"]["m2"] == message
+    assert [message["id"] for message in chat.chat["messages"]] == ["m1", "m2"]
+
+    Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m3", {"parentId": "m2", "content": "new"}
+    )
+    assert Chats.get_message_by_id_and_message_id(chat.id, "m3") == {
+        "parentId": "m2",
+        "content": "new",
+    }
+    assert Chats.get_chat_by_id(chat.id).chat["history"]["currentId"] == "m3"
+
+    assert (
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            str(uuid.uuid4()), "m1", {"content": "missing chat"}
+        )
+        is None
+    )
+
+
+def test_update_chat_replaces_messages():
+    chat = create_chat(
+        messages={
+            "m1": {"id": "m1", "content": "one"},
+            "m2": {"id": "m2", "parentId": "m1", "content": "two"},
+        },
+        current_id="m2",
+    )
+
+    Chats.update_chat_by_id(
+        chat.id,
+        {
+            "title": "Renamed",
+            "history": {
+                "currentId": "m1",
+                "messages": {"m1": {"id": "m1", "content": "edited"}},
+            },
+            "messages": [{"id": "m1", "content": "edited"}],
+        },
+    )
+
+    chat = Chats.get_chat_by_id(chat.id)
+    assert chat.title == "Renamed"
+    assert chat.chat["history"]["messages"] == {"m1": {"id": "m1", "content": "edited"}}
+    assert chat.chat["messages"] == [{"id": "m1", "content": "edited"}]
+    with get_db() as db:
+        assert "messages" not in db.get(Chat, chat.id).chat
+
+
+def test_upsert_merges_inline_message():
+    chat = create_chat()
+    with get_db() as db:
+        # A chat whose messages were not moved to rows yet
+        db.get(Chat, chat.id).chat = {
+            "title": "Chat",
+            "history": {
+                "currentId": "m1",
+                "messages": {"m1": {"id": "m1", "role": "user", "content": "old"}},
+            },
+        }
+        db.commit()
+
+    message = Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m1", {"content": "new"}
+    )
+    assert message == {"id": "m1", "role": "user", "content": "new"}
+    assert Chats.get_chat_by_id(chat.id).chat["history"]["messages"]["m1"] == message
+
+
+def search(user_id, text):
+    return [
+        chat.title for chat in Chats.get_chats_by_user_id_and_search_text(user_id, text)
+    ]
+
+
+def test_search_ranks_title_matches_first():
+    user_id = str(uuid.uuid4())
+    create_chat(
+        user_id,
+        "Cooking",
+        {"m1": {"id": "m1", "content": "a recipe for pumpkin soup"}},
+        "m1",
+    )
+    create_chat(user_id, "Pumpkin carving", {"m1": {"id": "m1", "content": "knives"}})
+    create_chat(user_id, "Other", {"m1": {"id": "m1", "content": "nothing"}}, "m1")
+    create_chat(
+        str(uuid.uuid4()), "Pumpkin", {"m1": {"id": "m1", "content": "pumpkin"}}
+    )
+
+    assert search(user_id, "pumpkin") == ["Pumpkin carving", "Cooking"]
+    # Every word must match, as a prefix
+    assert search(user_id, "pump sou") == ["Cooking"]
+    assert search(user_id, "pumpkin nothing") == []
+
+
+def test_search_index_follows_chat_updates():
+    user_id = str(uuid.uuid4())
+    chat = create_chat(user_id, "Notes", {"m1": {"id": "m1", "content": "draft"}}, "m1")
+
+    # Streamed saves leave the index as is until the message is done
+    Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m1", {"content": "final answer"}
+    )
+    assert search(user_id, "answer") == []
+    Chats.update_chat_search_by_id(chat.id)
+    assert search(user_id, "answer") == ["Notes"]
+    assert search(user_id, "draft") == []
+
+    Chats.update_chat_title_by_id(chat.id, "Renamed")
+    assert search(user_id, "renamed") == ["Renamed"]
+
+    Chats.update_chat_by_id(
+        chat.id,
+        {
+            "title": "Renamed",
+            "history": {
+                "currentId": "m1",
+                "messages": {"m1": {"id": "m1", "content": "rewritten"}},
+            },
+        },
+    )
+    assert search(user_id, "rewritten") == ["Renamed"]
+    assert search(user_id, "answer") == []
+
+    Chats.delete_chat_by_id(chat.id)
+    assert search(user_id, "rewritten") == []
+
+
+def import_chats(user_id, count):
+    for idx in range(count):
+        Chats.import_chat(
+            user_id,
+            ChatImportForm(
+                chat={"title": f"chat {idx}", "history": {"messages": {}}},
+                # Pairs of chats share an updated_at
+                created_at=1000,
+                updated_at=1000 + idx // 2,
+            ),
+        )
+
+
+def page_by_cursor(get_page, limit):
+    chats, cursor = [], None
+    while True:
+        page = get_page(cursor=cursor, limit=limit)
+        chats.extend(page)
+        if len(page) < limit:
+            return chats
+        cursor = f"{page[-1].updated_at}:{page[-1].id}"
+
+
+def test_cursor_pages_follow_updated_at_and_id():
+    user_id = str(uuid.uuid4())
+    import_chats(user_id, 9)
+
+    expected = Chats.get_chat_title_id_list_by_user_id(user_id)
+    assert [(chat.updated_at, chat.id) for chat in expected] == sorted(
+        [(chat.updated_at, chat.id) for chat in expected], reverse=True
+    )
+
+    for get_page in [
+        lambda **kwargs: Chats.get_chat_title_id_list_by_user_id(user_id, **kwargs),
+        lambda **kwargs: Chats.get_chat_list_by_user_id(user_id, **kwargs),
+        lambda **kwargs: Chats.get_chats_by_user_id_and_search_text(
+            user_id, "", **kwargs
+        ),
+    ]:
+        assert [chat.id for chat in page_by_cursor(get_page, 2)] == [
+            chat.id for chat in expected
+        ]
+
+    # Offsets are still supported
+    assert [
+        chat.id for chat in Chats.get_chat_list_by_user_id(user_id, skip=3, limit=2)
+    ] == [chat.id for chat in expected[3:5]]
+
+
+def test_cursor_pages_are_stable_while_chats_update():
+    user_id = str(uuid.uuid4())
+    import_chats(user_id, 6)
+    expected = [chat.id for chat in Chats.get_chat_title_id_list_by_user_id(user_id)]
+
+    first = Chats.get_chat_title_id_list_by_user_id(user_id, limit=3)
+    # A chat from the next page moves to the top before it is fetched
+    Chats.update_chat_title_by_id(expected[4], "updated")
+    rest = Chats.get_chat_title_id_list_by_user_id(
+        user_id, limit=10, cursor=f"{first[-1].updated_at}:{first[-1].id}"
+    )
+
+    assert [chat.id for chat in first + rest] == expected[:4] + expected[5:]
+
+
+def test_cursor_rejects_custom_order():
+    with pytest.raises(ValueError):
+        Chats.get_chat_list_by_user_id(
+            str(uuid.uuid4()),
+            filter={"order_by": "title", "direction": "asc"},
+            cursor="1000:id",
+        )
@@ -0,0 +1,90 @@
+import uuid
+
+import open_webui.config  # noqa: F401 runs the migrations
+from open_webui.models.groups import GroupForm, GroupUpdateForm, Groups
+
+
+def create_group(user_ids=None, name=None):
+    group = Groups.insert_new_group(
+        "admin", GroupForm(name=name or str(uuid.uuid4()), description="")
+    )
+    if user_ids:
+        group = Groups.add_users_to_group(group.id, user_ids)
+    return group
+
+
+def test_add_and_remove_members():
+    group = create_group()
+    version = Groups.version
+
+    group = Groups.add_users_to_group(group.id, ["u1", "u2", "u1"])
+    assert group.user_ids == ["u1", "u2"]
+    group = Groups.add_users_to_group(group.id, ["u2", "u3"])
+    assert sorted(group.user_ids) == ["u1", "u2", "u3"]
+
+    group = Groups.remove_users_from_group(group.id, ["u2", "unknown"])
+    assert sorted(group.user_ids) == ["u1", "u3"]
+    assert sorted(Groups.get_group_user_ids_by_id(group.id)) == ["u1", "u3"]
+    assert Groups.version == version + 3
+
+    assert Groups.add_users_to_group(str(uuid.uuid4()), ["u1"]) is None
+    assert Groups.get_group_user_ids_by_id(str(uuid.uuid4())) is None
+
+
+def test_update_replaces_members():
+    group = create_group(["u1", "u2"])
+
+    group = Groups.update_group_by_id(
+        group.id,
+        GroupUpdateForm(name=group.name, description="", user_ids=["u2", "u3", "u3"]),
+    )
+    assert sorted(group.user_ids) == ["u2", "u3"]
+
+    # Without user_ids the members are kept
+    group = Groups.update_group_by_id(
+        group.id, GroupUpdateForm(name="renamed", description="")
+    )
+    assert group.name == "renamed"
+    assert sorted(group.user_ids) == ["u2", "u3"]
+
+
+def test_member_lookups():
+    user_id = str(uuid.uuid4())
+    first = create_group([user_id, "other"])
+    second = create_group([user_id])
+    create_group(["other"])
+
+    assert sorted(Groups.get_group_ids_by_member_id(user_id)) == sorted(
+        [first.id, second.id]
+    )
+    assert sorted(group.id for group in Groups.get_groups_by_member_id(user_id)) == (
+        sorted([first.id, second.id])
+    )
+    assert Groups.get_group_ids_by_member_id(str(uuid.uuid4())) == []
+
+    assert Groups.remove_user_from_all_groups(user_id)
+    assert Groups.get_group_ids_by_member_id(user_id) == []
+    assert Groups.get_group_by_id(first.id).user_ids == ["other"]
+
+
+def test_sync_groups_by_group_names():
+    user_id = str(uuid.uuid4())
+    kept, removed, added = (create_group() for _ in range(3))
+    Groups.add_users_to_group(kept.id, [user_id])
+    Groups.add_users_to_group(removed.id, [user_id, "other"])
+
+    assert Groups.sync_groups_by_group_names(user_id, [kept.name, added.name])
+
+    assert sorted(Groups.get_group_ids_by_member_id(user_id)) == sorted(
+        [kept.id, added.id]
+    )
+    assert Groups.get_group_by_id(removed.id).user_ids == ["other"]
+
+
+def test_delete_group_removes_members():
+    user_id = str(uuid.uuid4())
+    group = create_group([user_id])
+
+    assert Groups.delete_group_by_id(group.id)
+    assert Groups.get_group_by_id(group.id) is None
+    assert Groups.get_group_ids_by_member_id(user_id) == []
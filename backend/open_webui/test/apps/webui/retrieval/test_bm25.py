@@ -0,0 +1,189 @@
+import os
+import threading
+
+import pytest
+from rank_bm25 import BM25Okapi
+from open_webui.retrieval.bm25 import BM25Index, BM25IndexManager
+
+
+DOCS = [
+    "the quick brown fox jumps over the lazy dog",
+    "a quick brown dog outpaces a quick fox",
+    "lorem ipsum dolor sit amet",
+    "the dog sleeps all day",
+    "foxes and dogs are not the same animal",
+]
+
+
+def build_index(docs):
+    index = BM25Index()
+    for idx, text in enumerate(docs):
+        index.add(str(idx), text, {"file_id": f"file-{idx % 2}"})
+    return index
+
+
+def test_scores_match_rank_bm25():
+    index = build_index(DOCS)
+    reference = BM25Okapi([doc.split() for doc in DOCS])
+
+    query = "quick dog fox"
+    expected = reference.get_scores(query.split())
+    for id, score in index.search(query, k=len(DOCS)):
+        assert score == pytest.approx(expected[int(id)])
+
+
+def test_remove_matches_rebuild():
+    index = build_index(DOCS)
+    index.remove("1")
+    index.remove("3")
+
+    rebuilt = BM25Index()
+    for idx, text in enumerate(DOCS):
+        if idx not in (1, 3):
+            rebuilt.add(str(idx), text, {"file_id": f"file-{idx % 2}"})
+
+    assert index.postings == rebuilt.postings
+    assert index.total_length == rebuilt.total_length
+    assert index.search("dog", k=3) == rebuilt.search("dog", k=3)
+
+
+def test_remove_where_filter():
+    index = build_index(DOCS)
+    assert index.remove_where({"file_id": "file-0"}) == 3
+    assert sorted(index.docs.keys()) == ["1", "3"]
+
+
+def test_manager_persists_and_updates(tmp_path):
+    manager = BM25IndexManager(str(tmp_path))
+    manager.create("collection")
+    manager.on_insert(
+        "collection",
+        [
+            {"id": str(idx), "text": text, "metadata": {"file_id": str(idx)}}
+            for idx, text in enumerate(DOCS)
+        ],
+    )
+
+    # A fresh manager (e.g. another worker) loads the persisted index
+    other = BM25IndexManager(str(tmp_path))
+    assert len(other.get_index("collection")) == len(DOCS)
+
+    manager.on_delete("collection", filter={"file_id": "0"})
+    assert len(other.get_index("collection")) == len(DOCS) - 1
+
+    manager.on_delete_collection("collection")
+    assert manager._load("collection") is None
+
+
+def test_manager_builds_missing_indexes_once(tmp_path, monkeypatch):
+    import threading
+    from open_webui.retrieval import bm25
+    from open_webui.retrieval.vector.main import GetResult
+
+    fetched = []
+
+    class FakeVectorDB:
+        def get(self, collection_name):
+            fetched.append(collection_name)
+            return GetResult(
+                ids=[[str(idx) for idx in range(len(DOCS))]],
+                documents=[DOCS],
+                metadatas=[[{} for _ in DOCS]],
+            )
+
+    monkeypatch.setattr(bm25, "VECTOR_DB_CLIENT", FakeVectorDB())
+    manager = BM25IndexManager(str(tmp_path))
+
+    threads = [
+        threading.Thread(target=manager.get_indexes, args=(["a", "b"],))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(fetched) == ["a", "b"]
+    assert len(manager.get_indexes(["a"])["a"]) == len(DOCS)
+
+
+def test_manager_appends_changes_to_log(tmp_path):
+    manager = BM25IndexManager(str(tmp_path))
+    manager.create("collection")
+    snapshot = manager._version(manager._path("collection"))
+
+    for idx, text in enumerate(DOCS):
+        manager.on_insert(
+            "collection", [{"id": str(idx), "text": text, "metadata": {}}]
+        )
+
+    # Inserts only append to the log, the snapshot is left alone
+    assert manager._version(manager._path("collection")) == snapshot
+    assert BM25IndexManager(str(tmp_path)).get_index("collection").search(
+        "quick dog fox", k=len(DOCS)
+    ) == build_index(DOCS).search("quick dog fox", k=len(DOCS))
+
+
+def test_manager_compacts_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(BM25IndexManager, "COMPACT_MIN_SIZE", 0)
+    manager = BM25IndexManager(str(tmp_path))
+    manager.create("collection")
+    manager.on_insert(
+        "collection",
+        [
+            {"id": str(idx), "text": text, "metadata": {}}
+            for idx, text in enumerate(DOCS)
+        ],
+    )
+
+    assert not os.path.exists(manager._path("collection", "log"))
+    assert len(BM25IndexManager(str(tmp_path)).get_index("collection")) == len(DOCS)
+
+
+def test_managers_do_not_lose_each_others_changes(tmp_path):
+    first = BM25IndexManager(str(tmp_path))
+    second = BM25IndexManager(str(tmp_path))
+    first.create("collection")
+    assert len(second.get_index("collection")) == 0
+
+    # Both workers have the index cached and insert in turns
+    for idx, text in enumerate(DOCS):
+        worker = first if idx % 2 else second
+        worker.on_insert("collection", [{"id": str(idx), "text": text, "metadata": {}}])
+    second.on_delete("collection", ids=["0"])
+
+    for manager in [first, second, BM25IndexManager(str(tmp_path))]:
+        assert sorted(manager.get_index("collection").docs) == ["1", "2", "3", "4"]
+
+
+def test_slow_collection_does_not_block_others(tmp_path, monkeypatch):
+    manager = BM25IndexManager(str(tmp_path))
+    manager.create("slow")
+    manager.create("fast")
+
+    reading, release = threading.Event(), threading.Event()
+    read = manager._read
+
+    def slow_read(collection_name):
+        if collection_name == "slow":
+            reading.set()
+            release.wait(5)
+        return read(collection_name)
+
+    monkeypatch.setattr(manager, "_read", slow_read)
+
+    # Reads the slow collection, holding its lock until released
+    thread = threading.Thread(
+        target=manager.on_insert,
+        args=("slow", [{"id": "0", "text": DOCS[0], "metadata": {}}]),
+    )
+    thread.start()
+    assert reading.wait(5)
+
+    manager.on_insert("fast", [{"id": "1", "text": DOCS[1], "metadata": {}}])
+    assert len(manager.get_index("fast")) == 1
+    assert thread.is_alive()
+
+    release.set()
+    thread.join()
+    assert len(manager.get_index("slow")) == 1
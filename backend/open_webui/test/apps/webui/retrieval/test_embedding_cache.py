@@ -0,0 +1,37 @@
+from open_webui.retrieval.embeddings import EmbeddingCache
+
+
+def make_engine(fail_with=...):
+    calls = []
+
+    def embed(query, prefix=None, user=None):
+        calls.append(query)
+        if fail_with is not ...:
+            return fail_with
+        texts = query if isinstance(query, list) else [query]
+        return [[float(len(text)), float(ord(text[0]))] for text in texts]
+
+    return embed, calls
+
+
+def test_only_missing_texts_are_embedded():
+    cache = EmbeddingCache(max_size=100)
+    embed, calls = make_engine()
+    cached = cache.wrap(embed, "engine", "model")
+
+    assert cached(["ab", "c", "ab"]) == [[2.0, 97.0], [1.0, 99.0], [2.0, 97.0]]
+    assert cached(["c", "def"]) == [[1.0, 99.0], [3.0, 100.0]]
+    assert cached("def") == [3.0, 100.0]
+    assert calls == [["ab", "c"], ["def"]]
+
+
+def test_failed_engine_is_not_called_again():
+    for result in [None, [], [[1.0]]]:
+        cache = EmbeddingCache(max_size=100)
+        embed, calls = make_engine(fail_with=result)
+        cached = cache.wrap(embed, "engine", "model")
+
+        # Duplicates make the missing texts fewer than the input
+        assert cached(["a", "b", "a"]) is None
+        assert calls == [["a", "b"]]
+        assert cache.entries == {}
@@ -0,0 +1,150 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import anyio
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from open_webui.models.files import FileForm, Files
+from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.routers import retrieval
+
+
+class EmbeddingModel:
+    """Embeds texts by their length; raises on the fail_on-th call."""
+
+    def __init__(self, fail_on=None):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("embedding engine is down")
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def make_request(model):
+    config = SimpleNamespace(
+        TEXT_SPLITTER="character",
+        CHUNK_SIZE=1000,
+        CHUNK_OVERLAP=100,
+        RAG_EMBEDDING_ENGINE="",
+        RAG_EMBEDDING_MODEL=f"test-{uuid.uuid4()}",
+        RAG_EMBEDDING_BATCH_SIZE=1,
+        RAG_OPENAI_API_BASE_URL="",
+        RAG_OPENAI_API_KEY="",
+        RAG_OLLAMA_BASE_URL="",
+        RAG_OLLAMA_API_KEY="",
+        RAG_AZURE_OPENAI_BASE_URL="",
+        RAG_AZURE_OPENAI_API_KEY="",
+        RAG_AZURE_OPENAI_API_VERSION="",
+    )
+    return SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(config=config, ef=model))
+    )
+
+
+def make_docs(count):
+    return [Document(page_content=f"chunk {idx} " * (idx + 1)) for idx in range(count)]
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = []
+
+    def get_event_emitter(request_info, update_db=True):
+        async def emit(event):
+            events.append(event["data"])
+
+        return emit
+
+    monkeypatch.setattr(retrieval, "get_event_emitter", get_event_emitter)
+    monkeypatch.setattr(retrieval, "RAG_INGESTION_BATCH_SIZE", 2)
+    return events
+
+
+def test_failed_ingestion_resumes_from_checkpoint(events):
+    collection_name = f"test-{uuid.uuid4()}"
+    file = Files.insert_new_file(
+        "user", FileForm(id=str(uuid.uuid4()), filename="f.txt", path="")
+    )
+    metadata = {"file_id": file.id, "hash": str(uuid.uuid4())}
+    docs = make_docs(6)
+
+    # The third batch fails to embed, after the first was inserted
+    with pytest.raises(RuntimeError):
+        retrieval.save_docs_to_vector_db(
+            make_request(EmbeddingModel(fail_on=3)),
+            docs,
+            collection_name,
+            metadata=metadata,
+            split=False,
+        )
+    checkpoint = Files.get_file_by_id(file.id).data["ingestion"]
+    assert checkpoint == {
+        "collection_name": collection_name,
+        "hash": metadata["hash"],
+        "inserted": 2,
+    }
+
+    model = EmbeddingModel()
+    assert retrieval.save_docs_to_vector_db(
+        make_request(model), docs, collection_name, metadata=metadata, split=False
+    )
+    # Only the chunks after the checkpoint are embedded again
+    assert model.calls == 2
+    assert Files.get_file_by_id(file.id).data["ingestion"] is None
+
+    result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+    assert sorted(result.documents[0]) == sorted(doc.page_content for doc in docs)
+
+    # With the ingestion completed, the same content is a duplicate again
+    with pytest.raises(ValueError):
+        retrieval.save_docs_to_vector_db(
+            make_request(EmbeddingModel()),
+            docs,
+            collection_name,
+            metadata=metadata,
+            split=False,
+        )
+
+
+def test_progress_is_emitted_from_any_thread(events):
+    user = SimpleNamespace(id="user")
+
+    def save(event_loop=None):
+        return retrieval.save_docs_to_vector_db(
+            make_request(EmbeddingModel()),
+            make_docs(3),
+            f"test-{uuid.uuid4()}",
+            split=False,
+            user=user,
+            event_loop=event_loop,
+        )
+
+    async def run():
+        # A thread of our own pool, as in process_files_batch
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            await asyncio.get_running_loop().run_in_executor(
+                executor, save, asyncio.get_running_loop()
+            )
+        # An AnyIO worker thread, as for a sync endpoint
+        await anyio.to_thread.run_sync(save)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    statuses = [(event["status"], event["processed"]) for event in events]
+    assert (
+        statuses
+        == [
+            ("processing", 0),
+            ("processing", 2),
+            ("completed", 3),
+        ]
+        * 2
+    )
@@ -0,0 +1,57 @@
+from langchain_core.documents import Document
+
+from open_webui.retrieval.utils import rerank_hybrid_search_candidates
+
+
+def first_query_reranker(sentences, user=None):
+    """Scores the batch against its first query, like ColBERT and the external API."""
+    query = sentences[0][0]
+    return [float(query in document) for _, document in sentences]
+
+
+def test_rerank_scores_each_query_separately():
+    calls = []
+
+    def reranker(sentences, user=None):
+        calls.append(sentences)
+        return first_query_reranker(sentences)
+
+    documents = [
+        Document(page_content="all about apples", metadata={"id": "a"}),
+        Document(page_content="all about pears", metadata={"id": "p"}),
+    ]
+    candidates = [
+        ("apples", list(documents)),
+        ("pears", list(documents)),
+        ("apples", list(documents)),
+    ]
+
+    results = rerank_hybrid_search_candidates(
+        candidates, reranker, k=2, k_reranker=1, r=0.5
+    )
+
+    assert [result["documents"][0] for result in results] == [
+        ["all about apples"],
+        ["all about pears"],
+        ["all about apples"],
+    ]
+    assert [result["distances"][0] for result in results] == [[1.0], [1.0], [1.0]]
+    # One call per distinct query, every batch for a single query
+    assert len(calls) == 2
+    for sentences in calls:
+        assert len({query for query, _ in sentences}) == 1
+
+
+def test_rerank_keeps_documents_without_scores():
+    documents = [Document(page_content="text", metadata={})]
+
+    results = rerank_hybrid_search_candidates(
+        [("query", documents), ("other", [])],
+        lambda sentences, user=None: None,
+        k=2,
+        k_reranker=2,
+        r=0.0,
+    )
+
+    assert results[0]["documents"][0] == ["text"]
+    assert results[1]["documents"][0] == []
@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+
+import open_webui.config  # noqa: F401 runs the migrations
+from open_webui.models.chats import ChatForm, Chats
+from open_webui.socket.utils import ChatEventPersister
+
+
+def create_chat():
+    return Chats.insert_new_chat(
+        str(uuid.uuid4()),
+        ChatForm(
+            chat={
+                "history": {
+                    "currentId": "m1",
+                    "messages": {"m1": {"id": "m1", "content": "a"}},
+                }
+            }
+        ),
+    )
+
+
+def test_events_do_not_create_missing_messages():
+    chat = create_chat()
+    persister = ChatEventPersister()
+
+    persister.apply_message_events(
+        chat.id,
+        "missing",
+        [
+            {"type": "status", "data": {"description": "searching"}},
+            {"type": "message", "data": {"content": "b"}},
+            {"type": "replace", "data": {"content": "c"}},
+        ],
+    )
+
+    assert Chats.get_message_by_id_and_message_id(chat.id, "missing") == {}
+    assert "missing" not in Chats.get_messages_map_by_chat_id(chat.id)
+
+
+def test_events_update_existing_messages():
+    chat = create_chat()
+    persister = ChatEventPersister()
+
+    persister.apply_message_events(
+        chat.id,
+        "m1",
+        [
+            {"type": "message", "data": {"content": "b"}},
+            {"type": "files", "data": {"files": [{"id": "f"}]}},
+            {"type": "message", "data": {"content": "c"}},
+        ],
+    )
+
+    message = Chats.get_message_by_id_and_message_id(chat.id, "m1")
+    assert message["content"] == "abc"
+    assert message["files"] == [{"id": "f"}]
+
+
+def test_flush_message_waits_for_queued_events():
+    chat = create_chat()
+
+    async def run():
+        persister = ChatEventPersister()
+        for content in "bcd":
+            await persister.put(
+                chat.id, "m1", {"type": "message", "data": {"content": content}}
+            )
+        await persister.flush_message(chat.id, "m1")
+
+        assert persister.pending == {}
+        assert Chats.get_message_by_id_and_message_id(chat.id, "m1")["content"] == (
+            "abcd"
+        )
+
+        # Nothing queued for the message
+        await asyncio.wait_for(persister.flush_message(chat.id, "m1"), 1)
+        persister.task.cancel()
+
+    asyncio.run(run())
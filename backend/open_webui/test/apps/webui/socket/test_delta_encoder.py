@@ -0,0 +1,74 @@
+from open_webui.socket.utils import ChatCompletionDeltaEncoder
+
+
+def apply(content, data):
+    # Mirrors chatCompletionEventHandler in the frontend
+    if "delta" in data:
+        # JavaScript string lengths count UTF-16 code units
+        if data["delta"]["offset"] == len(content.encode("utf-16-le")) // 2:
+            return content + data["delta"]["content"]
+        return content
+    return data["content"]
+
+
+def test_sessions_reconstruct_content():
+    encoder = ChatCompletionDeltaEncoder(snapshot_interval=4)
+    events = ["a", "ab", "abc", "abcd", "xbcd", "xbcde", "xbcdef"]
+    clients = {"early": "", "late": ""}
+
+    kinds = []
+    for idx, content in enumerate(events):
+        delta, snapshot = encoder.encode({"content": content, "done": False})
+        for session_id in clients:
+            if session_id == "late" and idx < 2:
+                continue
+            data = encoder.get_data(session_id, delta, snapshot)
+            if session_id == "early":
+                kinds.append("delta" if "delta" in data else "snapshot")
+            clients[session_id] = apply(clients[session_id], data)
+            assert clients[session_id] == content
+
+    # New session, then deltas until the rewrite ("a" -> "x")
+    assert kinds == [
+        "snapshot",
+        "delta",
+        "delta",
+        "delta",
+        "snapshot",
+        "delta",
+        "delta",
+    ]
+
+    delta, snapshot = encoder.encode({"content": "xbcdefg", "done": True})
+    assert delta is None
+    assert snapshot["content"] == "xbcdefg"
+    assert snapshot["seq"] == len(events) + 1
+
+
+def test_missed_delta_waits_for_snapshot():
+    encoder = ChatCompletionDeltaEncoder(snapshot_interval=2)
+    content = ""
+    for idx, text in enumerate(["a", "ab", "abc", "abcd"]):
+        delta, snapshot = encoder.encode({"content": text})
+        data = encoder.get_data("session", delta, snapshot)
+        if idx == 1:
+            continue  # dropped
+        content = apply(content, data)
+    assert content == "abcd"
+
+
+def test_offsets_count_utf16_code_units():
+    encoder = ChatCompletionDeltaEncoder(snapshot_interval=10)
+    content = ""
+    for text in [
+        "\U0001f600",
+        "\U0001f600é",
+        "\U0001f600é\U0001f680",
+        "\U0001f600é\U0001f680!",
+    ]:
+        delta, snapshot = encoder.encode({"content": text})
+        data = encoder.get_data("session", delta, snapshot)
+        content = apply(content, data)
+        assert content == text
+
+    assert data["delta"]["offset"] == 5
@@ -0,0 +1,178 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from open_webui.socket.utils import PoolInvalidator, SessionPool, UserSessionPool
+
+CHANNEL = "test:pool_invalidations"
+
+
+class Instance:
+    """The pools of one worker, sharing Redis with the other workers."""
+
+    def __init__(self, server=None):
+        self.redis = None
+        self.invalidator = None
+        self.sync_redis = None
+        if server is not None:
+            self.redis = fakeredis.aioredis.FakeRedis(
+                server=server, decode_responses=True
+            )
+            self.sync_redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+            self.invalidator = PoolInvalidator(self.redis, CHANNEL)
+
+        # Long enough that only an invalidation can refresh a cached entry
+        self.sessions = SessionPool(
+            "test:session_pool", self.redis, self.invalidator, cache_ttl=60
+        )
+        self.users = UserSessionPool(
+            "{test:user_sessions}",
+            self.redis,
+            self.invalidator,
+            cache_ttl=60,
+            sync_redis=self.sync_redis,
+        )
+
+    async def start(self):
+        if self.invalidator is not None:
+            await self.invalidator.start()
+
+    async def stop(self):
+        if self.invalidator is not None:
+            await self.invalidator.stop()
+
+
+async def wait_for(get, expected, timeout=5):
+    async with asyncio.timeout(timeout):
+        while await get() != expected:
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_instance(request):
+    server = fakeredis.FakeServer() if request.param == "redis" else None
+    return lambda: Instance(server)
+
+
+def test_session_pool(make_instance):
+    async def run():
+        instance = make_instance()
+        await instance.start()
+        pool = instance.sessions
+
+        assert await pool.get("a") is None
+        assert await pool.get("a", {}) == {}
+        assert not await pool.contains("a")
+
+        await pool.set("a", {"id": "u1"})
+        await pool.set("b", {"id": "u2"})
+        assert await pool.get("a") == {"id": "u1"}
+        assert await pool.contains("a")
+        assert await pool.get_many(["b", "missing", "a"]) == [
+            {"id": "u2"},
+            None,
+            {"id": "u1"},
+        ]
+
+        await pool.set("a", {"id": "u3"})
+        assert await pool.get("a") == {"id": "u3"}
+        assert sorted(await pool.keys()) == ["a", "b"]
+        assert sorted(await pool.items()) == [("a", {"id": "u3"}), ("b", {"id": "u2"})]
+
+        await pool.delete("a")
+        await pool.delete("missing")
+        assert await pool.get("a") is None
+        assert await pool.get_many(["a", "b"]) == [None, {"id": "u2"}]
+        assert await pool.keys() == ["b"]
+
+        await instance.stop()
+
+    asyncio.run(run())
+
+
+def test_user_session_pool(make_instance):
+    async def run():
+        instance = make_instance()
+        await instance.start()
+        pool = instance.users
+
+        assert await pool.get("u1") == []
+        assert pool.count() == 0
+
+        await pool.add("u1", "s1")
+        await pool.add("u1", "s2")
+        await pool.add("u1", "s2")
+        await pool.add("u2", "s3")
+        assert sorted(await pool.get("u1")) == ["s1", "s2"]
+        assert await pool.contains("u2")
+        assert sorted(await pool.keys()) == ["u1", "u2"]
+        assert pool.count() == 2
+
+        await pool.remove("u1", "s1")
+        assert await pool.get("u1") == ["s2"]
+        assert sorted(await pool.keys()) == ["u1", "u2"]
+
+        # The last session takes the user out of the index
+        await pool.remove("u1", "s2")
+        assert await pool.get("u1") == []
+        assert not await pool.contains("u1")
+        assert await pool.keys() == ["u2"]
+        assert pool.count() == 1
+        if instance.sync_redis is not None:
+            assert instance.sync_redis.smembers("{test:user_sessions}") == {"u2"}
+            assert not instance.sync_redis.exists("{test:user_sessions}:u1")
+
+        await instance.stop()
+
+    asyncio.run(run())
+
+
+def test_changes_invalidate_other_instances():
+    async def run():
+        server = fakeredis.FakeServer()
+        first, second = Instance(server), Instance(server)
+        await first.start()
+        await second.start()
+
+        await first.sessions.set("x", 1)
+        await first.users.add("u1", "s1")
+        assert await second.sessions.get("x") == 1
+        assert await second.users.get("u1") == ["s1"]
+        assert "x" in second.sessions.cache
+
+        await first.sessions.set("x", 2)
+        await wait_for(lambda: second.sessions.get("x"), 2)
+        await first.users.remove("u1", "s1")
+        await wait_for(lambda: second.users.get("u1"), [])
+
+        await first.sessions.delete("x")
+        await wait_for(lambda: second.sessions.get("x"), None)
+
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(run())
+
+
+def test_pools_do_not_cache_without_the_subscriber():
+    async def run():
+        server = fakeredis.FakeServer()
+        instance, other = Instance(server), Instance(server)
+        await other.start()
+
+        # Not started, so invalidations from other instances would be missed
+        await other.sessions.set("x", 1)
+        assert await instance.sessions.get("x") == 1
+        await other.sessions.set("x", 2)
+        assert await instance.sessions.get("x") == 2
+        assert instance.sessions.cache == {}
+
+        await instance.start()
+        assert await instance.sessions.get("x") == 2
+        assert "x" in instance.sessions.cache
+
+        await instance.stop()
+        await other.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import open_webui.config  # noqa: F401 runs the migrations
+from open_webui.models.groups import GroupForm, Groups
+from open_webui.utils import access_control
+from open_webui.utils.access_control import (
+    authorization_scope,
+    get_authorization_context,
+)
+
+
+def test_contexts_are_cached_until_groups_change():
+    user_id = str(uuid.uuid4())
+    context = get_authorization_context(user_id)
+    assert context.group_ids == set()
+    assert get_authorization_context(user_id) is context
+
+    group = Groups.insert_new_group("admin", GroupForm(name="g", description=""))
+    Groups.add_users_to_group(group.id, [user_id])
+
+    context = get_authorization_context(user_id)
+    assert context.group_ids == {group.id}
+    Groups.delete_group_by_id(group.id)
+
+
+def test_request_scope_pins_contexts():
+    user_id = str(uuid.uuid4())
+    with authorization_scope():
+        context = get_authorization_context(user_id)
+        Groups.version += 1
+        assert get_authorization_context(user_id) is context
+    assert get_authorization_context(user_id) is not context
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(access_control, "AUTHORIZATION_CACHE_MAX_SIZE", 3)
+    user_ids = [str(uuid.uuid4()) for _ in range(5)]
+
+    first = get_authorization_context(user_ids[0])
+    for user_id in user_ids[1:3]:
+        get_authorization_context(user_id)
+    # Recently used contexts are kept
+    assert get_authorization_context(user_ids[0]) is first
+    for user_id in user_ids[3:]:
+        get_authorization_context(user_id)
+
+    assert list(access_control._cached_contexts) == [
+        user_ids[0],
+        user_ids[3],
+        user_ids[4],
+    ]
+
+
+def test_cache_is_safe_across_threads(monkeypatch):
+    monkeypatch.setattr(access_control, "AUTHORIZATION_CACHE_MAX_SIZE", 50)
+    user_ids = [str(uuid.uuid4()) for _ in range(200)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        contexts = list(executor.map(get_authorization_context, user_ids * 5))
+
+    assert all(
+        context.user_id == user_id for context, user_id in zip(contexts, user_ids * 5)
+    )
+    assert len(access_control._cached_contexts) == 50
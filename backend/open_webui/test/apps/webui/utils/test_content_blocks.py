@@ -0,0 +1,502 @@
+import html
+import json
+import re
+import time
+
+import pytest
+
+from open_webui.utils.content_blocks import (
+    DEFAULT_CODE_INTERPRETER_TAGS,
+    DEFAULT_REASONING_TAGS,
+    DEFAULT_SOLUTION_TAGS,
+    ContentBlockSerializer,
+    ContentTagHandler,
+    is_opening_code_block,
+    split_content_and_whitespace,
+)
+
+TAGS = [
+    ("reasoning", DEFAULT_REASONING_TAGS),
+    ("solution", DEFAULT_SOLUTION_TAGS),
+    ("code_interpreter", DEFAULT_CODE_INTERPRETER_TAGS),
+]
+
+
+# The full serialization path as process_chat_response ran it on every delta
+# before the incremental handlers, kept verbatim as the reference.
+def serialize_content_blocks(content_blocks, raw=False):
+    content = ""
+
+    for block in content_blocks:
+        if block["type"] == "text":
+            block_content = block["content"].strip()
+            if block_content:
+                content = f"{content}{block_content}\n"
+        elif block["type"] == "tool_calls":
+            attributes = block.get("attributes", {})
+
+            tool_calls = block.get("content", [])
+            results = block.get("results", [])
+
+            if content and not content.endswith("\n"):
+                content += "\n"
+
+            if results:
+
+                tool_calls_display_content = ""
+                for tool_call in tool_calls:
+
+                    tool_call_id = tool_call.get("id", "")
+                    tool_name = tool_call.get("function", {}).get("name", "")
+                    tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                    tool_result = None
+                    tool_result_files = None
+                    for result in results:
+                        if tool_call_id == result.get("tool_call_id", ""):
+                            tool_result = result.get("content", None)
+                            tool_result_files = result.get("files", None)
+                            break
+
+                    if tool_result is not None:
+                        tool_result_embeds = result.get("embeds", "")
+                        tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}" embeds="{html.escape(json.dumps(tool_result_embeds))}">\n<summary>Tool Executed</summary>\n</details>\n'
+                    else:
+                        tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+                if not raw:
+                    content = f"{content}{tool_calls_display_content}"
+            else:
+                tool_calls_display_content = ""
+
+                for tool_call in tool_calls:
+                    tool_call_id = tool_call.get("id", "")
+                    tool_name = tool_call.get("function", {}).get("name", "")
+                    tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                    tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+                if not raw:
+                    content = f"{content}{tool_calls_display_content}"
+
+        elif block["type"] == "reasoning":
+            reasoning_display_content = html.escape(
+                "\n".join(
+                    (f"> {line}" if not line.startswith(">") else line)
+                    for line in block["content"].splitlines()
+                )
+            )
+
+            reasoning_duration = block.get("duration", None)
+
+            start_tag = block.get("start_tag", "")
+            end_tag = block.get("end_tag", "")
+
+            if content and not content.endswith("\n"):
+                content += "\n"
+
+            if reasoning_duration is not None:
+                if raw:
+                    content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+                else:
+                    content = f'{content}<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+            else:
+                if raw:
+                    content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+                else:
+                    content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+        elif block["type"] == "code_interpreter":
+            attributes = block.get("attributes", {})
+            output = block.get("output", None)
+            lang = attributes.get("lang", "")
+
+            content_stripped, original_whitespace = split_content_and_whitespace(
+                content
+            )
+            if is_opening_code_block(content_stripped):
+                # Remove trailing backticks that would open a new block
+                content = content_stripped.rstrip("`").rstrip() + original_whitespace
+            else:
+                # Keep content as is - either closing backticks or no backticks
+                content = content_stripped + original_whitespace
+
+            if content and not content.endswith("\n"):
+                content += "\n"
+
+            if output:
+                output = html.escape(json.dumps(output))
+
+                if raw:
+                    content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+                else:
+                    content = f'{content}<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+            else:
+                if raw:
+                    content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+                else:
+                    content = f'{content}<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+        else:
+            block_content = str(block["content"]).strip()
+            if block_content:
+                content = f"{content}{block['type']}: {block_content}\n"
+
+    return content.strip()
+
+
+def tag_content_handler(content_type, tags, content, content_blocks):
+    end_flag = False
+
+    def extract_attributes(tag_content):
+        """Extract attributes from a tag if they exist."""
+        attributes = {}
+        if not tag_content:  # Ensure tag_content is not None
+            return attributes
+        # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+        matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
+        for key, value in matches:
+            attributes[key] = value
+        return attributes
+
+    if content_blocks[-1]["type"] == "text":
+        for start_tag, end_tag in tags:
+
+            start_tag_pattern = rf"{re.escape(start_tag)}"
+            if start_tag.startswith("<") and start_tag.endswith(">"):
+                # Match start tag e.g., <tag> or <tag attr="value">
+                # remove both '<' and '>' from start_tag
+                # Match start tag with attributes
+                start_tag_pattern = rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+
+            match = re.search(start_tag_pattern, content)
+            if match:
+                try:
+                    attr_content = (
+                        match.group(1) if match.group(1) else ""
+                    )  # Ensure it's not None
+                except:
+                    attr_content = ""
+
+                attributes = extract_attributes(
+                    attr_content
+                )  # Extract attributes safely
+
+                # Capture everything before and after the matched tag
+                before_tag = content[: match.start()]  # Content before opening tag
+                after_tag = content[match.end() :]  # Content after opening tag
+
+                # Remove the start tag and after from the currently handling text block
+                content_blocks[-1]["content"] = content_blocks[-1]["content"].replace(
+                    match.group(0) + after_tag, ""
+                )
+
+                if before_tag:
+                    content_blocks[-1]["content"] = before_tag
+
+                if not content_blocks[-1]["content"]:
+                    content_blocks.pop()
+
+                # Append the new block
+                content_blocks.append(
+                    {
+                        "type": content_type,
+                        "start_tag": start_tag,
+                        "end_tag": end_tag,
+                        "attributes": attributes,
+                        "content": "",
+                        "started_at": time.time(),
+                    }
+                )
+
+                if after_tag:
+                    content_blocks[-1]["content"] = after_tag
+                    tag_content_handler(content_type, tags, after_tag, content_blocks)
+
+                break
+    elif content_blocks[-1]["type"] == content_type:
+        start_tag = content_blocks[-1]["start_tag"]
+        end_tag = content_blocks[-1]["end_tag"]
+
+        if end_tag.startswith("<") and end_tag.endswith(">"):
+            # Match end tag e.g., </tag>
+            end_tag_pattern = rf"{re.escape(end_tag)}"
+        else:
+            # Handle cases where end_tag is just a tag name
+            end_tag_pattern = rf"{re.escape(end_tag)}"
+
+        # Check if the content has the end tag
+        if re.search(end_tag_pattern, content):
+            end_flag = True
+
+            block_content = content_blocks[-1]["content"]
+            # Strip start and end tags from the content
+            start_tag_pattern = rf"<{re.escape(start_tag)}(.*?)>"
+            block_content = re.sub(start_tag_pattern, "", block_content).strip()
+
+            end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
+            split_content = end_tag_regex.split(block_content, maxsplit=1)
+
+            # Content inside the tag
+            block_content = split_content[0].strip() if split_content else ""
+
+            # Leftover content (everything after `</tag>`)
+            leftover_content = (
+                split_content[1].strip() if len(split_content) > 1 else ""
+            )
+
+            if block_content:
+                content_blocks[-1]["content"] = block_content
+                content_blocks[-1]["ended_at"] = time.time()
+                content_blocks[-1]["duration"] = int(
+                    content_blocks[-1]["ended_at"] - content_blocks[-1]["started_at"]
+                )
+
+                # Reset the content_blocks by appending a new text block
+                if content_type != "code_interpreter":
+                    if leftover_content:
+
+                        content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": leftover_content,
+                            }
+                        )
+                    else:
+                        content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": "",
+                            }
+                        )
+
+            else:
+                # Remove the block if content is empty
+                content_blocks.pop()
+
+                if leftover_content:
+                    content_blocks.append(
+                        {
+                            "type": "text",
+                            "content": leftover_content,
+                        }
+                    )
+                else:
+                    content_blocks.append(
+                        {
+                            "type": "text",
+                            "content": "",
+                        }
+                    )
+
+            # Clean processed content
+            start_tag_pattern = rf"{re.escape(start_tag)}"
+            if start_tag.startswith("<") and start_tag.endswith(">"):
+                # Match start tag e.g., <tag> or <tag attr="value">
+                # remove both '<' and '>' from start_tag
+                # Match start tag with attributes
+                start_tag_pattern = rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+
+            content = re.sub(
+                rf"{start_tag_pattern}(.|\n)*?{re.escape(end_tag)}",
+                "",
+                content,
+                flags=re.DOTALL,
+            )
+
+    return content, content_blocks, end_flag
+
+
+def reasoning_content(value):
+    """A reasoning_content delta, as sent by models with a separate field."""
+
+    def step(content_blocks):
+        if content_blocks[-1]["type"] != "reasoning":
+            content_blocks.append(
+                {
+                    "type": "reasoning",
+                    "start_tag": "<think>",
+                    "end_tag": "</think>",
+                    "attributes": {"type": "reasoning_content"},
+                    "content": "",
+                    "started_at": time.time(),
+                }
+            )
+        content_blocks[-1]["content"] += value
+
+    return step
+
+
+def tool_calls(calls):
+    def step(content_blocks):
+        content_blocks.append({"type": "tool_calls", "content": calls})
+
+    return step
+
+
+def tool_results(results):
+    def step(content_blocks):
+        content_blocks[-1]["results"] = results
+        content_blocks.append({"type": "text", "content": ""})
+
+    return step
+
+
+def code_output(output):
+    def step(content_blocks):
+        content_blocks[-1]["output"] = output
+        content_blocks.append({"type": "text", "content": ""})
+
+    return step
+
+
+def chunks(text, size):
+    return [text[idx : idx + size] for idx in range(0, len(text), size)]
+
+
+CALLS = [
+    {
+        "id": "call_1",
+        "function": {"name": "search", "arguments": '{"query": "a < b & c"}'},
+    },
+    {"id": "call_2", "function": {"name": "fetch", "arguments": "{}"}},
+]
+
+CORPUS = {
+    "plain": ["Hello", ", world", "!\n\n", "Second ", "paragraph."],
+    "reasoning": [
+        "<thi",
+        "nk>",
+        "First line\n",
+        "> quoted <b> & line\r",
+        "\nlast",
+        " line</th",
+        "ink>\n",
+        "The answer.",
+    ],
+    "reasoning in one chunk": ["Intro <think>all of it</think> outro"],
+    "all reasoning tags": chunks(
+        "".join(
+            f"{start}thought {idx}{end}\ntext {idx}\n"
+            for idx, (start, end) in enumerate(DEFAULT_REASONING_TAGS)
+        ),
+        7,
+    ),
+    "unclosed reasoning": ["<think>", "still ", "thinking\n", "> about it"],
+    "unclosed start tag": ["text <thi", 'nk attr="x', '" more'],
+    "empty reasoning": ["<think>", "  ", "</think>", "after"],
+    "solution": chunks(
+        "<|begin_of_thought|>plan<|end_of_thought|>"
+        "<|begin_of_solution|>x = 1<|end_of_solution|>done",
+        3,
+    ),
+    "reasoning_content": [
+        reasoning_content("Step one\n"),
+        reasoning_content("step <two>"),
+        "Answer",
+        " text",
+    ],
+    "code_interpreter": [
+        "Let me run it.\n```py",
+        "thon\n",
+        '<code_interpreter type="code" lang="py',
+        'thon">\nprint(1 < 2)\n',
+        "</code_inter",
+        "preter>",
+        code_output({"stdout": "True\n"}),
+        "It printed ",
+        "True.",
+    ],
+    "unclosed code_interpreter": [
+        '<code_interpreter type="code" lang="python">',
+        "x = 1\n",
+    ],
+    "tool_calls": [
+        "Looking it up.",
+        tool_calls(CALLS),
+        tool_results(
+            [
+                {"tool_call_id": "call_1", "content": "found ünïcode", "files": ["f"]},
+                {"tool_call_id": "call_2", "content": None},
+            ]
+        ),
+        "Based on ",
+        "<think>the results</think>",
+        "the answer is 42.",
+    ],
+    "tool_calls without text": [
+        tool_calls(CALLS[:1]),
+        tool_results([{"tool_call_id": "call_1", "content": "ok", "embeds": ["e"]}]),
+    ],
+}
+
+
+class FullPath:
+    def __init__(self):
+        self.handle = tag_content_handler
+        self.serialize = serialize_content_blocks
+
+
+class IncrementalPath:
+    def __init__(self):
+        handler, serializer = ContentTagHandler(), ContentBlockSerializer()
+        self.handle = handler.handle
+        self.serialize = serializer.serialize
+
+
+def replay(path, steps):
+    """Apply every step like process_chat_response, collect each serialization."""
+    content = ""
+    content_blocks = [{"type": "text", "content": ""}]
+    outputs = []
+    for step in steps:
+        if callable(step):
+            step(content_blocks)
+        else:
+            if (
+                content_blocks[-1]["type"] == "reasoning"
+                and content_blocks[-1].get("attributes", {}).get("type")
+                == "reasoning_content"
+            ):
+                content_blocks[-1]["ended_at"] = time.time()
+                content_blocks[-1]["duration"] = 0
+                content_blocks.append({"type": "text", "content": ""})
+
+            content = f"{content}{step}"
+            content_blocks[-1]["content"] = content_blocks[-1]["content"] + step
+            for content_type, tags in TAGS:
+                content, content_blocks, _ = path.handle(
+                    content_type, tags, content, content_blocks
+                )
+
+        outputs.append(
+            (
+                content,
+                path.serialize(content_blocks),
+                path.serialize(content_blocks, raw=True),
+            )
+        )
+    return outputs
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    # Reasoning durations would otherwise depend on how fast each path ran
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_incremental_matches_full_serialization(name):
+    steps = CORPUS[name]
+    full, incremental = replay(FullPath(), steps), replay(IncrementalPath(), steps)
+    for idx, (expected, actual) in enumerate(zip(full, incremental)):
+        assert actual == expected, f"step {idx}: {steps[idx]!r}"
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_every_chunking_matches(name):
+    # Re-split the streamed text at every size, tags end up split everywhere
+    text = "".join(step for step in CORPUS[name] if isinstance(step, str))
+    for size in range(1, 12):
+        steps = chunks(text, size)
+        assert replay(IncrementalPath(), steps) == replay(FullPath(), steps)
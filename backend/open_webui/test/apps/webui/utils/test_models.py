@@ -0,0 +1,697 @@
+import asyncio
+import copy
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import open_webui.config  # noqa: F401 runs the migrations
+from open_webui.internal.db import get_db
+from open_webui.models import models as models_table
+from open_webui.models.functions import FunctionForm, Functions
+from open_webui.models.groups import GroupForm, Groups
+from open_webui.models.models import Model, ModelForm, Models
+from open_webui.utils import models as models_utils
+from open_webui.utils.access_control import has_access
+from open_webui.utils.models import (
+    DEFAULT_ARENA_MODEL,
+    build_models,
+    check_model_access,
+    get_all_models,
+    get_filtered_models,
+)
+from open_webui.utils.plugin import get_function_module_from_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_access_index():
+    Models._access_index = None
+    yield
+    Models._access_index = None
+
+
+def insert_model(user_id, access_control=None, base_model_id="base"):
+    return Models.insert_new_model(
+        ModelForm(
+            id=f"model-{uuid.uuid4()}",
+            base_model_id=base_model_id,
+            name="Model",
+            meta={},
+            params={},
+            access_control=access_control,
+        ),
+        user_id,
+    )
+
+
+def set_owner_directly(id, user_id):
+    """A write that doesn't go through Models, so doesn't bump its version."""
+    with get_db() as db:
+        db.query(Model).filter_by(id=id).update({"user_id": user_id})
+        db.commit()
+
+
+def test_access_index_reloads_after_writes():
+    version = Models.version
+    model = insert_model("owner")
+    assert Models.version > version
+
+    index = Models.get_model_access_index()
+    assert index[model.id].user_id == "owner"
+    assert index[model.id].is_active
+    assert Models.get_model_access_index() is index
+
+    # Cached until the next write made through Models
+    set_owner_directly(model.id, "other")
+    assert Models.get_model_access_index()[model.id].user_id == "owner"
+
+    version = Models.version
+    Models.toggle_model_by_id(model.id)
+    assert Models.version > version
+    index = Models.get_model_access_index()
+    assert index[model.id].user_id == "other"
+    assert not index[model.id].is_active
+
+    Models.delete_model_by_id(model.id)
+    assert model.id not in Models.get_model_access_index()
+
+
+def test_access_index_is_not_cached_without_ttl(monkeypatch):
+    monkeypatch.setattr(models_table, "AUTHORIZATION_CACHE_TTL", 0)
+    model = insert_model("owner")
+
+    index = Models.get_model_access_index()
+    assert Models.get_model_access_index() is not index
+    assert Models._access_index is None
+
+    set_owner_directly(model.id, "other")
+    assert Models.get_model_access_index()[model.id].user_id == "other"
+    Models.delete_model_by_id(model.id)
+
+
+# The per-model lookups the access index replaced
+
+
+def check_model_access_by_id(user, model):
+    if model.get("arena"):
+        if not has_access(
+            user.id,
+            type="read",
+            access_control=model.get("info", {})
+            .get("meta", {})
+            .get("access_control", {}),
+        ):
+            raise Exception("Model not found")
+    else:
+        model_info = Models.get_model_by_id(model.get("id"))
+        if not model_info:
+            raise Exception("Model not found")
+        elif not (
+            user.id == model_info.user_id
+            or has_access(
+                user.id, type="read", access_control=model_info.access_control
+            )
+        ):
+            raise Exception("Model not found")
+
+
+def get_filtered_models_by_id(models, user):
+    filtered_models = []
+    for model in models:
+        if model.get("arena"):
+            if has_access(
+                user.id,
+                type="read",
+                access_control=model.get("info", {})
+                .get("meta", {})
+                .get("access_control", {}),
+            ):
+                filtered_models.append(model)
+            continue
+
+        model_info = Models.get_model_by_id(model["id"])
+        if model_info:
+            if user.id == model_info.user_id or has_access(
+                user.id,
+                type="read",
+                access_control=model_info.access_control,
+            ):
+                filtered_models.append(model)
+
+    return filtered_models
+
+
+def has_model_access(check, user, model):
+    try:
+        check(user, model)
+        return True
+    except Exception:
+        return False
+
+
+def test_access_checks_match_per_model_lookups():
+    owner, member, outsider = (str(uuid.uuid4()) for _ in range(3))
+    group = Groups.insert_new_group("admin", GroupForm(name="g", description=""))
+    Groups.add_users_to_group(group.id, [member])
+
+    shared = {"read": {"group_ids": [group.id], "user_ids": []}}
+    private = {"read": {"group_ids": [], "user_ids": []}}
+    db_models = [
+        insert_model(owner, access_control=None),
+        insert_model(owner, access_control=shared),
+        insert_model(owner, access_control=private),
+        insert_model(owner, access_control={"read": {"user_ids": [outsider]}}),
+    ]
+    models = [{"id": model.id} for model in db_models] + [
+        {"id": "not-in-db"},
+        {
+            "id": "arena-shared",
+            "arena": True,
+            "info": {"meta": {"access_control": shared}},
+        },
+        {
+            "id": "arena-public",
+            "arena": True,
+            "info": {"meta": {"access_control": None}},
+        },
+    ]
+
+    for user_id in [owner, member, outsider]:
+        user = SimpleNamespace(id=user_id, role="user")
+        assert get_filtered_models(models, user) == get_filtered_models_by_id(
+            models, user
+        )
+        for model in models:
+            assert has_model_access(check_model_access, user, model) == (
+                has_model_access(check_model_access_by_id, user, model)
+            ), (user_id, model)
+
+    # Spot-check the expectations themselves
+    user = SimpleNamespace(id=member, role="user")
+    assert [model["id"] for model in get_filtered_models(models, user)] == [
+        db_models[0].id,
+        db_models[1].id,
+        "arena-shared",
+        "arena-public",
+    ]
+
+    for model in db_models:
+        Models.delete_model_by_id(model.id)
+    Groups.delete_group_by_id(group.id)
+
+
+# build_models as get_all_models did it before the model list snapshot,
+# scanning every model for each custom model and loading functions per model
+
+
+def build_models_by_scanning(request, base_models):
+    # deep copy the base models to avoid modifying the original list
+    models = [model.copy() for model in base_models]
+
+    # Add arena models
+    if request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS:
+        arena_models = []
+        if len(request.app.state.config.EVALUATION_ARENA_MODELS) > 0:
+            arena_models = [
+                {
+                    "id": model["id"],
+                    "name": model["name"],
+                    "info": {
+                        "meta": model["meta"],
+                    },
+                    "object": "model",
+                    "created": int(time.time()),
+                    "owned_by": "arena",
+                    "arena": True,
+                }
+                for model in request.app.state.config.EVALUATION_ARENA_MODELS
+            ]
+        else:
+            # Add default arena model
+            arena_models = [
+                {
+                    "id": DEFAULT_ARENA_MODEL["id"],
+                    "name": DEFAULT_ARENA_MODEL["name"],
+                    "info": {
+                        "meta": DEFAULT_ARENA_MODEL["meta"],
+                    },
+                    "object": "model",
+                    "created": int(time.time()),
+                    "owned_by": "arena",
+                    "arena": True,
+                }
+            ]
+        models = models + arena_models
+
+    global_action_ids = [
+        function.id for function in Functions.get_global_action_functions()
+    ]
+    enabled_action_ids = [
+        function.id
+        for function in Functions.get_functions_by_type("action", active_only=True)
+    ]
+
+    global_filter_ids = [
+        function.id for function in Functions.get_global_filter_functions()
+    ]
+    enabled_filter_ids = [
+        function.id
+        for function in Functions.get_functions_by_type("filter", active_only=True)
+    ]
+
+    custom_models = Models.get_all_models()
+    for custom_model in custom_models:
+        if custom_model.base_model_id is None:
+            # Applied directly to a base model
+            for model in models:
+                if custom_model.id == model["id"] or (
+                    model.get("owned_by") == "ollama"
+                    and custom_model.id
+                    == model["id"].split(":")[
+                        0
+                    ]  # Ollama may return model ids in different formats (e.g., 'llama3' vs. 'llama3:7b')
+                ):
+                    if custom_model.is_active:
+                        model["name"] = custom_model.name
+                        model["info"] = custom_model.model_dump()
+
+                        # Set action_ids and filter_ids
+                        action_ids = []
+                        filter_ids = []
+
+                        if "info" in model:
+                            if "meta" in model["info"]:
+                                action_ids.extend(
+                                    model["info"]["meta"].get("actionIds", [])
+                                )
+                                filter_ids.extend(
+                                    model["info"]["meta"].get("filterIds", [])
+                                )
+
+                            if "params" in model["info"]:
+                                # Remove params to avoid exposing sensitive info
+                                del model["info"]["params"]
+
+                        model["action_ids"] = action_ids
+                        model["filter_ids"] = filter_ids
+                    else:
+                        models.remove(model)
+
+        elif custom_model.is_active and (
+            custom_model.id not in [model["id"] for model in models]
+        ):
+            # Custom model based on a base model
+            owned_by = "openai"
+            pipe = None
+
+            for m in models:
+                if (
+                    custom_model.base_model_id == m["id"]
+                    or custom_model.base_model_id == m["id"].split(":")[0]
+                ):
+                    owned_by = m.get("owned_by", "unknown")
+                    if "pipe" in m:
+                        pipe = m["pipe"]
+                    break
+
+            model = {
+                "id": f"{custom_model.id}",
+                "name": custom_model.name,
+                "object": "model",
+                "created": custom_model.created_at,
+                "owned_by": owned_by,
+                "preset": True,
+                **({"pipe": pipe} if pipe is not None else {}),
+            }
+
+            info = custom_model.model_dump()
+            if "params" in info:
+                # Remove params to avoid exposing sensitive info
+                del info["params"]
+
+            model["info"] = info
+
+            action_ids = []
+            filter_ids = []
+
+            if custom_model.meta:
+                meta = custom_model.meta.model_dump()
+
+                if "actionIds" in meta:
+                    action_ids.extend(meta["actionIds"])
+
+                if "filterIds" in meta:
+                    filter_ids.extend(meta["filterIds"])
+
+            model["action_ids"] = action_ids
+            model["filter_ids"] = filter_ids
+
+            models.append(model)
+
+    # Process action_ids to get the actions
+    def get_action_items_from_module(function, module):
+        actions = []
+        if hasattr(module, "actions"):
+            actions = module.actions
+            return [
+                {
+                    "id": f"{function.id}.{action['id']}",
+                    "name": action.get("name", f"{function.name} ({action['id']})"),
+                    "description": function.meta.description,
+                    "icon": action.get(
+                        "icon_url",
+                        function.meta.manifest.get("icon_url", None)
+                        or getattr(module, "icon_url", None)
+                        or getattr(module, "icon", None),
+                    ),
+                }
+                for action in actions
+            ]
+        else:
+            return [
+                {
+                    "id": function.id,
+                    "name": function.name,
+                    "description": function.meta.description,
+                    "icon": function.meta.manifest.get("icon_url", None)
+                    or getattr(module, "icon_url", None)
+                    or getattr(module, "icon", None),
+                }
+            ]
+
+    # Process filter_ids to get the filters
+    def get_filter_items_from_module(function, module):
+        return [
+            {
+                "id": function.id,
+                "name": function.name,
+                "description": function.meta.description,
+                "icon": function.meta.manifest.get("icon_url", None)
+                or getattr(module, "icon_url", None)
+                or getattr(module, "icon", None),
+                "has_user_valves": hasattr(module, "UserValves"),
+            }
+        ]
+
+    def get_function_module_by_id(function_id):
+        function_module, _, _ = get_function_module_from_cache(request, function_id)
+        return function_module
+
+    for model in models:
+        action_ids = [
+            action_id
+            for action_id in list(set(model.pop("action_ids", []) + global_action_ids))
+            if action_id in enabled_action_ids
+        ]
+        filter_ids = [
+            filter_id
+            for filter_id in list(set(model.pop("filter_ids", []) + global_filter_ids))
+            if filter_id in enabled_filter_ids
+        ]
+
+        model["actions"] = []
+        for action_id in action_ids:
+            action_function = Functions.get_function_by_id(action_id)
+            if action_function is None:
+                raise Exception(f"Action not found: {action_id}")
+
+            function_module = get_function_module_by_id(action_id)
+            model["actions"].extend(
+                get_action_items_from_module(action_function, function_module)
+            )
+
+        model["filters"] = []
+        for filter_id in filter_ids:
+            filter_function = Functions.get_function_by_id(filter_id)
+            if filter_function is None:
+                raise Exception(f"Filter not found: {filter_id}")
+
+            function_module = get_function_module_by_id(filter_id)
+
+            if getattr(function_module, "toggle", None):
+                model["filters"].extend(
+                    get_filter_items_from_module(filter_function, function_module)
+                )
+
+    return models
+
+
+ACTION = """
+class Action:
+    def __init__(self):
+        self.actions = [{"id": "one", "name": "One"}, {"id": "two"}]
+
+    async def action(self, body):
+        pass
+"""
+
+FILTER = """
+class Filter:
+    def __init__(self, toggle):
+        self.toggle = toggle
+"""
+
+
+def make_request(arena=False, arena_models=None):
+    config = SimpleNamespace(
+        ENABLE_EVALUATION_ARENA_MODELS=arena,
+        EVALUATION_ARENA_MODELS=arena_models or [],
+        ENABLE_BASE_MODELS_CACHE=False,
+    )
+    state = SimpleNamespace(
+        config=config, MODELS={}, BASE_MODELS=[], MODELS_SNAPSHOT=None
+    )
+    return SimpleNamespace(app=SimpleNamespace(state=state))
+
+
+def insert_function(type, content, is_active=True, is_global=False):
+    function = Functions.insert_new_function(
+        "admin",
+        type,
+        FunctionForm(
+            id=f"{type}_{uuid.uuid4().hex}",
+            name=type.title(),
+            content=content,
+            meta={"description": f"A {type}", "manifest": {}},
+        ),
+    )
+    Functions.update_function_by_id(
+        function.id, {"is_active": is_active, "is_global": is_global}
+    )
+    return function.id
+
+
+def insert_custom_model(id, base_model_id=None, is_active=True, meta=None):
+    return Models.insert_new_model(
+        ModelForm(
+            id=id,
+            base_model_id=base_model_id,
+            name=f"Custom {id}",
+            meta=meta or {},
+            params={"system": "secret"},
+            is_active=is_active,
+        ),
+        "owner",
+    )
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    # Arena models are stamped with the time they are built at
+    monkeypatch.setattr(time, "time", lambda: 1000)
+
+    Models.delete_all_models()
+    ids = SimpleNamespace(
+        global_action=insert_function("action", ACTION, is_global=True),
+        action=insert_function("action", ACTION.replace("One", "Uno")),
+        inactive_action=insert_function("action", ACTION, is_active=False),
+        global_filter=insert_function(
+            "filter", FILTER.replace("toggle):", "toggle=True):"), is_global=True
+        ),
+        filter=insert_function("filter", FILTER.replace("toggle):", "toggle=True):")),
+        hidden_filter=insert_function(
+            "filter", FILTER.replace("toggle):", "toggle=False):")
+        ),
+    )
+    yield ids
+
+    Models.delete_all_models()
+    for function_id in vars(ids).values():
+        Functions.delete_function_by_id(function_id)
+
+
+def ollama_model(id, **kwargs):
+    return {"id": id, "name": id, "object": "model", "owned_by": "ollama", **kwargs}
+
+
+def openai_model(id, **kwargs):
+    return {"id": id, "name": id, "object": "model", "owned_by": "openai", **kwargs}
+
+
+def assert_same_models(request, base_models):
+    base_models_copy = copy.deepcopy(base_models)
+    expected = build_models_by_scanning(request, copy.deepcopy(base_models))
+    assert build_models(request, base_models) == expected
+    # The base models are not modified
+    assert base_models == base_models_copy
+    return expected
+
+
+def test_build_models_applies_custom_models_like_scanning(functions):
+    meta = {
+        "actionIds": [functions.action, functions.inactive_action],
+        "filterIds": [functions.filter, functions.hidden_filter],
+    }
+    # Applied to both tags of the Ollama model, but not by tag to OpenAI models
+    insert_custom_model("llama3", meta=meta)
+    insert_custom_model("gpt", meta=meta)
+    # Dropped, it is inactive
+    insert_custom_model("mistral:7b", is_active=False)
+    # Based on a model that only matches without the tag
+    insert_custom_model("coder", base_model_id="qwen", meta=meta)
+    insert_custom_model("piped", base_model_id="pipe:v1")
+    insert_custom_model("orphan", base_model_id="missing")
+    insert_custom_model("inactive", base_model_id="qwen", is_active=False)
+    # Already a base model id
+    insert_custom_model("gpt:4", base_model_id="qwen")
+
+    models = assert_same_models(
+        make_request(arena=True),
+        [
+            ollama_model("llama3:8b"),
+            ollama_model("llama3:70b"),
+            ollama_model("mistral:7b"),
+            ollama_model("qwen:14b"),
+            openai_model("gpt:4"),
+            openai_model("pipe", pipe={"type": "pipe"}),
+            openai_model("pipe:v1", pipe={"type": "pipe"}),
+        ],
+    )
+
+    by_id = {model["id"]: model for model in models}
+    assert "mistral:7b" not in by_id
+    assert "inactive" not in by_id
+    assert by_id["llama3:70b"]["name"] == "Custom llama3"
+    assert "params" not in by_id["llama3:70b"]["info"]
+    assert by_id["gpt:4"]["name"] == "gpt:4"
+    assert by_id["coder"]["owned_by"] == "ollama"
+    assert by_id["piped"]["pipe"] == {"type": "pipe"}
+    assert by_id["orphan"]["owned_by"] == "openai"
+    assert DEFAULT_ARENA_MODEL["id"] in by_id
+
+    # Global functions apply to every model, the others where they are listed
+    assert {action["id"] for action in by_id["coder"]["actions"]} == {
+        f"{functions.global_action}.one",
+        f"{functions.global_action}.two",
+        f"{functions.action}.one",
+        f"{functions.action}.two",
+    }
+    assert [item["id"] for item in by_id["coder"]["filters"]] in (
+        [functions.global_filter, functions.filter],
+        [functions.filter, functions.global_filter],
+    )
+    assert [item["id"] for item in by_id["piped"]["filters"]] == [
+        functions.global_filter
+    ]
+
+
+def test_build_models_with_duplicate_base_ids_like_scanning(functions):
+    insert_custom_model("dup")
+    insert_custom_model("preset", base_model_id="dup")
+    insert_custom_model("dup:tag", is_active=False)
+
+    models = assert_same_models(
+        make_request(),
+        [
+            openai_model("dup", name="first"),
+            ollama_model("dup", name="second", pipe={"type": "pipe"}),
+            ollama_model("dup:tag"),
+            openai_model("other"),
+        ],
+    )
+
+    assert [model["id"] for model in models] == ["dup", "dup", "other", "preset"]
+    assert [model["name"] for model in models[:2]] == ["Custom dup", "Custom dup"]
+    assert models[3]["owned_by"] == "openai"
+    assert "pipe" not in models[3]
+
+
+def test_build_models_drops_every_tag_of_an_inactive_model(functions):
+    # Scanning removed from the list it iterated, which skipped the model
+    # right after a removed one; every matching tag is dropped now
+    insert_custom_model("llama3", is_active=False)
+    base_models = [ollama_model("llama3:8b"), ollama_model("llama3:70b")]
+
+    assert [
+        model["id"] for model in build_models_by_scanning(make_request(), base_models)
+    ] == ["llama3:70b"]
+    assert build_models(make_request(), base_models) == []
+
+
+def test_model_list_snapshot(functions, monkeypatch):
+    fetches = []
+
+    async def get_all_base_models(request, user=None):
+        # A new, equal list on every call, as without the base models cache
+        fetches.append(1)
+        return [
+            ollama_model("llama3:8b", created=len(fetches)),
+            openai_model("gpt", created=len(fetches)),
+        ]
+
+    builds = []
+
+    def counting_build_models(request, base_models):
+        builds.append(1)
+        return build_models(request, base_models)
+
+    monkeypatch.setattr(models_utils, "get_all_base_models", get_all_base_models)
+    monkeypatch.setattr(models_utils, "build_models", counting_build_models)
+    monkeypatch.setattr(models_utils, "MODELS_CACHE_TTL", None)
+
+    request = make_request()
+
+    def get_model_ids():
+        models = asyncio.run(get_all_models(request))
+        assert request.app.state.MODELS == {model["id"]: model for model in models}
+        return [model["id"] for model in models]
+
+    assert get_model_ids() == ["llama3:8b", "gpt"]
+    assert get_model_ids() == ["llama3:8b", "gpt"]
+    assert len(fetches) == 2
+    assert len(builds) == 1
+
+    insert_custom_model("preset", base_model_id="gpt")
+    assert get_model_ids() == ["llama3:8b", "gpt", "preset"]
+    assert len(builds) == 2
+
+    Functions.update_function_by_id(functions.action, {"is_global": True})
+    assert get_model_ids() == ["llama3:8b", "gpt", "preset"]
+    assert len(builds) == 3
+    assert get_model_ids() == ["llama3:8b", "gpt", "preset"]
+    assert len(builds) == 3
+
+    request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS = True
+    assert get_model_ids() == [
+        "llama3:8b",
+        "gpt",
+        DEFAULT_ARENA_MODEL["id"],
+        "preset",
+    ]
+    assert len(builds) == 4
+
+    request.app.state.config.EVALUATION_ARENA_MODELS = [
+        {"id": "arena", "name": "Arena", "meta": {}}
+    ]
+    assert get_model_ids() == ["llama3:8b", "gpt", "arena", "preset"]
+    assert len(builds) == 5
+
+    # A changed base model is rebuilt even though no version moved
+    monkeypatch.setattr(
+        models_utils,
+        "get_all_base_models",
+        lambda request, user=None: asyncio.sleep(0, result=[openai_model("gpt")]),
+    )
+    assert get_model_ids() == ["gpt", "arena", "preset"]
+    assert len(builds) == 6
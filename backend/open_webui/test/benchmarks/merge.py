@@ -0,0 +1,102 @@
+"""
+Microbenchmark for merge_and_sort_query_results.
+
+Simulates a 10 query x 50 collection hybrid search fan-out, where every
+(query, collection) pair returns k results and collections overlap, and
+compares the current merge with the previous sha256 + full sort version.
+Importing open_webui.retrieval opens the database, so DATA_DIR is pointed
+at a new temporary directory unless it is already set.
+
+    cd backend && python -m open_webui.test.benchmarks.merge
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import timeit
+
+
+def legacy_merge_and_sort_query_results(query_results: list[dict], k: int) -> dict:
+    combined = dict()
+    for data in query_results:
+        for distance, document, metadata in zip(
+            data["distances"][0], data["documents"][0], data["metadatas"][0]
+        ):
+            doc_hash = hashlib.sha256(document.encode()).hexdigest()
+            if doc_hash not in combined or distance > combined[doc_hash][0]:
+                combined[doc_hash] = (distance, document, metadata)
+
+    combined = sorted(combined.values(), key=lambda x: x[0], reverse=True)[:k]
+    distances, documents, metadatas = zip(*combined) if combined else ([], [], [])
+    return {
+        "distances": [list(distances)],
+        "documents": [list(documents)],
+        "metadatas": [list(metadatas)],
+    }
+
+
+def generate_query_results(
+    queries: int, collections: int, k: int, chunk_size: int, seed: int = 0
+) -> list[dict]:
+    rng = random.Random(seed)
+    # Collections share half of their chunks with a neighbour
+    corpus = [
+        f"chunk {idx} " + "lorem ipsum " * (chunk_size // 12)
+        for idx in range(collections * k)
+    ]
+
+    results = []
+    for _ in range(queries):
+        for collection in range(collections):
+            start = collection * k // 2
+            documents = rng.sample(corpus[start : start + k * 2], k)
+            results.append(
+                {
+                    "distances": [[rng.random() for _ in documents]],
+                    "documents": [documents],
+                    "metadatas": [[{"collection": collection} for _ in documents]],
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--collections", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="owui-bench-"))
+
+    from open_webui.retrieval.utils import merge_and_sort_query_results
+
+    query_results = generate_query_results(
+        args.queries, args.collections, args.k, args.chunk_size
+    )
+    assert merge_and_sort_query_results(
+        query_results, args.k
+    ) == legacy_merge_and_sort_query_results(query_results, args.k)
+
+    print(
+        f"{args.queries} queries x {args.collections} collections, "
+        f"k={args.k}, {len(query_results) * args.k} results"
+    )
+    for name, func in [
+        ("legacy", legacy_merge_and_sort_query_results),
+        ("current", merge_and_sort_query_results),
+    ]:
+        best = min(
+            timeit.repeat(
+                lambda: func(query_results, args.k), number=1, repeat=args.repeat
+            )
+        )
+        print(f"{name:>8}: {best * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
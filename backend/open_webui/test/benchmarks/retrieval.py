@@ -0,0 +1,282 @@
+"""
+Benchmark suite for the retrieval hot paths on synthetic corpora.
+
+Generates a reproducible corpus, ingests it into the bundled Chroma backend
+in a temporary DATA_DIR using a deterministic local embedding stub, and
+reports latency percentiles, throughput and peak Python memory for:
+
+    save_docs_to_vector_db, query_collection,
+    query_collection_with_hybrid_search (with and without a reranker),
+    merge_and_sort_query_results
+
+    cd backend && python -m open_webui.test.benchmarks.retrieval
+    cd backend && python -m open_webui.test.benchmarks.retrieval --documents 500 --json out.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class HashingEmbeddingModel:
+    """
+    Deterministic stand-in for a SentenceTransformer: hashed bag of words,
+    so that texts sharing words are similar without downloading a model.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in text.lower().split():
+            h = zlib.crc32(token.encode())
+            vector[h % self.dimensions] += 1.0 if h & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        return np.stack([self._embed(text) for text in texts])
+
+
+def overlap_reranker(pairs, user=None):
+    """
+    Deterministic stand-in for a reranker: query term overlap. Like ColBERT and
+    the external reranker, it scores the whole batch against the first query.
+    """
+    terms = set(pairs[0][0].lower().split()) if pairs else set()
+    scores = []
+    for _, document in pairs:
+        words = document.lower().split()
+        scores.append(sum(word in terms for word in words) / (len(words) or 1))
+    return np.array(scores)
+
+
+def generate_corpus(
+    documents: int, words_per_document: int, vocabulary: int, seed: int
+) -> tuple[list[str], list[str]]:
+    rng = random.Random(seed)
+    words = [f"w{idx}" for idx in range(vocabulary)]
+    # Zipf-like term distribution, as in natural text
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+
+    corpus = [
+        " ".join(rng.choices(words, weights, k=words_per_document))
+        for _ in range(documents)
+    ]
+    queries = [" ".join(rng.choices(words, weights, k=6)) for _ in range(64)]
+    return corpus, queries
+
+
+def summarize(name: str, latencies: list[float], items: int, peak: int) -> dict:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))]
+
+    total = sum(latencies)
+    return {
+        "stage": name,
+        "runs": len(latencies),
+        "p50_ms": percentile(0.50) * 1000,
+        "p95_ms": percentile(0.95) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "throughput": items / total if total else 0.0,
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+
+def run_stage(
+    name: str, calls: list, items_per_call: int = 1, traced_call=None
+) -> dict:
+    """
+    Time every call, then repeat one (traced_call, by default the first) under
+    tracemalloc for the peak memory, so tracing does not skew the latencies.
+    """
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    (traced_call or calls[0])()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return summarize(name, latencies, items_per_call * len(calls), peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--words-per-document", type=int, default=400)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--collections", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--k-reranker", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--embedding-cache",
+        action="store_true",
+        help="Keep the embedding cache enabled (measures cached query embeddings)",
+    )
+    parser.add_argument("--data-dir", help="Defaults to a new temporary directory")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    # Configure an isolated instance before anything reads the environment
+    os.environ["DATA_DIR"] = args.data_dir or tempfile.mkdtemp(prefix="owui-bench-")
+    os.environ["VECTOR_DB"] = "chroma"
+    os.environ["ENABLE_RAG_EMBEDDING_CACHE"] = str(args.embedding_cache)
+
+    from langchain_core.documents import Document
+
+    from open_webui.retrieval.utils import (
+        get_embedding_function,
+        merge_and_sort_query_results,
+        query_collection,
+        query_collection_with_hybrid_search,
+    )
+    from open_webui.routers.retrieval import save_docs_to_vector_db
+    from open_webui.test.benchmarks.merge import generate_query_results
+
+    model = HashingEmbeddingModel()
+    config = SimpleNamespace(
+        TEXT_SPLITTER="character",
+        CHUNK_SIZE=args.chunk_size,
+        CHUNK_OVERLAP=100,
+        TIKTOKEN_ENCODING_NAME="cl100k_base",
+        RAG_EMBEDDING_ENGINE="",
+        RAG_EMBEDDING_MODEL="benchmark",
+        RAG_EMBEDDING_BATCH_SIZE=32,
+        RAG_OPENAI_API_BASE_URL="",
+        RAG_OPENAI_API_KEY="",
+        RAG_OLLAMA_BASE_URL="",
+        RAG_OLLAMA_API_KEY="",
+        RAG_AZURE_OPENAI_BASE_URL="",
+        RAG_AZURE_OPENAI_API_KEY="",
+        RAG_AZURE_OPENAI_API_VERSION="",
+    )
+    request = SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(config=config, ef=model))
+    )
+    ef = get_embedding_function("", config.RAG_EMBEDDING_MODEL, model, None, None, 32)
+    embedding_function = lambda query, prefix: ef(query, prefix=prefix)
+
+    corpus, queries = generate_corpus(
+        args.documents, args.words_per_document, args.vocabulary, args.seed
+    )
+    collection_names = [
+        f"benchmark-{args.seed}-{idx}" for idx in range(args.collections)
+    ]
+    rng = random.Random(args.seed)
+    query_sets = [rng.sample(queries, args.queries) for _ in range(max(args.runs, 1))]
+
+    results = []
+
+    def ingest(idx: int, collection_name: str):
+        return lambda: save_docs_to_vector_db(
+            request,
+            [Document(page_content=corpus[idx], metadata={"name": f"doc-{idx}"})],
+            collection_name,
+            add=True,
+        )
+
+    results.append(
+        run_stage(
+            "save_docs_to_vector_db",
+            [
+                ingest(idx, collection_names[idx % len(collection_names)])
+                for idx in range(len(corpus))
+            ],
+            # Traced into a separate collection to keep the searched corpus intact
+            traced_call=ingest(0, f"benchmark-{args.seed}-traced"),
+        )
+    )
+
+    results.append(
+        run_stage(
+            "query_collection",
+            [
+                lambda queries=queries: query_collection(
+                    collection_names, queries, embedding_function, args.k
+                )
+                for queries in query_sets
+            ],
+            args.queries * len(collection_names),
+        )
+    )
+
+    for name, reranking_function in [
+        ("query_collection_with_hybrid_search", None),
+        ("query_collection_with_hybrid_search+rerank", overlap_reranker),
+    ]:
+        results.append(
+            run_stage(
+                name,
+                [
+                    lambda queries=queries: query_collection_with_hybrid_search(
+                        collection_names,
+                        queries,
+                        embedding_function,
+                        args.k,
+                        reranking_function,
+                        args.k_reranker,
+                        0.0,
+                        0.5,
+                    )
+                    for queries in query_sets
+                ],
+                args.queries * len(collection_names),
+            )
+        )
+
+    query_results = generate_query_results(10, 50, args.k, args.chunk_size, args.seed)
+    results.append(
+        run_stage(
+            "merge_and_sort_query_results (10x50)",
+            [
+                lambda: merge_and_sort_query_results(query_results, args.k)
+                for _ in range(max(args.runs, 1))
+            ],
+        )
+    )
+
+    print(
+        f"\n{args.documents} documents x {args.words_per_document} words, "
+        f"{len(collection_names)} collections, {args.queries} queries per search\n"
+    )
+    print(
+        f"{'stage':<45}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'items/s':>12}{'peak MB':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['stage']:<45}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['throughput']:>12.1f}"
+            f"{result['peak_memory_mb']:>10.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
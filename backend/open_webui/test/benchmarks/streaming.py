@@ -0,0 +1,100 @@
+"""
+Benchmark for parsing and serializing a streamed chat response.
+
+Replays a long reasoning response (20k reasoning tokens by default, wrapped
+in <think> tags, followed by an answer) through the same per-delta steps as
+process_chat_response: tag detection and content block serialization. The
+incremental handlers are compared with fresh handlers on every delta, which
+is equivalent to re-processing the whole message each time.
+
+    cd backend && python -m open_webui.test.benchmarks.streaming
+"""
+
+import argparse
+import random
+import re
+import time
+
+from open_webui.utils.content_blocks import (
+    DEFAULT_CODE_INTERPRETER_TAGS,
+    DEFAULT_REASONING_TAGS,
+    DEFAULT_SOLUTION_TAGS,
+    ContentBlockSerializer,
+    ContentTagHandler,
+)
+
+
+def generate_deltas(reasoning_tokens: int, answer_tokens: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["the", "model", "considers", "a", "step", "value", "x", "<b>", "&"]
+
+    def tokens(count):
+        for idx in range(count):
+            yield ("\n" if idx % 40 == 39 else " ") + rng.choice(words)
+
+    yield "<think>"
+    yield from tokens(reasoning_tokens)
+    yield "</think>\n"
+    yield from tokens(answer_tokens)
+
+
+def replay(deltas, incremental: bool = True) -> tuple[str, list[float]]:
+    """Apply every delta like stream_body_handler does, return the final content."""
+    handler, serializer = ContentTagHandler(), ContentBlockSerializer()
+
+    content = ""
+    content_blocks = [{"type": "text", "content": ""}]
+    serialized = ""
+    latencies = []
+    for value in deltas:
+        start = time.perf_counter()
+        if not incremental:
+            handler, serializer = ContentTagHandler(), ContentBlockSerializer()
+
+        content = f"{content}{value}"
+        content_blocks[-1]["content"] = content_blocks[-1]["content"] + value
+
+        for content_type, tags in [
+            ("reasoning", DEFAULT_REASONING_TAGS),
+            ("solution", DEFAULT_SOLUTION_TAGS),
+            ("code_interpreter", DEFAULT_CODE_INTERPRETER_TAGS),
+        ]:
+            content, content_blocks, _ = handler.handle(
+                content_type, tags, content, content_blocks
+            )
+
+        serialized = serializer.serialize(content_blocks)
+        latencies.append(time.perf_counter() - start)
+
+    return serialized, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reasoning-tokens", type=int, default=20000)
+    parser.add_argument("--answer-tokens", type=int, default=2000)
+    args = parser.parse_args()
+
+    deltas = list(generate_deltas(args.reasoning_tokens, args.answer_tokens))
+    print(f"{len(deltas)} deltas")
+
+    results = {}
+    for name, incremental in [("incremental", True), ("full", False)]:
+        serialized, latencies = replay(deltas, incremental)
+        results[name] = serialized
+
+        tail = sorted(latencies[-1000:])
+        print(
+            f"{name:>12}: total {sum(latencies):.2f} s, "
+            f"last 1000 deltas p50 {tail[len(tail) // 2] * 1e6:.0f} us, "
+            f"max {tail[-1] * 1e6:.0f} us"
+        )
+
+    # Reasoning durations depend on how long each replay took
+    assert re.sub(
+        r"\d+ seconds|duration=\"\d+\"", "", results["incremental"]
+    ) == re.sub(r"\d+ seconds|duration=\"\d+\"", "", results["full"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional, Set, Union, List, Dict, Any
 from open_webui.models.users import Users, UserModel
 from open_webui.models.groups import Groups
 
 
 from open_webui.config import DEFAULT_USER_PERMISSIONS
+from open_webui.env import AUTHORIZATION_CACHE_TTL
 import json
 
 
+class AuthorizationContext:
+    """
+    A user's group ids and group permissions, each loaded on first use.
+
+    Contexts are shared by every check within a request, and across requests
+    for AUTHORIZATION_CACHE_TTL seconds until the groups change.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.version = Groups.version
+        self.expires_at = time.monotonic() + AUTHORIZATION_CACHE_TTL
+        self._group_ids: Optional[Set[str]] = None
+        self._group_permissions: Optional[List[Dict[str, Any]]] = None
+
+    def is_valid(self) -> bool:
+        return self.version == Groups.version and time.monotonic() < self.expires_at
+
+    @property
+    def group_ids(self) -> Set[str]:
+        if self._group_ids is None:
+            self._group_ids = set(Groups.get_group_ids_by_member_id(self.user_id))
+        return self._group_ids
+
+    @property
+    def group_permissions(self) -> List[Dict[str, Any]]:
+        if self._group_permissions is None:
+            self._group_permissions = Groups.get_group_permissions_by_member_id(
+                self.user_id
+            )
+        return self._group_permissions
+
+
+# Contexts of the current request, set by authorization_scope()
+_request_contexts: ContextVar[Optional[Dict[str, AuthorizationContext]]] = ContextVar(
+    "authorization_contexts", default=None
+)
+# Least recently used last; shared by the request threads, so behind a lock
+AUTHORIZATION_CACHE_MAX_SIZE = 10_000
+_cached_contexts: "OrderedDict[str, AuthorizationContext]" = OrderedDict()
+_cached_contexts_lock = threading.Lock()
+
+
+@contextmanager
+def authorization_scope():
+    """Pins each user's AuthorizationContext for the duration of a request."""
+    token = _request_contexts.set({})
+    try:
+        yield
+    finally:
+        _request_contexts.reset(token)
+
+
+def get_authorization_context(user_id: str) -> AuthorizationContext:
+    contexts = _request_contexts.get()
+    if contexts is not None and user_id in contexts:
+        return contexts[user_id]
+
+    with _cached_contexts_lock:
+        context = _cached_contexts.get(user_id)
+        if context is None or not context.is_valid():
+            context = AuthorizationContext(user_id)
+            if AUTHORIZATION_CACHE_TTL:
+                _cached_contexts[user_id] = context
+        if user_id in _cached_contexts:
+            _cached_contexts.move_to_end(user_id)
+            while len(_cached_contexts) > AUTHORIZATION_CACHE_MAX_SIZE:
+                _cached_contexts.popitem(last=False)
+
+    if contexts is not None:
+        contexts[user_id] = context
+    return context
+
+
 def fill_missing_permissions(
     permissions: Dict[str, Any], default_permissions: Dict[str, Any]
 ) -> Dict[str, Any]:
@@ -53,14 +133,14 @@ def get_permissions(
                     )  # Use the most permissive value (True > False)
         return permissions
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_group_permissions = get_authorization_context(user_id).group_permissions
 
     # Deep copy default permissions to avoid modifying the original dict
     permissions = json.loads(json.dumps(default_permissions))
 
     # Combine permissions from all user groups
-    for group in user_groups:
-        permissions = combine_permissions(permissions, group.permissions or {})
+    for group_permissions in user_group_permissions:
+        permissions = combine_permissions(permissions, group_permissions)
 
     # Ensure all fields from default_permissions are present and filled in
     permissions = fill_missing_permissions(permissions, default_permissions)
@@ -92,10 +172,10 @@ def has_permission(
     permission_hierarchy = permission_key.split(".")
 
     # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_group_permissions = get_authorization_context(user_id).group_permissions
 
-    for group in user_groups:
-        if get_permission(group.permissions or {}, permission_hierarchy):
+    for group_permissions in user_group_permissions:
+        if get_permission(group_permissions, permission_hierarchy):
             return True
 
     # Check default permissions afterward if the group permissions don't allow it
@@ -119,8 +199,7 @@ def has_access(
             return True
 
     if user_group_ids is None:
-        user_groups = Groups.get_groups_by_member_id(user_id)
-        user_group_ids = {group.id for group in user_groups}
+        user_group_ids = get_authorization_context(user_id).group_ids
 
     permission_access = access_control.get(type, {})
     permitted_group_ids = permission_access.get("group_ids", [])
@@ -0,0 +1,473 @@
+"""
+Content blocks of a streamed chat response.
+
+A response is parsed into blocks (text, reasoning, solution, code_interpreter,
+tool_calls) as it streams in, and serialized back into the message content
+after every delta. Both steps keep state between deltas so that they only
+process the newly appended text instead of the whole message.
+"""
+
+import html
+import json
+import re
+import time
+from typing import Optional
+
+DEFAULT_REASONING_TAGS = [
+    ("<think>", "</think>"),
+    ("<thinking>", "</thinking>"),
+    ("<reason>", "</reason>"),
+    ("<reasoning>", "</reasoning>"),
+    ("<thought>", "</thought>"),
+    ("<Thought>", "</Thought>"),
+    ("<|begin_of_thought|>", "<|end_of_thought|>"),
+    ("◁think▷", "◁/think▷"),
+]
+DEFAULT_SOLUTION_TAGS = [("<|begin_of_solution|>", "<|end_of_solution|>")]
+DEFAULT_CODE_INTERPRETER_TAGS = [("<code_interpreter>", "</code_interpreter>")]
+
+
+def split_content_and_whitespace(content):
+    content_stripped = content.rstrip()
+    original_whitespace = (
+        content[len(content_stripped) :] if len(content) > len(content_stripped) else ""
+    )
+    return content_stripped, original_whitespace
+
+
+def is_opening_code_block(content):
+    # An odd number of backtick fences means the last ones open a new block
+    return content.count("```") % 2 == 1
+
+
+def quote_reasoning_line(line: str) -> str:
+    return f"> {line}" if not line.startswith(">") else line
+
+
+def get_reasoning_display_content(reasoning: str) -> str:
+    return html.escape(
+        "\n".join(quote_reasoning_line(line) for line in reasoning.splitlines())
+    )
+
+
+def serialize_content_block(
+    content: str,
+    block: dict,
+    raw: bool = False,
+    reasoning_display_content: Optional[str] = None,
+) -> str:
+    """Append the serialization of a single block to the content before it."""
+    if block["type"] == "text":
+        block_content = block["content"].strip()
+        if block_content:
+            content = f"{content}{block_content}\n"
+    elif block["type"] == "tool_calls":
+        attributes = block.get("attributes", {})
+
+        tool_calls = block.get("content", [])
+        results = block.get("results", [])
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if results:
+
+            tool_calls_display_content = ""
+            for tool_call in tool_calls:
+
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_result = None
+                tool_result_files = None
+                for result in results:
+                    if tool_call_id == result.get("tool_call_id", ""):
+                        tool_result = result.get("content", None)
+                        tool_result_files = result.get("files", None)
+                        break
+
+                if tool_result is not None:
+                    tool_result_embeds = result.get("embeds", "")
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}" embeds="{html.escape(json.dumps(tool_result_embeds))}">\n<summary>Tool Executed</summary>\n</details>\n'
+                else:
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+        else:
+            tool_calls_display_content = ""
+
+            for tool_call in tool_calls:
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+
+    elif block["type"] == "reasoning":
+        reasoning_display_content = (
+            get_reasoning_display_content(block["content"])
+            if reasoning_display_content is None
+            else reasoning_display_content
+        )
+
+        reasoning_duration = block.get("duration", None)
+
+        start_tag = block.get("start_tag", "")
+        end_tag = block.get("end_tag", "")
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if reasoning_duration is not None:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+    elif block["type"] == "code_interpreter":
+        attributes = block.get("attributes", {})
+        output = block.get("output", None)
+        lang = attributes.get("lang", "")
+
+        content_stripped, original_whitespace = split_content_and_whitespace(content)
+        if is_opening_code_block(content_stripped):
+            # Remove trailing backticks that would open a new block
+            content = content_stripped.rstrip("`").rstrip() + original_whitespace
+        else:
+            # Keep content as is - either closing backticks or no backticks
+            content = content_stripped + original_whitespace
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if output:
+            output = html.escape(json.dumps(output))
+
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+    else:
+        block_content = str(block["content"]).strip()
+        if block_content:
+            content = f"{content}{block['type']}: {block_content}\n"
+
+    return content
+
+
+class ContentBlockSerializer:
+    """
+    Serializes content blocks into message content.
+
+    While streaming only the last block changes, so the serialized content after
+    every unchanged leading block is cached and serialization resumes from the
+    first changed block. A block counts as changed when any of its fields has
+    been reassigned. Reasoning grows by appending, so its quoted and escaped
+    display is extended line by line instead of being rebuilt.
+    """
+
+    def __init__(self):
+        # raw -> [(block, snapshot of its fields, serialized content up to it)]
+        self.cache: dict[bool, list[tuple[dict, dict, str]]] = {False: [], True: []}
+        # id(block) -> (block, reasoning, processed length, display of processed lines)
+        self.reasoning_cache: dict[int, tuple[dict, str, int, str]] = {}
+
+    @staticmethod
+    def is_unchanged(block: dict, snapshot: dict) -> bool:
+        return len(block) == len(snapshot) and all(
+            block.get(key) is value for key, value in snapshot.items()
+        )
+
+    def get_reasoning_display_content(self, block: dict) -> str:
+        reasoning = block["content"]
+
+        cached = self.reasoning_cache.get(id(block))
+        if cached and cached[0] is block and reasoning.startswith(cached[1]):
+            _, _, processed, display = cached
+        else:
+            processed, display = 0, ""
+
+        # The last line may still grow (or be the \r of a \r\n), keep it open
+        lines = reasoning[processed:].splitlines(keepends=True)
+        for line in lines[:-1]:
+            display += html.escape(quote_reasoning_line(line.splitlines()[0])) + "\n"
+            processed += len(line)
+        self.reasoning_cache[id(block)] = (block, reasoning, processed, display)
+
+        last_line = lines[-1].splitlines() if lines else []
+        if last_line:
+            return display + html.escape(quote_reasoning_line(last_line[0]))
+        return display[:-1]
+
+    def serialize(self, content_blocks: list[dict], raw: bool = False) -> str:
+        cache = self.cache[raw]
+
+        content = ""
+        idx = 0
+        while idx < min(len(content_blocks), len(cache)):
+            block, snapshot, serialized = cache[idx]
+            if block is not content_blocks[idx] or not self.is_unchanged(
+                block, snapshot
+            ):
+                break
+            content = serialized
+            idx += 1
+        del cache[idx:]
+
+        for block in content_blocks[idx:]:
+            content = serialize_content_block(
+                content,
+                block,
+                raw,
+                reasoning_display_content=(
+                    self.get_reasoning_display_content(block)
+                    if block["type"] == "reasoning"
+                    else None
+                ),
+            )
+            cache.append((block, dict(block), content))
+
+        return content.strip()
+
+
+class ContentTagHandler:
+    """
+    Splits streamed content into blocks on reasoning, solution and
+    code_interpreter tags.
+
+    Between tag matches the content only grows by appending, so each tag
+    pattern is searched from the first position where a match could still
+    appear instead of from the start of the content.
+    """
+
+    def __init__(self):
+        # pattern -> offset from which the next search has to start
+        self.offsets: dict[str, int] = {}
+
+    def search(
+        self,
+        pattern: str,
+        literal: str,
+        content: str,
+        bounded: bool = True,
+        offsets: Optional[dict] = None,
+    ) -> Optional[re.Match]:
+        """
+        re.search(pattern, content), skipping text already searched without a
+        match. Every match starts with `literal`, and `bounded` patterns match
+        nothing but `literal` itself.
+        """
+        offsets = self.offsets if offsets is None else offsets
+
+        offset = offsets.get(pattern, 0)
+        match = re.compile(pattern).search(content, offset)
+        if match is None:
+            # A later match can only start at a partial or unfinished occurrence
+            restart = max(offset, len(content) - len(literal) + 1)
+            if not bounded:
+                position = content.find(literal, offset)
+                if position != -1:
+                    restart = position
+            offsets[pattern] = restart
+        return match
+
+    def handle(
+        self,
+        content_type,
+        tags,
+        content,
+        content_blocks,
+        offsets: Optional[dict] = None,
+    ):
+        if offsets is None:
+            offsets = self.offsets
+
+        end_flag = False
+
+        def extract_attributes(tag_content):
+            """Extract attributes from a tag if they exist."""
+            attributes = {}
+            if not tag_content:  # Ensure tag_content is not None
+                return attributes
+            # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+            matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
+            for key, value in matches:
+                attributes[key] = value
+            return attributes
+
+        if content_blocks[-1]["type"] == "text":
+            for start_tag, end_tag in tags:
+
+                start_tag_pattern = rf"{re.escape(start_tag)}"
+                if start_tag.startswith("<") and start_tag.endswith(">"):
+                    # Match start tag e.g., <tag> or <tag attr="value">
+                    # remove both '<' and '>' from start_tag
+                    # Match start tag with attributes
+                    start_tag_pattern = rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+
+                bounded = start_tag_pattern == re.escape(start_tag)
+                match = self.search(
+                    start_tag_pattern,
+                    start_tag if bounded else start_tag[:-1],
+                    content,
+                    bounded=bounded,
+                    offsets=offsets,
+                )
+                if match:
+                    try:
+                        attr_content = (
+                            match.group(1) if match.group(1) else ""
+                        )  # Ensure it's not None
+                    except:
+                        attr_content = ""
+
+                    attributes = extract_attributes(
+                        attr_content
+                    )  # Extract attributes safely
+
+                    # Capture everything before and after the matched tag
+                    before_tag = content[: match.start()]  # Content before opening tag
+                    after_tag = content[match.end() :]  # Content after opening tag
+
+                    # Remove the start tag and after from the currently handling text block
+                    content_blocks[-1]["content"] = content_blocks[-1][
+                        "content"
+                    ].replace(match.group(0) + after_tag, "")
+
+                    if before_tag:
+                        content_blocks[-1]["content"] = before_tag
+
+                    if not content_blocks[-1]["content"]:
+                        content_blocks.pop()
+
+                    # Append the new block
+                    content_blocks.append(
+                        {
+                            "type": content_type,
+                            "start_tag": start_tag,
+                            "end_tag": end_tag,
+                            "attributes": attributes,
+                            "content": "",
+                            "started_at": time.time(),
+                        }
+                    )
+
+                    if after_tag:
+                        content_blocks[-1]["content"] = after_tag
+                        # A different string than the streamed content, search all of it
+                        self.handle(
+                            content_type, tags, after_tag, content_blocks, offsets={}
+                        )
+
+                    break
+        elif content_blocks[-1]["type"] == content_type:
+            start_tag = content_blocks[-1]["start_tag"]
+            end_tag = content_blocks[-1]["end_tag"]
+
+            if end_tag.startswith("<") and end_tag.endswith(">"):
+                # Match end tag e.g., </tag>
+                end_tag_pattern = rf"{re.escape(end_tag)}"
+            else:
+                # Handle cases where end_tag is just a tag name
+                end_tag_pattern = rf"{re.escape(end_tag)}"
+
+            # Check if the content has the end tag
+            if self.search(end_tag_pattern, end_tag, content, offsets=offsets):
+                end_flag = True
+
+                block_content = content_blocks[-1]["content"]
+                # Strip start and end tags from the content
+                start_tag_pattern = rf"<{re.escape(start_tag)}(.*?)>"
+                block_content = re.sub(start_tag_pattern, "", block_content).strip()
+
+                end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
+                split_content = end_tag_regex.split(block_content, maxsplit=1)
+
+                # Content inside the tag
+                block_content = split_content[0].strip() if split_content else ""
+
+                # Leftover content (everything after `</tag>`)
+                leftover_content = (
+                    split_content[1].strip() if len(split_content) > 1 else ""
+                )
+
+                if block_content:
+                    content_blocks[-1]["content"] = block_content
+                    content_blocks[-1]["ended_at"] = time.time()
+                    content_blocks[-1]["duration"] = int(
+                        content_blocks[-1]["ended_at"]
+                        - content_blocks[-1]["started_at"]
+                    )
+
+                    # Reset the content_blocks by appending a new text block
+                    if content_type != "code_interpreter":
+                        if leftover_content:
+
+                            content_blocks.append(
+                                {
+                                    "type": "text",
+                                    "content": leftover_content,
+                                }
+                            )
+                        else:
+                            content_blocks.append(
+                                {
+                                    "type": "text",
+                                    "content": "",
+                                }
+                            )
+
+                else:
+                    # Remove the block if content is empty
+                    content_blocks.pop()
+
+                    if leftover_content:
+                        content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": leftover_content,
+                            }
+                        )
+                    else:
+                        content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": "",
+                            }
+                        )
+
+                # Clean processed content
+                start_tag_pattern = rf"{re.escape(start_tag)}"
+                if start_tag.startswith("<") and start_tag.endswith(">"):
+                    # Match start tag e.g., <tag> or <tag attr="value">
+                    # remove both '<' and '>' from start_tag
+                    # Match start tag with attributes
+                    start_tag_pattern = rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+
+                content = re.sub(
+                    rf"{start_tag_pattern}(.|\n)*?{re.escape(end_tag)}",
+                    "",
+                    content,
+                    flags=re.DOTALL,
+                )
+
+                # content was rewritten, earlier search offsets no longer apply
+                offsets.clear()
+
+        return content, content_blocks, end_flag
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import weakref
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_SIZE,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def get_upstream(url: str) -> str:
+    """The scheme, host and port of a URL, without credentials or path."""
+    parsed = urlparse(url)
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+
+    if port is None:
+        port = 443 if parsed.scheme == "https" else 80
+
+    host = parsed.hostname
+    if host and ":" in host:
+        # IPv6 addresses keep their brackets
+        host = f"[{host}]"
+    return f"{parsed.scheme}://{host}:{port}"
+
+
+class UpstreamSessionPool:
+    """
+    Application-lifetime aiohttp sessions for the OpenAI and Ollama
+    connections, one per upstream server and event loop.
+
+    Requests to the same upstream reuse its kept-alive connections instead of
+    opening a new session, and paying the TCP/TLS setup, for every call.
+    Responses have to be released rather than closed to return their
+    connection to the pool. Sessions never store cookies, as they are shared
+    between users; cookies passed to a request are still sent.
+    """
+
+    def __init__(self, pool_size: int = 100, keepalive_timeout: float = 30):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+
+        self.sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, aiohttp.ClientSession]
+        ] = weakref.WeakKeyDictionary()
+        self.counters: dict[str, dict[str, int]] = {}
+
+    def _create_session(self, upstream: str) -> aiohttp.ClientSession:
+        counters = self.counters.setdefault(upstream, {"opened": 0, "reused": 0})
+
+        async def on_connection_create_end(session, context, params):
+            counters["opened"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            counters["reused"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        log.debug(f"Opening a connection pool for {upstream}")
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive_timeout
+            ),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trust_env=True,
+            trace_configs=[trace_config],
+        )
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """The shared session for the upstream of url, on the running loop."""
+        sessions = self.sessions.setdefault(asyncio.get_running_loop(), {})
+
+        upstream = get_upstream(url)
+        session = sessions.get(upstream)
+        if session is None or session.closed:
+            session = sessions[upstream] = self._create_session(upstream)
+        return session
+
+    async def close(self):
+        """Closes the sessions of the running loop."""
+        sessions = self.sessions.pop(asyncio.get_running_loop(), {})
+        for session in sessions.values():
+            await session.close()
+
+    def stats(self) -> list[dict]:
+        """Pool size, connections in use and idle, opened and reused per upstream."""
+        stats = {}
+        for sessions in list(self.sessions.values()):
+            for upstream, session in list(sessions.items()):
+                entry = stats.setdefault(
+                    upstream,
+                    {
+                        "upstream": upstream,
+                        "limit": 0,
+                        "active": 0,
+                        "idle": 0,
+                        **self.counters.get(upstream, {"opened": 0, "reused": 0}),
+                    },
+                )
+
+                connector = session.connector
+                if session.closed or connector is None:
+                    continue
+
+                entry["limit"] += connector.limit
+                # aiohttp does not expose these counts publicly
+                entry["active"] += len(getattr(connector, "_acquired", ()))
+                entry["idle"] += sum(
+                    len(connections)
+                    for connections in list(getattr(connector, "_conns", {}).values())
+                )
+        return list(stats.values())
+
+
+UPSTREAM_SESSIONS = UpstreamSessionPool(
+    pool_size=AIOHTTP_CLIENT_POOL_SIZE,
+    keepalive_timeout=AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+)
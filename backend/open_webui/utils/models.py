@@ -26,7 +26,12 @@ from open_webui.config import (
     DEFAULT_ARENA_MODEL,
 )
 
-from open_webui.env import BYPASS_MODEL_ACCESS_CONTROL, SRC_LOG_LEVELS, GLOBAL_LOG_LEVEL
+from open_webui.env import (
+    BYPASS_MODEL_ACCESS_CONTROL,
+    GLOBAL_LOG_LEVEL,
+    MODELS_CACHE_TTL,
+    SRC_LOG_LEVELS,
+)
 from open_webui.models.users import UserModel
 
 
@@ -88,13 +93,62 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
         base_models = await get_all_base_models(request, user=user)
         request.app.state.BASE_MODELS = base_models
 
-    # deep copy the base models to avoid modifying the original list
-    models = [model.copy() for model in base_models]
-
     # If there are no models, return an empty list
-    if len(models) == 0:
+    if len(base_models) == 0:
         return []
 
+    # Reuse the last assembled list while none of its sources changed, i.e.
+    # the same base models, no model or function writes, the same arena
+    sources = (
+        Models.version,
+        Functions.version,
+        request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS,
+        request.app.state.config.EVALUATION_ARENA_MODELS,
+    )
+    # Without the base models cache every call refetches them, compare them
+    # by value rather than by identity
+    base_models_fingerprint = get_base_models_fingerprint(base_models)
+    snapshot = request.app.state.MODELS_SNAPSHOT
+    if (
+        snapshot
+        and snapshot["sources"] == sources
+        and snapshot["base_models_fingerprint"] == base_models_fingerprint
+        and (
+            snapshot["expires_at"] is None or time.monotonic() < snapshot["expires_at"]
+        )
+    ):
+        return list(snapshot["models"])
+
+    models = build_models(request, base_models)
+    log.debug(f"get_all_models() returned {len(models)} models")
+
+    request.app.state.MODELS = {model["id"]: model for model in models}
+    request.app.state.MODELS_SNAPSHOT = {
+        "base_models_fingerprint": base_models_fingerprint,
+        "sources": sources,
+        "expires_at": (
+            time.monotonic() + MODELS_CACHE_TTL
+            if MODELS_CACHE_TTL is not None
+            else None
+        ),
+        "models": models,
+    }
+    return list(models)
+
+
+def get_base_models_fingerprint(base_models: list[dict]) -> list[dict]:
+    """Base models without "created", which Ollama models get anew on every fetch."""
+    return [
+        {key: value for key, value in model.items() if key != "created"}
+        for model in base_models
+    ]
+
+
+def build_models(request, base_models: list[dict]) -> list[dict]:
+    """Applies the arena, custom models, actions and filters to the base models."""
+    # deep copy the base models to avoid modifying the original list
+    models = [model.copy() for model in base_models]
+
     # Add arena models
     if request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS:
         arena_models = []
@@ -133,73 +187,93 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
     global_action_ids = [
         function.id for function in Functions.get_global_action_functions()
     ]
-    enabled_action_ids = [
-        function.id
+    action_functions = {
+        function.id: function
         for function in Functions.get_functions_by_type("action", active_only=True)
-    ]
+    }
 
     global_filter_ids = [
         function.id for function in Functions.get_global_filter_functions()
     ]
-    enabled_filter_ids = [
-        function.id
+    filter_functions = {
+        function.id: function
         for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
+    }
+
+    # Index the models by id and by id without the tag, instead of scanning
+    # all of them for every custom model
+    models_by_id = {}
+    models_by_name = {}
+    positions = {}
+    removed = set()
+
+    def index_model(model):
+        positions[id(model)] = len(positions)
+        models_by_id.setdefault(model["id"], []).append(model)
+        models_by_name.setdefault(model["id"].split(":")[0], []).append(model)
+
+    def find_models(model_id, match_name) -> list[dict]:
+        """
+        The models with model_id as their id, or as their id without the tag
+        if match_name(model) holds, in list order.
+        """
+        found = {
+            id(model): model
+            for model in models_by_id.get(model_id, [])
+            + [model for model in models_by_name.get(model_id, []) if match_name(model)]
+            if id(model) not in removed
+        }
+        return sorted(found.values(), key=lambda model: positions[id(model)])
+
+    for model in models:
+        index_model(model)
 
     custom_models = Models.get_all_models()
     for custom_model in custom_models:
         if custom_model.base_model_id is None:
             # Applied directly to a base model
-            for model in models:
-                if custom_model.id == model["id"] or (
-                    model.get("owned_by") == "ollama"
-                    and custom_model.id
-                    == model["id"].split(":")[
-                        0
-                    ]  # Ollama may return model ids in different formats (e.g., 'llama3' vs. 'llama3:7b')
-                ):
-                    if custom_model.is_active:
-                        model["name"] = custom_model.name
-                        model["info"] = custom_model.model_dump()
-
-                        # Set action_ids and filter_ids
-                        action_ids = []
-                        filter_ids = []
-
-                        if "info" in model:
-                            if "meta" in model["info"]:
-                                action_ids.extend(
-                                    model["info"]["meta"].get("actionIds", [])
-                                )
-                                filter_ids.extend(
-                                    model["info"]["meta"].get("filterIds", [])
-                                )
-
-                            if "params" in model["info"]:
-                                # Remove params to avoid exposing sensitive info
-                                del model["info"]["params"]
-
-                        model["action_ids"] = action_ids
-                        model["filter_ids"] = filter_ids
-                    else:
-                        models.remove(model)
-
-        elif custom_model.is_active and (
-            custom_model.id not in [model["id"] for model in models]
+            # Ollama may return model ids in different formats (e.g., 'llama3' vs. 'llama3:7b')
+            for model in find_models(
+                custom_model.id, lambda model: model.get("owned_by") == "ollama"
+            ):
+                if custom_model.is_active:
+                    model["name"] = custom_model.name
+                    model["info"] = custom_model.model_dump()
+
+                    # Set action_ids and filter_ids
+                    action_ids = []
+                    filter_ids = []
+
+                    if "info" in model:
+                        if "meta" in model["info"]:
+                            action_ids.extend(
+                                model["info"]["meta"].get("actionIds", [])
+                            )
+                            filter_ids.extend(
+                                model["info"]["meta"].get("filterIds", [])
+                            )
+
+                        if "params" in model["info"]:
+                            # Remove params to avoid exposing sensitive info
+                            del model["info"]["params"]
+
+                    model["action_ids"] = action_ids
+                    model["filter_ids"] = filter_ids
+                else:
+                    removed.add(id(model))
+
+        elif custom_model.is_active and not find_models(
+            custom_model.id, lambda model: False
         ):
             # Custom model based on a base model
             owned_by = "openai"
             pipe = None
 
-            for m in models:
-                if (
-                    custom_model.base_model_id == m["id"]
-                    or custom_model.base_model_id == m["id"].split(":")[0]
-                ):
-                    owned_by = m.get("owned_by", "unknown")
-                    if "pipe" in m:
-                        pipe = m["pipe"]
-                    break
+            base_models = find_models(custom_model.base_model_id, lambda model: True)
+            if base_models:
+                owned_by = base_models[0].get("owned_by", "unknown")
+                if "pipe" in base_models[0]:
+                    pipe = base_models[0]["pipe"]
 
             model = {
                 "id": f"{custom_model.id}",
@@ -234,6 +308,9 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
             model["filter_ids"] = filter_ids
 
             models.append(model)
+            index_model(model)
+
+    models = [model for model in models if id(model) not in removed]
 
     # Process action_ids to get the actions
     def get_action_items_from_module(function, module):
@@ -280,49 +357,46 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
             }
         ]
 
-    def get_function_module_by_id(function_id):
-        function_module, _, _ = get_function_module_from_cache(request, function_id)
-        return function_module
+    # Each function's items are built once, not once per model using it
+    function_items = {}
+
+    def get_function_items(function_id, get_items_from_module):
+        if function_id not in function_items:
+            function_module, _, _ = get_function_module_from_cache(request, function_id)
+            function = action_functions.get(function_id) or filter_functions.get(
+                function_id
+            )
+            function_items[function_id] = (
+                function_module,
+                get_items_from_module(function, function_module),
+            )
+        return function_items[function_id]
 
     for model in models:
         action_ids = [
             action_id
             for action_id in list(set(model.pop("action_ids", []) + global_action_ids))
-            if action_id in enabled_action_ids
+            if action_id in action_functions
         ]
         filter_ids = [
             filter_id
             for filter_id in list(set(model.pop("filter_ids", []) + global_filter_ids))
-            if filter_id in enabled_filter_ids
+            if filter_id in filter_functions
         ]
 
         model["actions"] = []
         for action_id in action_ids:
-            action_function = Functions.get_function_by_id(action_id)
-            if action_function is None:
-                raise Exception(f"Action not found: {action_id}")
-
-            function_module = get_function_module_by_id(action_id)
-            model["actions"].extend(
-                get_action_items_from_module(action_function, function_module)
-            )
+            _, items = get_function_items(action_id, get_action_items_from_module)
+            model["actions"].extend(items)
 
         model["filters"] = []
         for filter_id in filter_ids:
-            filter_function = Functions.get_function_by_id(filter_id)
-            if filter_function is None:
-                raise Exception(f"Filter not found: {filter_id}")
-
-            function_module = get_function_module_by_id(filter_id)
-
+            function_module, items = get_function_items(
+                filter_id, get_filter_items_from_module
+            )
             if getattr(function_module, "toggle", None):
-                model["filters"].extend(
-                    get_filter_items_from_module(filter_function, function_module)
-                )
-
-    log.debug(f"get_all_models() returned {len(models)} models")
+                model["filters"].extend(items)
 
-    request.app.state.MODELS = {model["id"]: model for model in models}
     return models
 
 
@@ -337,7 +411,7 @@ def check_model_access(user, model):
         ):
             raise Exception("Model not found")
     else:
-        model_info = Models.get_model_by_id(model.get("id"))
+        model_info = Models.get_model_access_index().get(model.get("id"))
         if not model_info:
             raise Exception("Model not found")
         elif not (
@@ -355,6 +429,7 @@ def get_filtered_models(models, user):
         user.role == "user"
         or (user.role == "admin" and not BYPASS_ADMIN_ACCESS_CONTROL)
     ) and not BYPASS_MODEL_ACCESS_CONTROL:
+        model_infos = Models.get_model_access_index()
         filtered_models = []
         for model in models:
             if model.get("arena"):
@@ -368,7 +443,7 @@ def get_filtered_models(models, user):
                     filtered_models.append(model)
                 continue
 
-            model_info = Models.get_model_by_id(model["id"])
+            model_info = model_infos.get(model["id"])
             if model_info:
                 if (
                     (user.role == "admin" and BYPASS_ADMIN_ACCESS_CONTROL)
@@ -8,6 +8,13 @@ Metrics collected:
 
 * http.server.requests (counter)
 * http.server.duration (histogram, milliseconds)
+* webui.rag.embedding_cache.lookups (counter, attribute: result=hit|redis_hit|miss)
+* webui.chat.events.queued (gauge)
+* webui.chat.events.persisted (counter, attribute: result=success|error)
+* webui.chat.events.backpressure (counter, waits), webui.chat.events.backpressure.duration (counter, seconds)
+* webui.upstream.connections (gauge, attributes: upstream, state=active|idle)
+* webui.upstream.connections.limit (gauge, attribute: upstream)
+* webui.upstream.connections.opened / .reused (counters, attribute: upstream)
 
 Attributes used: http.method, http.route, http.status_code
 
@@ -45,8 +52,10 @@ from open_webui.env import (
     OTEL_METRICS_OTLP_SPAN_EXPORTER,
     OTEL_METRICS_EXPORTER_OTLP_INSECURE,
 )
-from open_webui.socket.main import get_active_user_ids
+from open_webui.socket.main import get_active_user_count, CHAT_EVENT_PERSISTER
 from open_webui.models.users import Users
+from open_webui.retrieval.embeddings import EMBEDDING_CACHE
+from open_webui.utils.http_client import UPSTREAM_SESSIONS
 
 _EXPORT_INTERVAL_MILLIS = 10_000  # 10 seconds
 
@@ -99,6 +108,10 @@ def _build_meter_provider(resource: Resource) -> MeterProvider:
         View(
             instrument_name="webui.users.active",
         ),
+        View(
+            instrument_name="webui.rag.embedding_cache.lookups",
+            attribute_keys=["result"],
+        ),
     ]
 
     provider = MeterProvider(
@@ -132,7 +145,7 @@ def setup_metrics(app: FastAPI, resource: Resource) -> None:
     ) -> Sequence[metrics.Observation]:
         return [
             metrics.Observation(
-                value=len(get_active_user_ids()),
+                value=get_active_user_count(),
             )
         ]
 
@@ -159,6 +172,161 @@ def setup_metrics(app: FastAPI, resource: Resource) -> None:
         callbacks=[observe_active_users],
     )
 
+    def observe_embedding_cache_lookups(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        stats = EMBEDDING_CACHE.stats()
+        return [
+            metrics.Observation(
+                value=stats["hits"] - stats["redis_hits"], attributes={"result": "hit"}
+            ),
+            metrics.Observation(
+                value=stats["redis_hits"], attributes={"result": "redis_hit"}
+            ),
+            metrics.Observation(value=stats["misses"], attributes={"result": "miss"}),
+        ]
+
+    meter.create_observable_counter(
+        name="webui.rag.embedding_cache.lookups",
+        description="Embedding cache lookups by result",
+        unit="1",
+        callbacks=[observe_embedding_cache_lookups],
+    )
+
+    def observe_chat_events_queued(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=CHAT_EVENT_PERSISTER.stats()["queued"])]
+
+    def observe_chat_events_persisted(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        stats = CHAT_EVENT_PERSISTER.stats()
+        return [
+            metrics.Observation(
+                value=stats["persisted"], attributes={"result": "success"}
+            ),
+            metrics.Observation(value=stats["errors"], attributes={"result": "error"}),
+        ]
+
+    def observe_chat_events_backpressure(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(
+                value=CHAT_EVENT_PERSISTER.stats()["backpressure_waits"]
+            )
+        ]
+
+    def observe_chat_events_backpressure_duration(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(
+                value=CHAT_EVENT_PERSISTER.stats()["backpressure_seconds"]
+            )
+        ]
+
+    meter.create_observable_gauge(
+        name="webui.chat.events.queued",
+        description="Message events waiting to be saved",
+        unit="1",
+        callbacks=[observe_chat_events_queued],
+    )
+
+    meter.create_observable_counter(
+        name="webui.chat.events.persisted",
+        description="Message events saved by result",
+        unit="1",
+        callbacks=[observe_chat_events_persisted],
+    )
+
+    meter.create_observable_counter(
+        name="webui.chat.events.backpressure",
+        description="Emitters that waited for the event queue",
+        unit="1",
+        callbacks=[observe_chat_events_backpressure],
+    )
+
+    meter.create_observable_counter(
+        name="webui.chat.events.backpressure.duration",
+        description="Time emitters waited for the event queue",
+        unit="s",
+        callbacks=[observe_chat_events_backpressure_duration],
+    )
+
+    def observe_upstream_connections(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        observations = []
+        for stats in UPSTREAM_SESSIONS.stats():
+            for state in ["active", "idle"]:
+                observations.append(
+                    metrics.Observation(
+                        value=stats[state],
+                        attributes={"upstream": stats["upstream"], "state": state},
+                    )
+                )
+        return observations
+
+    def observe_upstream_connections_limit(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(
+                value=stats["limit"], attributes={"upstream": stats["upstream"]}
+            )
+            for stats in UPSTREAM_SESSIONS.stats()
+        ]
+
+    def observe_upstream_connections_opened(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(
+                value=stats["opened"], attributes={"upstream": stats["upstream"]}
+            )
+            for stats in UPSTREAM_SESSIONS.stats()
+        ]
+
+    def observe_upstream_connections_reused(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [
+            metrics.Observation(
+                value=stats["reused"], attributes={"upstream": stats["upstream"]}
+            )
+            for stats in UPSTREAM_SESSIONS.stats()
+        ]
+
+    meter.create_observable_gauge(
+        name="webui.upstream.connections",
+        description="Pooled connections to OpenAI and Ollama servers by state",
+        unit="1",
+        callbacks=[observe_upstream_connections],
+    )
+
+    meter.create_observable_gauge(
+        name="webui.upstream.connections.limit",
+        description="Connection pool size per OpenAI or Ollama server",
+        unit="1",
+        callbacks=[observe_upstream_connections_limit],
+    )
+
+    meter.create_observable_counter(
+        name="webui.upstream.connections.opened",
+        description="Connections opened to OpenAI and Ollama servers",
+        unit="1",
+        callbacks=[observe_upstream_connections_opened],
+    )
+
+    meter.create_observable_counter(
+        name="webui.upstream.connections.reused",
+        description="Requests that reused a pooled connection",
+        unit="1",
+        callbacks=[observe_upstream_connections_reused],
+    )
+
     # FastAPI middleware
     @app.middleware("http")
     async def _metrics_middleware(request: Request, call_next):
@@ -113,7 +113,8 @@ export const getChatList = async (
 	token: string = '',
 	page: number | null = null,
 	include_pinned: boolean = false,
-	include_folders: boolean = false
+	include_folders: boolean = false,
+	cursor: string | null = null
 ) => {
 	let error = null;
 	const searchParams = new URLSearchParams();
@@ -122,6 +123,11 @@ export const getChatList = async (
 		searchParams.append('page', `${page}`);
 	}
 
+	// "{updated_at}:{id}" of the last chat already loaded, instead of an offset
+	if (cursor !== null) {
+		searchParams.append('cursor', cursor);
+	}
+
 	if (include_folders) {
 		searchParams.append('include_folders', 'true');
 	}